@@ -2,10 +2,11 @@ from django.contrib import admin
 from django.contrib.auth.models import User
 from django.contrib.auth.admin import UserAdmin as DefaultUserAdmin
 from django.utils.html import format_html
-import base64
 import re
 from .models import Level, Question, Present, UserProgress, UserAnswer, Review, Mails, Mystery
-from utils.image_access import create_thumbnail_from_drive
+from .reviews import approve_reviews, reject_reviews
+from .warmup import warm_mystery_images
+from utils.background import submit
 import nested_admin
 
 
@@ -17,7 +18,7 @@ import nested_admin
 class LevelInline(nested_admin.NestedStackedInline):
     model = Level
     extra = 0
-    fields = ("name", "quest")
+    fields = ("name", "position", "quest")
     classes = ['collapse']
 
 
@@ -32,6 +33,7 @@ class MysteryAdmin(nested_admin.NestedModelAdmin):
     ordering = ("-created_at",)
     readonly_fields = ("created_at", "image_preview")
     inlines = [LevelInline]
+    actions = ["warm_image_cache"]
 
     fieldsets = (
         ("Mystery Info", {"fields": ("name", "description", "home_page", "image_preview" , "image" , "image_url","is_visible" )}),
@@ -47,11 +49,17 @@ class MysteryAdmin(nested_admin.NestedModelAdmin):
             return "Invalid Drive URL"
         file_id = match.group(1)
         return format_html(
-            '<img src="/admin/image-proxy/{}" width="120" loading="lazy" style="border:1px solid #ccc; border-radius:4px"/>',
+            '<img src="/admin/image-proxy/{}/?size=thumb" width="120" loading="lazy" style="border:1px solid #ccc; border-radius:4px"/>',
             file_id
         )
     image_preview.short_description = "Image Preview"
 
+    def warm_image_cache(self, request, queryset):
+        for mystery in queryset:
+            submit(warm_mystery_images, mystery, sizes=("thumb",))
+        self.message_user(request, f"Image cache warm-up started for {queryset.count()} mystery(ies).")
+    warm_image_cache.short_description = "🔥 Warm image cache"
+
 # --------------------------------------------------------------------
 # NESTED INLINES FOR LEVEL -> QUESTION -> MAILS
 # --------------------------------------------------------------------
@@ -71,7 +79,7 @@ class MailInlineForQuestion(nested_admin.NestedTabularInline):
             return "Invalid Drive URL"
         file_id = match.group(1)
         return format_html(
-            '<img src="/admin/image-proxy/{}" width="120" loading="lazy" style="border:1px solid #ccc; border-radius:4px"/>',
+            '<img src="/admin/image-proxy/{}/?size=thumb" width="120" loading="lazy" style="border:1px solid #ccc; border-radius:4px"/>',
             file_id
         )
     image_preview.short_description = "Image Preview"
@@ -81,7 +89,7 @@ class QuestionInline(nested_admin.NestedTabularInline):
     model = Question
     extra = 1
     max_num = 10
-    fields = ("question", "question_image", "question_image_url", "answer", "max_attempts", "answer_type")
+    fields = ("question", "question_image", "question_image_url", "answer", "answer_tolerance", "max_attempts", "answer_type")
     inlines = [MailInlineForQuestion]
     classes = ['collapse']
 
@@ -100,7 +108,7 @@ class PresentInline(nested_admin.NestedStackedInline):
 
 @admin.register(Level)
 class LevelAdmin(nested_admin.NestedModelAdmin):
-    list_display = ("id", "name", "quest")
+    list_display = ("id", "name", "position", "quest")
     search_fields = ("name", "quest")
     list_filter = ("mystery",)
     inlines = [QuestionInline, PresentInline]
@@ -128,7 +136,7 @@ class MailsAdmin(admin.ModelAdmin):
             return "Invalid Drive URL"
         file_id = match.group(1)
         return format_html(
-            '<img src="/admin/image-proxy/{}" width="120" loading="lazy" style="border:1px solid #ccc; border-radius:4px"/>',
+            '<img src="/admin/image-proxy/{}/?size=thumb" width="120" loading="lazy" style="border:1px solid #ccc; border-radius:4px"/>',
             file_id
         )
     image_preview.short_description = "Image Preview"
@@ -165,12 +173,9 @@ class ReviewInlineForQuestion(admin.TabularInline):
         if not match:
             return "Invalid Drive URL"
         file_id = match.group(1)
-        file_bytes, mime_type = create_thumbnail_from_drive(file_id)
-        encoded = base64.b64encode(file_bytes).decode()
         return format_html(
-            '<img src="data:{};base64,{}" width="120" loading="lazy" style="border:1px solid #ccc"/>',
-            mime_type,
-            encoded
+            '<img src="/admin/image-proxy/{}/?size=thumb" width="120" loading="lazy" style="border:1px solid #ccc"/>',
+            file_id
         )
     answer_image_preview.short_description = "Review Image"
 
@@ -181,7 +186,7 @@ class QuestionAdmin(admin.ModelAdmin):
     search_fields = ("question",)
     list_filter = ("level", "answer_type")
     readonly_fields = ("image_preview",)
-    fields = ("level", "question", "question_image", "image_preview", "question_image_url", "answer", "answer_type", "max_attempts")
+    fields = ("level", "question", "question_image", "image_preview", "question_image_url", "answer", "answer_tolerance", "answer_type", "max_attempts")
     inlines = [UserAnswerInlineForQuestion, ReviewInlineForQuestion, MailInlineForQuestion]
     raw_id_fields = ("level",)
 
@@ -201,7 +206,7 @@ class QuestionAdmin(admin.ModelAdmin):
             return "Invalid Drive URL"
         file_id = match.group(1)
         return format_html(
-            '<img src="/admin/image-proxy/{}" width="120" loading="lazy" style="border:1px solid #ccc"/>',
+            '<img src="/admin/image-proxy/{}/?size=thumb" width="120" loading="lazy" style="border:1px solid #ccc"/>',
             file_id
         )
     image_preview.short_description = "Preview"
@@ -224,7 +229,7 @@ class PresentAdmin(admin.ModelAdmin):
             return "Invalid Drive URL"
         file_id = match.group(1)
         return format_html(
-            '<img src="/admin/image-proxy/{}" width="120" loading="lazy" style="border:1px solid #ccc"/>',
+            '<img src="/admin/image-proxy/{}/?size=thumb" width="120" loading="lazy" style="border:1px solid #ccc"/>',
             file_id
         )
     image_preview.short_description = "Preview"
@@ -276,7 +281,7 @@ class ReviewInlineForUser(admin.TabularInline):
             return "Invalid Drive URL"
         file_id = match.group(1)
         return format_html(
-            '<img src="/admin/image-proxy/{}" width="120" loading="lazy" style="border:1px solid #ccc"/>',
+            '<img src="/admin/image-proxy/{}/?size=thumb" width="120" loading="lazy" style="border:1px solid #ccc"/>',
             file_id
         )
     answer_image_preview.short_description = "Review Image"
@@ -314,7 +319,7 @@ class UserAnswerAdmin(admin.ModelAdmin):
             return "Invalid Drive URL"
         file_id = match.group(1)
         return format_html(
-            '<img src="/admin/image-proxy/{}" width="120" loading="lazy" style="border:1px solid #ccc"/>',
+            '<img src="/admin/image-proxy/{}/?size=thumb" width="120" loading="lazy" style="border:1px solid #ccc"/>',
             file_id
         )
     image_preview.short_description = "Preview"
@@ -342,7 +347,7 @@ class ReviewAdmin(admin.ModelAdmin):
             return "Invalid Drive URL"
         file_id = match.group(1)
         return format_html(
-            '<img src="/admin/image-proxy/{}" width="120" loading="lazy" style="border:1px solid #ccc"/>',
+            '<img src="/admin/image-proxy/{}/?size=thumb" width="120" loading="lazy" style="border:1px solid #ccc"/>',
             file_id
         )
     answer_image_preview.short_description = "Review Image"
@@ -351,11 +356,12 @@ class ReviewAdmin(admin.ModelAdmin):
         return (obj.answer_text[:40] + "...") if obj.answer_text and len(obj.answer_text) > 40 else obj.answer_text
 
     def approve_reviews(self, request, queryset):
-        updated = queryset.update(status="approved", reviewer=request.user)
+        # Batch finalization: answers, level completions and presents for all selected reviews
+        updated = approve_reviews(queryset, reviewer=request.user)
         self.message_user(request, f"{updated} review(s) approved successfully.")
     approve_reviews.short_description = "✅ Approve selected reviews"
 
     def reject_reviews(self, request, queryset):
-        updated = queryset.update(status="rejected", reviewer=request.user)
+        updated = reject_reviews(queryset, reviewer=request.user)
         self.message_user(request, f"{updated} review(s) rejected successfully.")
     reject_reviews.short_description = "❌ Reject selected reviews"
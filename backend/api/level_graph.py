@@ -0,0 +1,66 @@
+# api/level_graph.py
+from django.core.cache import cache
+from django.db import transaction
+
+from .levels_cache import cache_is_shared
+
+LEVEL_GRAPH_TIMEOUT = 60 * 60  # seconds; invalidated explicitly whenever levels change
+
+
+class LevelGraph:
+    """
+    Ordered levels of one mystery with O(1) next / previous lookups.
+    Levels are ordered by (position, id), so levels that share a position keep
+    their creation order.
+    """
+
+    def __init__(self, mystery_id, level_ids):
+        self.mystery_id = mystery_id
+        self.level_ids = list(level_ids)
+        self._next = dict(zip(self.level_ids, self.level_ids[1:]))
+        self._previous = {b: a for a, b in self._next.items()}
+
+    @property
+    def first_id(self):
+        return self.level_ids[0] if self.level_ids else None
+
+    def next_id(self, level_id):
+        """Id of the level after level_id, or None for the last level."""
+        return self._next.get(level_id)
+
+    def previous_id(self, level_id):
+        return self._previous.get(level_id)
+
+    def successors_of(self, level_ids):
+        """Ids of the levels that directly follow any of level_ids."""
+        return {self._next[level_id] for level_id in level_ids if level_id in self._next}
+
+    def __contains__(self, level_id):
+        return level_id in self._next or level_id == self.first_id or level_id in self._previous
+
+    def __len__(self):
+        return len(self.level_ids)
+
+
+def _cache_key(mystery_id):
+    return f"level_graph:{mystery_id}"
+
+
+def get_level_graph(mystery_id) -> LevelGraph:
+    """Return the cached LevelGraph of a mystery, building it with one query on a miss."""
+    from .models import Level
+
+    shared = cache_is_shared()
+    level_ids = cache.get(_cache_key(mystery_id)) if shared else None
+    if level_ids is None:
+        level_ids = list(
+            Level.objects.filter(mystery_id=mystery_id).order_by("position", "id").values_list("id", flat=True)
+        )
+        if shared:
+            cache.set(_cache_key(mystery_id), level_ids, LEVEL_GRAPH_TIMEOUT)
+    return LevelGraph(mystery_id, level_ids)
+
+
+def invalidate_level_graph(mystery_id):
+    """Drop the cached graph once the current transaction commits, so no request rebuilds it from uncommitted rows."""
+    transaction.on_commit(lambda: cache.delete(_cache_key(mystery_id)))
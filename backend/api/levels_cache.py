@@ -0,0 +1,85 @@
+# api/levels_cache.py
+"""
+Cache of the serialized LevelsView payload per (user, mystery).
+
+Each entry is stamped with two version tokens: one per mystery (replaced when its
+content is edited) and one per (user, mystery) (replaced when the player's answers,
+reviews or progress change). An entry is only served while both stamps still match,
+so a hit costs a single get_many round trip and invalidation never has to find the
+entries it makes stale. Tokens are random rather than counters: a version key that
+was evicted comes back with a value no older entry can carry.
+
+Nothing is cached unless settings.CACHE_IS_SHARED: with a per-process cache the
+invalidations of one worker would never reach the entries of the others.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+import uuid
+
+LEVELS_CACHE_TIMEOUT = getattr(settings, "LEVELS_CACHE_TIMEOUT", 5 * 60)
+
+
+def cache_is_shared():
+    return getattr(settings, "CACHE_IS_SHARED", True)
+
+
+def _payload_key(user_id, mystery_id):
+    return f"levels_payload:{mystery_id}:{user_id}"
+
+
+def _user_version_key(user_id, mystery_id):
+    return f"levels_version:{mystery_id}:{user_id}"
+
+
+def _mystery_version_key(mystery_id):
+    return f"levels_version:{mystery_id}"
+
+
+def get_cached_levels(user_id, mystery_id):
+    """
+    Returns (payload, versions). payload is None on a miss; versions must then be
+    passed to set_cached_levels so a change made while the payload was being built
+    isn't hidden behind a stale entry.
+    """
+    if not cache_is_shared():
+        return None, None
+
+    payload_key = _payload_key(user_id, mystery_id)
+    user_key = _user_version_key(user_id, mystery_id)
+    mystery_key = _mystery_version_key(mystery_id)
+
+    found = cache.get_many([payload_key, user_key, mystery_key])
+    versions = (found.get(user_key) or _start_version(user_key), found.get(mystery_key) or _start_version(mystery_key))
+    entry = found.get(payload_key)
+    if entry is not None and entry[0] == versions:
+        return entry[1], versions
+    return None, versions
+
+
+def set_cached_levels(user_id, mystery_id, versions, payload):
+    if versions is None:
+        return
+    cache.set(_payload_key(user_id, mystery_id), (versions, payload), LEVELS_CACHE_TIMEOUT)
+
+
+def _start_version(key):
+    """Version of a key that is missing (never set or evicted): a fresh token, unless another request set one first."""
+    token = uuid.uuid4().hex
+    if cache.add(key, token, None):
+        return token
+    return cache.get(key) or token
+
+
+def _bump(key):
+    cache.set(key, uuid.uuid4().hex, None)
+
+
+def invalidate_user_levels(user_id, mystery_id):
+    """Drop the player's cached payload once the current transaction commits."""
+    transaction.on_commit(lambda: _bump(_user_version_key(user_id, mystery_id)))
+
+
+def invalidate_mystery_levels(mystery_id):
+    """Drop every player's cached payload of a mystery once the current transaction commits."""
+    transaction.on_commit(lambda: _bump(_mystery_version_key(mystery_id)))
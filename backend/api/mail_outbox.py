@@ -0,0 +1,98 @@
+# api/mail_outbox.py
+"""
+Outbox for hint mails. GetHint only records a MailJob; building the message
+(including the Drive image fetch) and sending it happen in the background
+worker pool, run by the same utils.background.JobRunner as api/uploads.py.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from datetime import timedelta
+from utils.background import JobRunner, submit
+from utils.gdrive import file_id_from_url
+from utils.image_access import image_secure_access
+from utils.mail.transports import get_mail_transport
+
+MAIL_MAX_ATTEMPTS = getattr(settings, "MAIL_MAX_ATTEMPTS", 5)
+MAIL_RATE_LIMIT = getattr(settings, "MAIL_RATE_LIMIT", 5)
+MAIL_RATE_WINDOW = timedelta(seconds=getattr(settings, "MAIL_RATE_WINDOW", 60 * 60))
+# Jobs claimed ("sending") longer ago than this (e.g. worker killed mid-send) are retried
+MAIL_STALE_AFTER = timedelta(minutes=10)
+
+
+class MailRateLimited(Exception):
+    """The player asked for more hint mails than MAIL_RATE_LIMIT within MAIL_RATE_WINDOW."""
+
+
+# ---------------------------------------------------
+# Request side
+# ---------------------------------------------------
+def enqueue_hint_mail(user, mail):
+    """
+    Queue `mail` for `user` and hand it to the worker pool once the surrounding
+    transaction commits. A request repeated while the same mail is still
+    waiting reuses that job. Raises MailRateLimited when the player is over
+    the limit.
+    """
+    from .models import MailJob
+
+    existing = MailJob.objects.filter(user=user, mail=mail, status__in=("pending", "sending")).first()
+    if existing is not None:
+        return existing
+
+    recent = MailJob.objects.filter(user=user, created_at__gte=timezone.now() - MAIL_RATE_WINDOW).count()
+    if recent >= MAIL_RATE_LIMIT:
+        raise MailRateLimited()
+
+    job = MailJob.objects.create(user=user, mail=mail, recipient=user.email)
+    print(f"[Mail] Queued {job}")
+    transaction.on_commit(lambda: submit(process_mail_job, job.id))
+    return job
+
+
+# ---------------------------------------------------
+# Worker side
+# ---------------------------------------------------
+def build_hint_message(mail, recipient):
+    """Gmail-API message ({"raw": ...}) of a hint mail, with its image attached if it has one."""
+    from utils.mail.mail_service import create_message
+
+    file_bytes = None
+    mime_type = None
+    # Links of every storage backend carry the key as id=<key>
+    file_id = file_id_from_url(mail.image_url)
+    if file_id:
+        file_bytes, mime_type = image_secure_access(file_id)
+    elif mail.image_url:
+        print(f"[Mail] No storage key in image link {mail.image_url!r}, sending without the image")
+    return create_message("me", recipient, mail.subject, mail.message_text, image=file_bytes, mime_type=mime_type)
+
+
+def _send(job):
+    get_mail_transport().send(build_hint_message(job.mail, job.recipient))
+
+
+mail_jobs = JobRunner(
+    "api.MailJob",
+    _send,
+    running_status="sending",
+    done_status="sent",
+    max_attempts=MAIL_MAX_ATTEMPTS,
+    stale_after=MAIL_STALE_AFTER,
+    select_related=("mail",),
+    log_prefix="[Mail]",
+)
+
+
+def process_mail_job(job_id):
+    """Build and send one hint mail, retrying with exponential backoff on failure."""
+    mail_jobs.process(job_id)
+
+
+def process_pending_mails(limit=None):
+    """
+    Send every due mail job in the current thread. Used by the `process_mail_outbox`
+    management command to drain the queue and to recover jobs after a restart.
+    Returns the number of jobs attempted.
+    """
+    return mail_jobs.drain(limit)
@@ -0,0 +1,21 @@
+import time
+from django.core.management.base import BaseCommand
+from api.uploads import process_pending_uploads
+
+
+class Command(BaseCommand):
+    help = "Push staged image uploads to Google Drive (retries failed/stale jobs)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--loop", action="store_true", help="Keep polling for new jobs instead of exiting.")
+        parser.add_argument("--interval", type=float, default=5, help="Seconds between polls with --loop.")
+        parser.add_argument("--limit", type=int, default=None, help="Maximum jobs per pass.")
+
+    def handle(self, *args, **options):
+        while True:
+            count = process_pending_uploads(limit=options["limit"])
+            if count:
+                self.stdout.write(f"Processed {count} upload job(s).")
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
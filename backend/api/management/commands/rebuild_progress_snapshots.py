@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from api.models import UserProgress
+from api.progress import rebuild_progress_snapshot
+
+
+class Command(BaseCommand):
+    help = "Backfill (or repair) ProgressSnapshot rows from UserProgress, UserAnswer and Review."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--mystery", type=int, help="Only rebuild snapshots of this mystery.")
+
+    def handle(self, *args, **options):
+        progresses = UserProgress.objects.exclude(mystery=None).select_related("user")
+        if options["mystery"]:
+            progresses = progresses.filter(mystery_id=options["mystery"])
+
+        count = 0
+        for progress in progresses.iterator():
+            rebuild_progress_snapshot(progress.user, progress.mystery_id)
+            count += 1
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} progress snapshot(s)."))
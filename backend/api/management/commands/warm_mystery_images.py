@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+from api.models import Mystery
+from api.warmup import warm_mystery_images, WARMUP_WORKERS
+from utils.image_derivatives import DERIVATIVE_SIZES
+
+
+class Command(BaseCommand):
+    help = "Prefetch every image of a mystery into the shared image cache (run shortly before starts_at)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("mystery_id", type=int)
+        parser.add_argument("--workers", type=int, default=WARMUP_WORKERS, help="Concurrent downloads.")
+        parser.add_argument(
+            "--sizes", default="thumb",
+            help="Comma-separated derivative sizes to render as well (thumb,medium,full); empty for originals only.",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            mystery = Mystery.objects.get(id=options["mystery_id"])
+        except Mystery.DoesNotExist:
+            raise CommandError(f"Mystery {options['mystery_id']} does not exist")
+
+        sizes = tuple(s for s in options["sizes"].split(",") if s)
+        unknown = [s for s in sizes if s not in DERIVATIVE_SIZES]
+        if unknown:
+            raise CommandError(f"Unknown size(s): {', '.join(unknown)}")
+
+        def progress(done, total, file_id, error):
+            status = f"❌ {error}" if error else "✅"
+            self.stdout.write(f"[{done}/{total}] {file_id} {status}")
+
+        self.stdout.write(f"Warming images for '{mystery.name}' with {options['workers']} worker(s)...")
+        result = warm_mystery_images(mystery, workers=options["workers"], sizes=sizes, progress=progress)
+        self.stdout.write(self.style.SUCCESS(
+            f"Warmed {result['warmed']}/{result['total']} image(s), {len(result['failed'])} failed."
+        ))
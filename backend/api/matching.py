@@ -0,0 +1,131 @@
+# api/matching.py
+"""
+Answer matching for "match" questions.
+
+Question.answer may list several accepted answers separated by "|". Each one is
+normalized once, when the question is saved (Question.normalized_answers); a
+guess is normalized the same way and compared against them, exactly or within
+Question.answer_tolerance edits (Levenshtein distance).
+"""
+import threading
+import unicodedata
+
+ANSWER_SEPARATOR = "|"
+# Punctuation (Unicode category P) that reads as part of an answer: "C#", "100%", "@home"
+SYMBOLIC_PUNCTUATION = frozenset("#%@")
+# Compiled matchers kept per process; a question's old versions simply age out
+MATCHER_CACHE_SIZE = 2048
+
+
+def normalize_answer(text: str | None) -> str:
+    """
+    Fold an answer to its comparable form:
+    accents removed, case folded, punctuation and separators turned into spaces,
+    runs of whitespace collapsed. "  Café-Noir! " → "cafe noir".
+    Symbols are kept ("C++", "C#", "🔑"), and an answer made only of punctuation
+    is compared as typed rather than folding to nothing.
+    """
+    if not text:
+        return ""
+    decomposed = unicodedata.normalize("NFKD", text)
+    chars = []
+    for ch in decomposed:
+        category = unicodedata.category(ch)
+        if category.startswith("M"):
+            continue  # combining accent marks
+        if category[0] in "PZC" and ch not in SYMBOLIC_PUNCTUATION:
+            chars.append(" ")  # punctuation, separators, control chars
+        else:
+            chars.append(ch)
+    folded = " ".join("".join(chars).casefold().split())
+    return folded or " ".join(text.casefold().split())
+
+
+def normalize_answers(raw: str | None) -> list[str]:
+    """All accepted answers of a question, normalized, de-duplicated, in order."""
+    answers = []
+    for part in (raw or "").split(ANSWER_SEPARATOR):
+        normalized = normalize_answer(part)
+        if normalized and normalized not in answers:
+            answers.append(normalized)
+    return answers
+
+
+def bounded_levenshtein(a: str, b: str, max_distance: int) -> int:
+    """
+    Edit distance between a and b, or max_distance + 1 as soon as it's known to
+    exceed max_distance. Only a diagonal band of width 2 * max_distance + 1 is
+    computed, so a check costs O(len * max_distance).
+    """
+    if a == b:
+        return 0
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    if len(a) > len(b):
+        a, b = b, a
+
+    too_far = max_distance + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        lo = max(1, i - max_distance)
+        hi = min(len(b), i + max_distance)
+        current = [too_far] * (len(b) + 1)
+        current[0] = i if i <= max_distance else too_far
+        row_min = current[0]
+        for j in range(lo, hi + 1):
+            cost = 0 if ca == b[j - 1] else 1
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            current[j] = value if value < too_far else too_far
+            if current[j] < row_min:
+                row_min = current[j]
+        if row_min > max_distance:
+            return too_far
+        previous = current
+    return previous[len(b)] if previous[len(b)] <= max_distance else too_far
+
+
+class AnswerMatcher:
+    """Precompiled accepted answers of one question version."""
+
+    __slots__ = ("answers", "exact", "tolerance")
+
+    def __init__(self, answers, tolerance=0):
+        self.answers = tuple(answers)
+        self.exact = frozenset(self.answers)
+        self.tolerance = max(int(tolerance or 0), 0)
+
+    def matches(self, guess: str) -> bool:
+        """guess must already be normalized (see normalize_answer)."""
+        if not guess:
+            return False
+        if guess in self.exact:
+            return True
+        if not self.tolerance:
+            return False
+        return any(
+            bounded_levenshtein(guess, answer, self.tolerance) <= self.tolerance
+            for answer in self.answers
+        )
+
+
+_matchers = {}
+_matchers_lock = threading.Lock()
+
+
+def get_matcher(question) -> AnswerMatcher:
+    """The cached matcher of a question, keyed by (question id, answer_version)."""
+    key = (question.id, question.answer_version)
+    matcher = _matchers.get(key)
+    if matcher is None:
+        answers = question.normalized_answers or normalize_answers(question.answer)
+        matcher = AnswerMatcher(answers, question.answer_tolerance)
+        with _matchers_lock:
+            if len(_matchers) >= MATCHER_CACHE_SIZE:
+                _matchers.pop(next(iter(_matchers)))  # oldest entry
+            _matchers[key] = matcher
+    return matcher
+
+
+def answer_matches(question, guess: str | None) -> bool:
+    """True if guess is one of the question's accepted answers (within its tolerance)."""
+    return get_matcher(question).matches(normalize_answer(guess))
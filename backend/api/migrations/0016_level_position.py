@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 10:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_uploadjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='level',
+            name='position',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
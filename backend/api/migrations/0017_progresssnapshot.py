@@ -0,0 +1,35 @@
+# Generated by Django 5.2.6 on 2026-10-18 11:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0016_level_position'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProgressSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('completed_level_ids', models.JSONField(blank=True, default=list)),
+                ('unlocked_level_ids', models.JSONField(blank=True, default=list)),
+                ('collected_present_ids', models.JSONField(blank=True, default=list)),
+                ('solved_question_ids', models.JSONField(blank=True, default=list)),
+                ('review_states', models.JSONField(blank=True, default=dict)),
+                ('answers_submitted', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('current_level', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='api.level')),
+                ('mystery', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='progress_snapshots', to='api.mystery')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='progress_snapshots', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'mystery'), name='unique_progress_snapshot')],
+            },
+        ),
+    ]
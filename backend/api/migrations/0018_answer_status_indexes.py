@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-18 12:00
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0017_progresssnapshot'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='useranswer',
+            index=models.Index(fields=['user', 'question', 'is_correct'], name='api_userans_user_id_10563a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['user', 'mystery', 'question', 'status'], name='api_review_user_id_776134_idx'),
+        ),
+    ]
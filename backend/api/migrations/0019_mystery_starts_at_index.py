@@ -0,0 +1,17 @@
+# Generated by Django 5.2.6 on 2026-10-18 12:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0018_answer_status_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='mystery',
+            index=models.Index(fields=['starts_at', 'id'], name='api_mystery_starts__a13e6b_idx'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.6 on 2026-10-18 13:00
+
+from django.db import migrations, models
+
+
+def normalize_existing_answers(apps, schema_editor):
+    from api.matching import normalize_answers
+
+    Question = apps.get_model("api", "Question")
+    questions = list(Question.objects.only("id", "answer"))
+    for question in questions:
+        question.normalized_answers = normalize_answers(question.answer)
+        question.answer_version = 1
+    Question.objects.bulk_update(questions, ["normalized_answers", "answer_version"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0019_mystery_starts_at_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='question',
+            name='normalized_answers',
+            field=models.JSONField(blank=True, default=list, editable=False),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='answer_version',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='answer_tolerance',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.RunPython(normalize_existing_answers, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.6 on 2026-10-18 13:30
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def dedupe_correct_answers(apps, schema_editor):
+    """Keep the first (oldest) correct answer of each (user, question); newer racing duplicates go."""
+    UserAnswer = apps.get_model("api", "UserAnswer")
+    seen = set()
+    duplicates = []
+    rows = UserAnswer.objects.filter(is_correct=True).order_by("id").values_list("id", "user_id", "question_id")
+    for answer_id, user_id, question_id in rows.iterator():
+        if (user_id, question_id) in seen:
+            duplicates.append(answer_id)
+        else:
+            seen.add((user_id, question_id))
+    for start in range(0, len(duplicates), 500):
+        UserAnswer.objects.filter(id__in=duplicates[start:start + 500]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0020_question_answer_matching'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(dedupe_correct_answers, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='useranswer',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_correct', True)), fields=('user', 'question'), name='unique_correct_answer'),
+        ),
+        migrations.CreateModel(
+            name='AnswerSubmission',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('submission_key', models.CharField(max_length=64)),
+                ('response', models.JSONField(default=dict)),
+                ('status_code', models.PositiveSmallIntegerField(default=200)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='submissions', to='api.question')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='answer_submissions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'submission_key'), name='unique_submission_key')],
+            },
+        ),
+    ]
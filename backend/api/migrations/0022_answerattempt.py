@@ -0,0 +1,63 @@
+# Generated by Django 5.2.6 on 2026-10-18 14:00
+
+import django.db.models.deletion
+import django.utils.timezone
+from collections import Counter
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_attempts(apps, schema_editor):
+    """One ledger row per (user, question) from the answers and reviews stored so far."""
+    AnswerAttempt = apps.get_model("api", "AnswerAttempt")
+    UserAnswer = apps.get_model("api", "UserAnswer")
+    Review = apps.get_model("api", "Review")
+    UserProgress = apps.get_model("api", "UserProgress")
+
+    counts = Counter()
+    mystery_of = {}
+    for user_id, question_id, mystery_id in UserAnswer.objects.values_list("user_id", "question_id", "question__level__mystery_id").iterator():
+        counts[(user_id, question_id)] += 1
+        mystery_of[question_id] = mystery_id
+    for user_id, question_id, mystery_id in Review.objects.values_list("user_id", "question_id", "mystery_id").iterator():
+        counts[(user_id, question_id)] += 1
+        mystery_of[question_id] = mystery_id
+
+    AnswerAttempt.objects.bulk_create(
+        [AnswerAttempt(user_id=user_id, question_id=question_id, attempts=n) for (user_id, question_id), n in counts.items()],
+        batch_size=500,
+        ignore_conflicts=True,
+    )
+
+    totals = Counter()
+    for (user_id, question_id), n in counts.items():
+        totals[(user_id, mystery_of[question_id])] += n
+    for progress in UserProgress.objects.all().iterator():
+        total = totals.get((progress.user_id, progress.mystery_id), 0)
+        if progress.total_attempts != total:
+            UserProgress.objects.filter(pk=progress.pk).update(total_attempts=total)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0021_answer_submission'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnswerAttempt',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('last_attempt_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attempt_counters', to='api.question')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='answer_attempts', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'question'), name='unique_answer_attempt')],
+            },
+        ),
+        migrations.RunPython(backfill_attempts, migrations.RunPython.noop),
+    ]
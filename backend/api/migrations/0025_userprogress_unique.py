@@ -0,0 +1,62 @@
+# Generated by Django 5.2.6 on 2026-10-18 16:00
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def merge_duplicate_progress(apps, schema_editor):
+    """
+    Keep the first (oldest) progress row of each (user, mystery). The completed
+    levels, unlocked levels and collected presents of newer duplicates are
+    merged into it before they are deleted.
+    """
+    UserProgress = apps.get_model("api", "UserProgress")
+    relations = [
+        (UserProgress.completed_levels.through, "level_id"),
+        (UserProgress.unlocked_levels.through, "level_id"),
+        (UserProgress.collected_presents.through, "present_id"),
+    ]
+
+    kept = {}
+    duplicates = {}  # duplicate id → kept id
+    attempts = {}
+    rows = UserProgress.objects.order_by("id").values_list("id", "user_id", "mystery_id", "total_attempts")
+    for progress_id, user_id, mystery_id, total_attempts in rows.iterator():
+        key = (user_id, mystery_id)
+        if key in kept:
+            duplicates[progress_id] = kept[key]
+            attempts[kept[key]] = max(attempts[kept[key]], total_attempts)
+        else:
+            kept[key] = progress_id
+            attempts[progress_id] = total_attempts
+    if not duplicates:
+        return
+
+    for through, target_field in relations:
+        moved = through.objects.filter(userprogress_id__in=list(duplicates)).values_list("userprogress_id", target_field)
+        through.objects.bulk_create(
+            [through(userprogress_id=duplicates[progress_id], **{target_field: target_id}) for progress_id, target_id in moved],
+            batch_size=500,
+            ignore_conflicts=True,
+        )
+    for progress_id in set(duplicates.values()):
+        UserProgress.objects.filter(pk=progress_id).update(total_attempts=attempts[progress_id])
+    duplicate_ids = list(duplicates)
+    for start in range(0, len(duplicate_ids), 500):
+        UserProgress.objects.filter(id__in=duplicate_ids[start:start + 500]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0024_mailjob'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_progress, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='userprogress',
+            constraint=models.UniqueConstraint(fields=('user', 'mystery'), name='unique_user_progress'),
+        ),
+    ]
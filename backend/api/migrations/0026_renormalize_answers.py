@@ -0,0 +1,27 @@
+# Generated by Django 5.2.6 on 2026-10-18 21:00
+
+from django.db import migrations
+from django.db.models import F
+
+
+def renormalize_answers(apps, schema_editor):
+    """Symbols are now kept by normalize_answer: refold the stored answers and retire cached matchers."""
+    from api.matching import normalize_answers
+
+    Question = apps.get_model("api", "Question")
+    questions = list(Question.objects.only("id", "answer"))
+    for question in questions:
+        question.normalized_answers = normalize_answers(question.answer)
+    Question.objects.bulk_update(questions, ["normalized_answers"], batch_size=500)
+    Question.objects.update(answer_version=F("answer_version") + 1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0025_userprogress_unique'),
+    ]
+
+    operations = [
+        migrations.RunPython(renormalize_answers, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,8 @@
 from django.db import models
 from django.contrib.auth.models import User
-from utils.gdrive import upload_file_to_drive
+from django.db import transaction
+from django.utils import timezone
+from .uploads import stage_image, enqueue_upload
 
 class Mystery(models.Model):
     name = models.CharField(max_length=100)
@@ -16,29 +18,31 @@ class Mystery(models.Model):
     home_page = models.TextField( blank=True, null=True)
     participants = models.ManyToManyField(User, related_name="mysteries", blank=True)
 
+    class Meta:
+        # Catalogue listing / cursor pagination order
+        indexes = [models.Index(fields=["starts_at", "id"])]
+
     def __str__(self):
         return self.name
     
-    def is_active(self):
+    def is_active(self, now=None):
         from django.utils import timezone
-        now = timezone.now()
+        now = now or timezone.now()
         return self.starts_at <= now <= self.ends_at
     
     def save(self, *args, **kwargs):
-        if self.image :
-            print("Uploading question image to Google Drive...")
-            drive_url = upload_file_to_drive(self.image, dir_name="mysteries")
-            print("Drive URL:", drive_url)
-            self.image_url = drive_url
-            self.image.delete(save=False)  # cleanup local file
-            self.image = None
+        # Image is staged locally and pushed to Drive by a background worker
+        staged = stage_image(self, "image")
         super().save(*args, **kwargs)
+        if staged:
+            enqueue_upload(self, "image_url", staged, dir_name="mysteries")
 
 
 class Level(models.Model):
     mystery = models.ForeignKey(Mystery, related_name="levels", on_delete=models.CASCADE, default=1)
     name = models.CharField(max_length=100)
     quest = models.TextField( default="Solve the mystery!")
+    position = models.PositiveIntegerField(default=0)  # play order within the mystery (ties → id)
 
     def __str__(self):
         return self.name
@@ -56,14 +60,10 @@ class Mails(models.Model):
 
     def save(self, *args, **kwargs):
         print("Saving mail:", self.subject)
-        if self.image :
-            print("Uploading question image to Google Drive...")
-            drive_url = upload_file_to_drive(self.image, dir_name="mails")
-            print("Drive URL:", drive_url)
-            self.image_url = drive_url
-            self.image.delete(save=False)  # cleanup local file
-            self.image = None
+        staged = stage_image(self, "image")
         super().save(*args, **kwargs)
+        if staged:
+            enqueue_upload(self, "image_url", staged, dir_name="mails")
 
 
 class Question(models.Model):
@@ -75,21 +75,26 @@ class Question(models.Model):
     answer = models.TextField(blank=True, null = True)
     answer_type = models.CharField(max_length=30, default="descriptive")  # 'text', 'image', etc.
     max_attempts = models.IntegerField(default=3)
+    # Accepted answers ("a | b | c") folded once at save time, see api.matching
+    normalized_answers = models.JSONField(default=list, blank=True, editable=False)
+    answer_version = models.PositiveIntegerField(default=0, editable=False)  # bumped on every save
+    answer_tolerance = models.PositiveSmallIntegerField(default=0)  # typos allowed (edit distance), 0 = exact
     # mystery = models.ForeignKey(Mystery, related_name="user_questions", on_delete=models.CASCADE )
 
     def __str__(self):
         return f"Q{self.id} - {self.level.name}"
     
     def save(self, *args, **kwargs):
+        from .matching import normalize_answers
+
         print("Saving Question:", self.question)
-        if self.question_image :
-            print("Uploading question image to Google Drive...")
-            drive_url = upload_file_to_drive(self.question_image, dir_name="questions")
-            print("Drive URL:", drive_url)
-            self.question_image_url = drive_url
-            self.question_image.delete(save=False)  # cleanup local file
-            self.question_image = None
-        return super().save(*args, **kwargs)
+        self.normalized_answers = normalize_answers(self.answer)
+        self.answer_version += 1  # cached matchers of the old version are no longer used
+        staged = stage_image(self, "question_image")
+        result = super().save(*args, **kwargs)
+        if staged:
+            enqueue_upload(self, "question_image_url", staged, dir_name="questions")
+        return result
 
 class Present(models.Model):
     level = models.OneToOneField(Level, related_name="present", on_delete=models.CASCADE)
@@ -104,14 +109,10 @@ class Present(models.Model):
     
     def save(self, *args, **kwargs):
         print("Saving Question:", self.title)
-        if self.image :
-            print("Uploading question image to Google Drive...")
-            drive_url = upload_file_to_drive(self.image, dir_name="presents")
-            print("Drive URL:", drive_url)
-            self.image_url = drive_url
-            self.image.delete(save=False)  # cleanup local file
-            self.image = None
+        staged = stage_image(self, "image")
         super().save(*args, **kwargs)
+        if staged:
+            enqueue_upload(self, "image_url", staged, dir_name="presents")
 
 
 class UserProgress(models.Model):
@@ -121,11 +122,64 @@ class UserProgress(models.Model):
     collected_presents = models.ManyToManyField(Present, blank=True, related_name="collected_by")
     unlocked_levels = models.ManyToManyField(Level, blank=True, related_name="unlocked_by")
     total_attempts = models.IntegerField(default=0)
-    
+
+    class Meta:
+        constraints = [
+            # One row per player and mystery; concurrent first submits can't create two
+            models.UniqueConstraint(fields=["user", "mystery"], name="unique_user_progress"),
+        ]
 
     def __str__(self):
         return f"Progress of {self.user.username}"
 
+
+class ProgressSnapshot(models.Model):
+    """
+    Denormalized copy of one player's state in one mystery, so reading it is a single
+    indexed lookup instead of rebuilding sets from the UserProgress M2M tables,
+    UserAnswer and Review. Kept in sync by api.progress inside the same transactions
+    that change the underlying rows.
+    """
+    user = models.ForeignKey(User, related_name="progress_snapshots", on_delete=models.CASCADE)
+    mystery = models.ForeignKey(Mystery, related_name="progress_snapshots", on_delete=models.CASCADE)
+    current_level = models.ForeignKey(Level, null=True, blank=True, related_name="+", on_delete=models.SET_NULL)
+    completed_level_ids = models.JSONField(default=list, blank=True)
+    unlocked_level_ids = models.JSONField(default=list, blank=True)
+    collected_present_ids = models.JSONField(default=list, blank=True)
+    solved_question_ids = models.JSONField(default=list, blank=True)
+    review_states = models.JSONField(default=dict, blank=True)  # {"<question_id>": "pending" | "approved" | "rejected"}
+    answers_submitted = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "mystery"], name="unique_progress_snapshot"),
+        ]
+
+    def __str__(self):
+        return f"Snapshot of {self.user_id} in mystery {self.mystery_id}"
+
+    @staticmethod
+    def _add(values, value):
+        if value is not None and value not in values:
+            values.append(value)
+
+    def mark_level_completed(self, level_id, next_level_id=None, present_id=None):
+        self._add(self.completed_level_ids, level_id)
+        self._add(self.unlocked_level_ids, next_level_id)
+        self._add(self.collected_present_ids, present_id)
+        self.current_level_id = next_level_id or level_id
+
+    def mark_solved(self, question_id):
+        self._add(self.solved_question_ids, question_id)
+
+    def set_review_state(self, question_id, status):
+        self.review_states[str(question_id)] = status
+
+    def review_statuses(self):
+        """{question_id (int): status} for serializers."""
+        return {int(qid): status for qid, status in self.review_states.items()}
+
 class UserAnswer(models.Model):
     user = models.ForeignKey(User, related_name="answers", on_delete=models.CASCADE)
     question = models.ForeignKey(Question, related_name="user_answers", on_delete=models.CASCADE)
@@ -135,25 +189,25 @@ class UserAnswer(models.Model):
     answer_image = models.ImageField(upload_to="answers/", blank=True, null=True)  # <── new field
     answer_image_url = models.URLField(blank=True, null=True)  # <── Drive link
 
+    class Meta:
+        # Answer-status lookups: a user's (correct) answers to a set of questions
+        indexes = [models.Index(fields=["user", "question", "is_correct"])]
+        constraints = [
+            # A question is solved once per player, however many requests race
+            models.UniqueConstraint(
+                fields=["user", "question"], condition=models.Q(is_correct=True), name="unique_correct_answer"
+            ),
+        ]
+
     def __str__(self):
         return f"Answer by {self.user.username} for Q{self.question.id}"
     
     def save(self, *args, **kwargs):
         print("Saving Answer:", self.question)
-        if self.answer_image :
-            print("Uploading answer image to Google Drive...")
-            drive_url = upload_file_to_drive(self.answer_image, dir_name="answers")
-            print("Drive URL:", drive_url)
-            self.answer_image_url = drive_url
-            self.answer_image.delete(save=False)  # cleanup local file
-            self.answer_image = None
+        staged = stage_image(self, "answer_image")
         super().save(*args, **kwargs)
-
-
-from django.db import models
-from django.contrib.auth.models import User
-from django.utils import timezone
-from utils.gdrive import upload_file_to_drive
+        if staged:
+            enqueue_upload(self, "answer_image_url", staged, dir_name="answers")
 
 
 class Review(models.Model):
@@ -173,7 +227,17 @@ class Review(models.Model):
     reviewed_at = models.DateTimeField(blank=True, null=True)
     reviewer = models.ForeignKey(User, null=True, blank=True, related_name="reviewed", on_delete=models.SET_NULL)
     mystery = models.ForeignKey(Mystery, related_name="user_reviews", on_delete=models.CASCADE)
-
+    # Review-queue lease: a moderator holds the review until claim_expires_at
+    claimed_by = models.ForeignKey(User, null=True, blank=True, related_name="claimed_reviews", on_delete=models.SET_NULL)
+    claim_expires_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            # Review statuses of one user in one mystery, answered from the index alone
+            models.Index(fields=["user", "mystery", "question", "status"]),
+            # Moderator queue: pending reviews of a mystery in (created_at, id) order
+            models.Index(fields=["mystery", "status", "created_at", "id"]),
+        ]
 
     def __str__(self):
         return f"Review for {self.question} by {self.user.username} - {self.status}"
@@ -181,25 +245,29 @@ class Review(models.Model):
     def save(self, *args, **kwargs):
         """
         Custom save:
-        - Upload image to Google Drive if provided.
+        - Queue the image for a background upload to Google Drive if provided.
         - When status changes to 'approved':
           → Create UserAnswer
           → Mark the level as completed
           → Unlock next level
           → Award present (if any)
         """
+        from .progress import record_review_state
+
         print("Saving Review ...")
-        # ---- Handle image upload to Google Drive ----
+        # ---- Stage image for background upload to Google Drive ----
+        staged = None
         if self.answer_image and not self.answer_image_url:
-            print("[Review] Uploading answer image to Google Drive...")
-            drive_url = upload_file_to_drive(self.answer_image, dir_name="review_answers")
-            self.answer_image_url = drive_url
-            self.answer_image.delete(save=False)  # cleanup local file
-            self.answer_image = None
-            print("[Review] Drive URL saved:", drive_url)
+            print("[Review] Staging answer image for Google Drive upload...")
+            staged = stage_image(self, "answer_image")
 
+        created = self.pk is None
         super().save(*args, **kwargs)
 
+        if staged:
+            enqueue_upload(self, "answer_image_url", staged, dir_name="review_answers")
+        record_review_state(self, created=created)
+
         # ---- If approved, finalize ----
         if self.status == "approved":
             self._finalize_review()
@@ -207,54 +275,127 @@ class Review(models.Model):
     def _finalize_review(self):
         """
         Move data from Review → UserAnswer when approved
-        and update user progress.
+        and update user progress (see api.reviews).
         """
-        print("Approving review!!")
-        from .models import UserAnswer, UserProgress, Level  # avoid circular import
-
-        print(f"[Review] Finalizing approved review for question {self.question.id}")
+        from .models import UserAnswer  # avoid circular import
+        from .reviews import apply_review_approvals
 
         # Avoid duplicate finalization
-        if UserAnswer.objects.filter(user=self.user, question=self.question).exists():
+        if UserAnswer.objects.filter(user_id=self.user_id, question_id=self.question_id, is_correct=True).exists():
             print("[Review] Skipping finalization, UserAnswer already exists.")
             return
 
-        # Create UserAnswer entry
-        user_answer = UserAnswer.objects.create(
-            user=self.user,
-            question=self.question,
-            attempts=1,
-            answer_text=self.answer_text or "",
-            answer_image_url=self.answer_image_url,
-        )
-        print(f"[Review] UserAnswer created: {user_answer.id}")
-
-        # Update progress
-        progress, _ = UserProgress.objects.get_or_create(user=self.user)
-        current_level = self.question.level
-        
-        for questions in current_level.questions.all():
-            if not UserAnswer.objects.filter(user=self.user, question=questions).exists():
-                print("[Backend] Level NOT completed due to pending/unanswered questions.")
-                break
-        else:
-            next_level = Level.objects.filter(id__gt=current_level.id).order_by("id").first()
-            if next_level:
-                if current_level not in progress.completed_levels.all():
-                    progress.completed_levels.add(current_level)
-                    print("Progress added")
-                if next_level not in progress.unlocked_levels.all():
-                    progress.unlocked_levels.add(next_level)
-                    progress.save()
-                print(f"[Backend] Unlocked next level: ID={next_level.id}, Name='{next_level.name}'")
-                if hasattr(current_level, "present") and current_level.present :
-                    if current_level.present not in progress.collected_presents.all():
-                        progress.collected_presents.add(current_level.present)
-                        progress.save()
-
-
-        progress.save()
-        self.reviewed_at = timezone.now()
-        super().save(update_fields=["reviewed_at"])
+        print(f"[Review] Finalizing approved review for question {self.question_id}")
+        with transaction.atomic():
+            # Create UserAnswer, complete level, unlock next one, award present
+            apply_review_approvals([self])
+            self.reviewed_at = timezone.now()
+            super().save(update_fields=["reviewed_at"])
 
         print("[Review] Review finalization complete.")
+
+
+class AnswerAttempt(models.Model):
+    """
+    Attempt counter of one player on one question: max_attempts is enforced with
+    a single lookup on the (user, question) unique index, and increments are
+    atomic F() updates.
+    """
+    user = models.ForeignKey(User, related_name="answer_attempts", on_delete=models.CASCADE)
+    question = models.ForeignKey(Question, related_name="attempt_counters", on_delete=models.CASCADE)
+    attempts = models.PositiveIntegerField(default=0)
+    last_attempt_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "question"], name="unique_answer_attempt"),
+        ]
+
+    def __str__(self):
+        return f"{self.attempts} attempt(s) by {self.user_id} on Q{self.question_id}"
+
+
+class AnswerSubmission(models.Model):
+    """
+    Result of one keyed answer submission, so a retried request (same user and
+    submission key) gets the same response instead of being processed twice.
+    """
+    user = models.ForeignKey(User, related_name="answer_submissions", on_delete=models.CASCADE)
+    question = models.ForeignKey(Question, related_name="submissions", on_delete=models.CASCADE)
+    submission_key = models.CharField(max_length=64)
+    response = models.JSONField(default=dict)
+    status_code = models.PositiveSmallIntegerField(default=200)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "submission_key"], name="unique_submission_key"),
+        ]
+
+    def __str__(self):
+        return f"Submission {self.submission_key} by {self.user_id} for Q{self.question_id}"
+
+
+class UploadJob(models.Model):
+    """
+    A file staged on local disk, waiting to be pushed to Drive by a background worker.
+    Once uploaded, the Drive link is written into `url_field` of the owning row.
+    """
+    STATUS_CHOICES = [
+        ("pending", "Pending"),
+        ("uploading", "Uploading"),
+        ("done", "Done"),
+        ("failed", "Failed"),
+    ]
+
+    model_label = models.CharField(max_length=100)  # e.g. "api.Question"
+    object_id = models.PositiveBigIntegerField()
+    url_field = models.CharField(max_length=50)
+    dir_name = models.CharField(max_length=50, blank=True)
+    staged_path = models.CharField(max_length=500)
+    file_name = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=100, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="pending")
+    attempts = models.IntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["status", "next_attempt_at"])]
+
+    def __str__(self):
+        return f"Upload of {self.file_name} → {self.model_label}#{self.object_id}.{self.url_field} ({self.status})"
+
+
+class MailJob(models.Model):
+    """
+    A hint mail waiting in the outbox: GetHint only records it, a background
+    worker renders and delivers it (see api.mail_outbox).
+    """
+    STATUS_CHOICES = [
+        ("pending", "Pending"),
+        ("sending", "Sending"),
+        ("sent", "Sent"),
+        ("failed", "Failed"),
+    ]
+
+    user = models.ForeignKey(User, related_name="mail_jobs", on_delete=models.CASCADE)
+    mail = models.ForeignKey(Mails, related_name="jobs", on_delete=models.CASCADE)
+    recipient = models.EmailField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="pending")
+    attempts = models.IntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "next_attempt_at"]),
+            models.Index(fields=["user", "created_at"]),  # per-user rate limit
+        ]
+
+    def __str__(self):
+        return f"Mail #{self.mail_id} → {self.recipient} ({self.status})"
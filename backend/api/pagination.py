@@ -0,0 +1,13 @@
+# api/pagination.py
+from rest_framework.pagination import CursorPagination
+
+
+class MysteryCursorPagination(CursorPagination):
+    """
+    Keyset pagination of the mystery catalogue, newest start first. The cursor
+    encodes the last (starts_at, id) seen, so deep pages cost the same as the first.
+    """
+    ordering = ("-starts_at", "-id")
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
@@ -0,0 +1,271 @@
+# api/progress.py
+from contextlib import contextmanager
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+from .level_graph import get_level_graph
+from .models import AnswerAttempt, ProgressSnapshot, Question, Present, Review, UserAnswer, UserProgress
+
+
+class LevelOutcome:
+    """Result of evaluating a level for one player."""
+
+    def __init__(self, completed, next_level_id=None, present=None):
+        self.completed = completed
+        self.next_level_id = next_level_id
+        self.present = present
+
+    def __bool__(self):
+        return self.completed
+
+    def __repr__(self):
+        return f"LevelOutcome(completed={self.completed}, next_level_id={self.next_level_id}, present={self.present})"
+
+
+def is_level_complete(user, level) -> bool:
+    """
+    True when the user has a correct answer for every question of the level;
+    a level without questions (e.g. an intro level) is always complete.
+    One aggregate query, whatever the number of questions.
+    """
+    answered_qids = UserAnswer.objects.filter(user=user, is_correct=True).values("question_id")
+    counts = Question.objects.filter(level=level).aggregate(
+        total=Count("id"),
+        answered=Count("id", filter=Q(id__in=answered_qids)),
+    )
+    return counts["answered"] == counts["total"]
+
+
+def evaluate_level(user, level, progress=None) -> LevelOutcome:
+    """
+    Decide whether a level is complete for the user and, if so, apply the result
+    in one transaction: mark it completed, unlock the next level of the mystery
+    and collect the level's present. Safe to call repeatedly.
+    """
+    if not is_level_complete(user, level):
+        print("[Backend] Level NOT completed due to pending/unanswered questions.")
+        return LevelOutcome(False)
+
+    next_level_id = get_level_graph(level.mystery_id).next_id(level.id)
+    present = Present.objects.filter(level=level).first()
+
+    with transaction.atomic():
+        if progress is None:
+            progress, _ = UserProgress.objects.get_or_create(user=user, mystery_id=level.mystery_id)
+        _add_m2m(UserProgress.completed_levels, progress, "level_id", [level.id])
+        if next_level_id:
+            _add_m2m(UserProgress.unlocked_levels, progress, "level_id", [next_level_id])
+            print(f"[Backend] Unlocked next level: ID={next_level_id}")
+        else:
+            print("[Backend] No further levels to unlock.")
+        if present:
+            _add_m2m(UserProgress.collected_presents, progress, "present_id", [present.id])
+        with update_progress_snapshot(user, level.mystery_id) as snapshot:
+            snapshot.mark_level_completed(level.id, next_level_id, present.id if present else None)
+
+    return LevelOutcome(True, next_level_id=next_level_id, present=present)
+
+
+def _add_m2m(descriptor, progress, target_field, target_ids):
+    """
+    Insert M2M rows in one statement, skipping ones that already exist
+    (instead of .add(), which first SELECTs the existing rows).
+    """
+    through = descriptor.through
+    through.objects.bulk_create(
+        [through(userprogress_id=progress.id, **{target_field: target_id}) for target_id in target_ids],
+        ignore_conflicts=True,
+    )
+
+
+def _mystery_question_ids(mystery_id):
+    return Question.objects.filter(level__mystery_id=mystery_id).values("id")
+
+
+def answer_status_for_mystery(user, mystery_id):
+    """
+    Returns (correct_question_ids, {question_id: review_status}) for one mystery.
+    Both lookups are scoped to the mystery and read only indexed columns
+    (UserAnswer(user, question, is_correct), Review(user, mystery, question, status)),
+    so their cost doesn't grow with the player's history in other mysteries.
+    """
+    correct_qids = set(
+        UserAnswer.objects.filter(user=user, is_correct=True, question_id__in=_mystery_question_ids(mystery_id))
+        .values_list("question_id", flat=True)
+        .distinct()
+    )
+    # Ordered by id so the latest review of a question wins
+    reviews = Review.objects.filter(user=user, mystery_id=mystery_id).order_by("id").values_list("question_id", "status")
+    return correct_qids, dict(reviews)
+
+
+class LevelState:
+    """One player's state for one level, loaded for all of its questions at once."""
+
+    def __init__(self, level_id, attempt_counts, correct_answer_qids, review_statuses, unlocked_ids, completed_ids):
+        self.level_id = level_id
+        self.attempt_counts = attempt_counts  # {question_id: number of answers}
+        self.correct_answer_qids = correct_answer_qids
+        self.review_statuses = review_statuses  # {question_id: status}
+        self.unlocked_ids = unlocked_ids
+        self.completed_ids = completed_ids
+
+
+def unlocked_level_ids(snapshot, graph):
+    """Unlocked levels: the recorded ones, the first level and every level after a completed one."""
+    unlocked_ids = set(snapshot.unlocked_level_ids)
+    if graph.first_id:
+        unlocked_ids.add(graph.first_id)
+    return unlocked_ids | graph.successors_of(set(snapshot.completed_level_ids))
+
+
+def load_level_state(user, level) -> LevelState:
+    """
+    Everything the level-detail serializers need about the player, in two queries
+    (snapshot lookup + the level's attempt counters) whatever the number of questions.
+    """
+    snapshot = get_progress_snapshot(user, level.mystery_id)
+    attempt_counts = dict(
+        AnswerAttempt.objects.filter(user=user, question__level_id=level.id).values_list("question_id", "attempts")
+    )
+    return LevelState(
+        level.id,
+        attempt_counts,
+        set(snapshot.solved_question_ids),
+        snapshot.review_statuses(),
+        unlocked_level_ids(snapshot, get_level_graph(level.mystery_id)),
+        set(snapshot.completed_level_ids),
+    )
+
+
+# ---------------------------------------------------
+# Attempt ledger
+# ---------------------------------------------------
+def attempt_count(user, question) -> int:
+    """Attempts the user has used on a question: one lookup on the (user, question) index."""
+    return AnswerAttempt.objects.filter(user=user, question=question).values_list("attempts", flat=True).first() or 0
+
+
+def record_attempt(user, question, mystery_id=None):
+    """
+    Count one attempt on a question (and in UserProgress.total_attempts) with
+    atomic F() increments, so concurrent requests never lose a count.
+    """
+    if mystery_id is None:
+        mystery_id = question.level.mystery_id
+    now = timezone.now()
+    with transaction.atomic():
+        counters = AnswerAttempt.objects.filter(user=user, question=question)
+        if not counters.update(attempts=F("attempts") + 1, last_attempt_at=now):
+            try:
+                with transaction.atomic():
+                    AnswerAttempt.objects.create(user=user, question=question, attempts=1, last_attempt_at=now)
+            except IntegrityError:
+                # Created concurrently by another request
+                counters.update(attempts=F("attempts") + 1, last_attempt_at=now)
+        UserProgress.objects.filter(user=user, mystery_id=mystery_id).update(total_attempts=F("total_attempts") + 1)
+
+
+# ---------------------------------------------------
+# Progress snapshot
+# ---------------------------------------------------
+def rebuild_progress_snapshot(user, mystery_id) -> ProgressSnapshot:
+    """
+    (Re)build a user's snapshot for one mystery from the source tables
+    (UserProgress M2M, UserAnswer, Review). Used to backfill players who have no
+    snapshot yet; afterwards it is maintained incrementally. user may be a User or its id.
+    """
+    user_id = getattr(user, "pk", user)
+    graph = get_level_graph(mystery_id)
+    with transaction.atomic():
+        progress, created = UserProgress.objects.get_or_create(user_id=user_id, mystery_id=mystery_id)
+        if created and graph.first_id:
+            _add_m2m(UserProgress.unlocked_levels, progress, "level_id", [graph.first_id])
+
+        completed = list(UserProgress.completed_levels.through.objects.filter(userprogress_id=progress.id).values_list("level_id", flat=True))
+        unlocked = list(UserProgress.unlocked_levels.through.objects.filter(userprogress_id=progress.id).values_list("level_id", flat=True))
+        presents = list(UserProgress.collected_presents.through.objects.filter(userprogress_id=progress.id).values_list("present_id", flat=True))
+        solved, review_states = answer_status_for_mystery(user, mystery_id)
+        submitted = (
+            UserAnswer.objects.filter(user=user, question_id__in=_mystery_question_ids(mystery_id)).count()
+            + Review.objects.filter(user=user, mystery_id=mystery_id).count()
+        )
+        # Current level: the first one not completed yet, or the last level once all are done
+        remaining = [level_id for level_id in graph.level_ids if level_id not in completed]
+        current_level_id = remaining[0] if remaining else (graph.level_ids[-1] if graph.level_ids else None)
+
+        fields = {
+            "completed_level_ids": completed,
+            "unlocked_level_ids": unlocked,
+            "collected_present_ids": presents,
+            "solved_question_ids": sorted(solved),
+            "review_states": {str(qid): review_status for qid, review_status in review_states.items()},
+            "answers_submitted": submitted,
+            "current_level_id": current_level_id,
+        }
+        snapshot, created = ProgressSnapshot.objects.get_or_create(user_id=user_id, mystery_id=mystery_id, defaults=fields)
+        if not created:
+            for name, value in fields.items():
+                setattr(snapshot, name, value)
+            snapshot.save()
+    return snapshot
+
+
+def get_progress_snapshot(user, mystery_id) -> ProgressSnapshot:
+    """The user's snapshot for a mystery: one lookup on the (user, mystery) unique index."""
+    snapshot = ProgressSnapshot.objects.filter(user=user, mystery_id=mystery_id).first()
+    if snapshot is None:
+        snapshot = rebuild_progress_snapshot(user, mystery_id)
+    return snapshot
+
+
+@contextmanager
+def update_progress_snapshot(user, mystery_id):
+    """
+    Lock the user's snapshot row, let the caller change it, and save it — all in the
+    caller's transaction, so the snapshot commits (or rolls back) with the rows it mirrors.
+    snapshot.rebuilt is True when it was just built from the tables, i.e. it already
+    includes the rows the caller wrote before entering.
+    """
+    with transaction.atomic():
+        snapshot = ProgressSnapshot.objects.select_for_update().filter(user=user, mystery_id=mystery_id).first()
+        rebuilt = snapshot is None
+        if rebuilt:
+            rebuild_progress_snapshot(user, mystery_id)
+            snapshot = ProgressSnapshot.objects.select_for_update().get(user=user, mystery_id=mystery_id)
+        snapshot.rebuilt = rebuilt
+        yield snapshot
+        snapshot.save()
+
+
+def record_answer(user, question, mystery_id=None, **fields) -> UserAnswer:
+    """Create a UserAnswer and mirror it into the user's snapshot in one transaction."""
+    if mystery_id is None:
+        mystery_id = question.level.mystery_id
+    with transaction.atomic():
+        answer = UserAnswer(user=user, question=question, **fields)
+        answer.snapshot_synced = True  # mirrored below; see signals.user_answer_changed
+        answer.save()
+        with update_progress_snapshot(user, mystery_id) as snapshot:
+            if not snapshot.rebuilt:
+                snapshot.answers_submitted += 1
+            if answer.is_correct:
+                snapshot.mark_solved(question.id)
+    return answer
+
+
+def record_review_state(review, created=False):
+    """Mirror a review's status into the user's snapshot (called from Review.save)."""
+    with update_progress_snapshot(review.user, review.mystery_id) as snapshot:
+        if created and not snapshot.rebuilt:
+            snapshot.answers_submitted += 1
+        snapshot.set_review_state(review.question_id, review.status)
+
+
+def discard_progress_snapshot(user_id, mystery_id):
+    """
+    Drop a snapshot after a change made outside this module (admin edits, deletes);
+    the next read rebuilds it from the tables. Deleting never creates rows, so this
+    is safe inside cascading deletes.
+    """
+    ProgressSnapshot.objects.filter(user_id=user_id, mystery_id=mystery_id).delete()
@@ -0,0 +1,324 @@
+# api/reviews.py
+"""
+Review moderation in batches.
+
+Approving a review gives the player a correct UserAnswer for the question and,
+when that finishes a level, the level completion, the next level and the
+level's present. Here that is done for any number of reviews at once with a
+fixed number of set-based queries inside one transaction, instead of a
+Review.save() (and several queries) per review.
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+import base64
+from .level_graph import get_level_graph
+from .levels_cache import invalidate_user_levels
+from .models import ProgressSnapshot, Present, Question, Review, UserAnswer, UserProgress
+from .progress import rebuild_progress_snapshot
+
+_REVIEW_FIELDS = ("id", "user_id", "question_id", "mystery_id", "answer_text", "answer_image_url")
+
+# Review queue: how long a claim holds by default / at most, and the page size limits
+REVIEW_LEASE_SECONDS = 5 * 60
+REVIEW_MAX_LEASE_SECONDS = 60 * 60
+REVIEW_QUEUE_PAGE_SIZE = 50
+REVIEW_QUEUE_MAX_PAGE_SIZE = 200
+
+
+def approve_reviews(queryset, reviewer=None) -> int:
+    """Approve every not-yet-approved review of queryset and finalize them. Returns how many were approved."""
+    with transaction.atomic():
+        reviews = list(
+            Review.objects.select_for_update()
+            .filter(id__in=queryset.values("id"))
+            .exclude(status="approved")
+            .only(*_REVIEW_FIELDS)
+        )
+        if not reviews:
+            return 0
+        Review.objects.filter(id__in=[review.id for review in reviews]).update(
+            status="approved", reviewer=reviewer, reviewed_at=timezone.now(), claimed_by=None, claim_expires_at=None
+        )
+        apply_review_approvals(reviews)
+    print(f"[Reviews] Approved {len(reviews)} review(s)")
+    return len(reviews)
+
+
+def reject_reviews(queryset, reviewer=None) -> int:
+    """Reject every pending review of queryset. Returns how many were rejected."""
+    with transaction.atomic():
+        reviews = list(
+            Review.objects.select_for_update()
+            .filter(id__in=queryset.values("id"), status="pending")
+            .only(*_REVIEW_FIELDS)
+        )
+        if not reviews:
+            return 0
+        Review.objects.filter(id__in=[review.id for review in reviews]).update(
+            status="rejected", reviewer=reviewer, reviewed_at=timezone.now(), claimed_by=None, claim_expires_at=None
+        )
+        rejected = defaultdict(list)  # (user_id, mystery_id) → question ids
+        for review in reviews:
+            rejected[(review.user_id, review.mystery_id)].append(review.question_id)
+
+        def apply(snapshot, pair):
+            for question_id in rejected[pair]:
+                snapshot.set_review_state(question_id, "rejected")
+
+        _update_snapshots(set(rejected), apply)
+    print(f"[Reviews] Rejected {len(reviews)} review(s)")
+    return len(reviews)
+
+
+def apply_review_approvals(reviews):
+    """
+    Apply the results of approved reviews: UserAnswers (bulk_create), completed
+    levels, unlocked next levels and presents (bulk M2M inserts) and the progress
+    snapshots (bulk_update). Idempotent; must run inside a transaction.
+    """
+    # One result per (user, question); the latest review wins
+    latest = {}
+    for review in sorted(reviews, key=lambda r: r.id):
+        latest[(review.user_id, review.question_id)] = review
+    if not latest:
+        return
+    user_ids = {user_id for user_id, _ in latest}
+    question_ids = {question_id for _, question_id in latest}
+
+    question_levels = {
+        question_id: (level_id, mystery_id)
+        for question_id, level_id, mystery_id in Question.objects.filter(id__in=question_ids).values_list(
+            "id", "level_id", "level__mystery_id"
+        )
+    }
+
+    # ---- Correct answers ----
+    answered = set(
+        UserAnswer.objects.filter(user_id__in=user_ids, question_id__in=question_ids, is_correct=True).values_list(
+            "user_id", "question_id"
+        )
+    )
+    UserAnswer.objects.bulk_create(
+        [
+            UserAnswer(
+                user_id=user_id,
+                question_id=question_id,
+                is_correct=True,
+                attempts=1,
+                answer_text=review.answer_text or "",
+                answer_image_url=review.answer_image_url,
+            )
+            for (user_id, question_id), review in latest.items()
+            if (user_id, question_id) not in answered and question_id in question_levels
+        ],
+        ignore_conflicts=True,
+    )
+
+    # ---- Completed levels: every question of the level answered correctly ----
+    candidates = {
+        (user_id, question_levels[question_id][0]) for user_id, question_id in latest if question_id in question_levels
+    }
+    level_ids = {level_id for _, level_id in candidates}
+    level_mystery = {level_id: mystery_id for level_id, mystery_id in question_levels.values()}
+    totals = dict(
+        Question.objects.filter(level_id__in=level_ids).order_by().values("level_id").annotate(total=Count("id")).values_list("level_id", "total")
+    )
+    solved = (
+        UserAnswer.objects.filter(user_id__in=user_ids, is_correct=True, question__level_id__in=level_ids)
+        .order_by()
+        .values("user_id", "question__level_id")
+        .annotate(solved=Count("question_id", distinct=True))
+        .values_list("user_id", "question__level_id", "solved")
+    )
+    completed = {
+        (user_id, level_id)
+        for user_id, level_id, count in solved
+        if (user_id, level_id) in candidates and count == totals.get(level_id)
+    }
+
+    # ---- Progress rows, M2M inserts ----
+    pairs = {(user_id, question_levels[question_id][1]) for user_id, question_id in latest if question_id in question_levels}
+    progress_ids = _progress_ids(pairs)
+    presents = dict(Present.objects.filter(level_id__in={level_id for _, level_id in completed}).values_list("level_id", "id"))
+    next_levels = {level_id: get_level_graph(level_mystery[level_id]).next_id(level_id) for _, level_id in completed}
+
+    completed_rows, unlocked_rows, present_rows = [], [], []
+    for user_id, level_id in completed:
+        progress_id = progress_ids[(user_id, level_mystery[level_id])]
+        completed_rows.append((progress_id, level_id))
+        if next_levels[level_id]:
+            unlocked_rows.append((progress_id, next_levels[level_id]))
+        if level_id in presents:
+            present_rows.append((progress_id, presents[level_id]))
+    _bulk_add(UserProgress.completed_levels, "level_id", completed_rows)
+    _bulk_add(UserProgress.unlocked_levels, "level_id", unlocked_rows)
+    _bulk_add(UserProgress.collected_presents, "present_id", present_rows)
+    print(f"[Reviews] {len(latest)} answer(s) finalized, {len(completed)} level completion(s)")
+
+    # ---- Snapshots (and, through them, the LevelsView cache) ----
+    solved_by_pair = defaultdict(list)
+    for user_id, question_id in latest:
+        if question_id in question_levels:
+            solved_by_pair[(user_id, question_levels[question_id][1])].append(question_id)
+    completed_by_pair = defaultdict(list)
+    for user_id, level_id in completed:
+        completed_by_pair[(user_id, level_mystery[level_id])].append(level_id)
+
+    new_answers = defaultdict(int)  # answers_submitted counts UserAnswer rows too
+    for user_id, question_id in latest:
+        if (user_id, question_id) not in answered and question_id in question_levels:
+            new_answers[(user_id, question_levels[question_id][1])] += 1
+
+    def apply(snapshot, pair):
+        snapshot.answers_submitted += new_answers[pair]
+        for question_id in solved_by_pair[pair]:
+            snapshot.mark_solved(question_id)
+            snapshot.set_review_state(question_id, "approved")
+        for level_id in completed_by_pair[pair]:
+            snapshot.mark_level_completed(level_id, next_levels[level_id], presents.get(level_id))
+
+    _update_snapshots(pairs, apply)
+
+
+def _progress_ids(pairs):
+    """{(user_id, mystery_id): UserProgress id}, creating the missing rows."""
+    user_ids = {user_id for user_id, _ in pairs}
+    mystery_ids = {mystery_id for _, mystery_id in pairs}
+    progress_ids = {}
+    for progress_id, user_id, mystery_id in UserProgress.objects.filter(
+        user_id__in=user_ids, mystery_id__in=mystery_ids
+    ).values_list("id", "user_id", "mystery_id"):
+        progress_ids.setdefault((user_id, mystery_id), progress_id)
+    for user_id, mystery_id in pairs - progress_ids.keys():
+        # get_or_create: a submission may create the row concurrently (unique per user and mystery)
+        progress, _ = UserProgress.objects.get_or_create(user_id=user_id, mystery_id=mystery_id)
+        progress_ids[(user_id, mystery_id)] = progress.id
+    return progress_ids
+
+
+def _bulk_add(descriptor, target_field, rows):
+    """Insert (userprogress_id, target_id) M2M rows in one statement, skipping existing ones."""
+    if not rows:
+        return
+    through = descriptor.through
+    through.objects.bulk_create(
+        [through(userprogress_id=progress_id, **{target_field: target_id}) for progress_id, target_id in rows],
+        ignore_conflicts=True,
+    )
+
+
+def _update_snapshots(pairs, apply):
+    """
+    Lock the snapshots of (user_id, mystery_id) pairs, call apply(snapshot, pair)
+    on each and save them with one bulk_update. Missing snapshots are rebuilt
+    from the tables just written instead. bulk_update sends no signals, so the
+    players' LevelsView caches are invalidated here.
+    """
+    user_ids = {user_id for user_id, _ in pairs}
+    mystery_ids = {mystery_id for _, mystery_id in pairs}
+    snapshots = {
+        (snapshot.user_id, snapshot.mystery_id): snapshot
+        for snapshot in ProgressSnapshot.objects.select_for_update().filter(user_id__in=user_ids, mystery_id__in=mystery_ids)
+        if (snapshot.user_id, snapshot.mystery_id) in pairs
+    }
+    now = timezone.now()
+    for pair, snapshot in snapshots.items():
+        apply(snapshot, pair)
+        snapshot.updated_at = now  # bulk_update doesn't apply auto_now
+    ProgressSnapshot.objects.bulk_update(
+        list(snapshots.values()),
+        ["current_level", "completed_level_ids", "unlocked_level_ids", "collected_present_ids",
+         "solved_question_ids", "review_states", "answers_submitted", "updated_at"],
+        batch_size=500,
+    )
+    for user_id, mystery_id in pairs - snapshots.keys():
+        rebuild_progress_snapshot(user_id, mystery_id)
+    for user_id, mystery_id in pairs:
+        invalidate_user_levels(user_id, mystery_id)
+
+
+# ---------------------------------------------------
+# Moderator queue
+# ---------------------------------------------------
+def can_moderate(user, mystery) -> bool:
+    """Reviews of a mystery are worked by its creator and by staff."""
+    return bool(user and user.is_authenticated and (user.is_staff or mystery.created_by_id == user.id))
+
+
+def encode_queue_cursor(review) -> str:
+    raw = f"{review.created_at.isoformat()}|{review.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_queue_cursor(cursor):
+    """(created_at, id) of the last review of the previous page; ValueError if malformed."""
+    try:
+        created_at, review_id = base64.urlsafe_b64decode(cursor.encode()).decode().rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(review_id)
+    except (TypeError, ValueError) as e:  # includes binascii / unicode decode errors
+        raise ValueError("Invalid cursor") from e
+
+
+def _workable(queryset, reviewer, now):
+    """Pending reviews that are unclaimed, whose lease ran out, or that reviewer holds."""
+    return queryset.filter(status="pending").filter(
+        Q(claimed_by__isnull=True) | Q(claim_expires_at__lt=now) | Q(claimed_by=reviewer)
+    )
+
+
+def review_queue_page(mystery_id, reviewer, after=None, limit=REVIEW_QUEUE_PAGE_SIZE):
+    """
+    One page of a mystery's workable reviews in (created_at, id) order, using
+    keyset pagination: after is the decoded cursor of the previous page's last
+    review. Returns (reviews, next_cursor or None).
+    """
+    now = timezone.now()
+    queryset = _workable(Review.objects.filter(mystery_id=mystery_id), reviewer, now)
+    if after is not None:
+        created_at, review_id = after
+        queryset = queryset.filter(Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=review_id))
+    reviews = list(queryset.select_related("user", "question").order_by("created_at", "id")[:limit + 1])
+    if len(reviews) > limit:
+        reviews = reviews[:limit]
+        return reviews, encode_queue_cursor(reviews[-1])
+    return reviews, None
+
+
+def claim_reviews(mystery_id, reviewer, count, lease_seconds=REVIEW_LEASE_SECONDS):
+    """
+    Lease the next `count` workable reviews of a mystery to reviewer. Rows another
+    moderator is claiming at the same moment are skipped (SKIP LOCKED), so
+    parallel moderators get disjoint batches. Returns the claimed reviews.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            _workable(Review.objects.filter(mystery_id=mystery_id), reviewer, now)
+            .select_for_update(skip_locked=True)
+            .order_by("created_at", "id")
+            .values_list("id", flat=True)[:count]
+        )
+        Review.objects.filter(id__in=ids).update(
+            claimed_by=reviewer, claim_expires_at=now + timedelta(seconds=lease_seconds)
+        )
+    print(f"[Reviews] {reviewer} claimed {len(ids)} review(s) of mystery {mystery_id}")
+    return list(Review.objects.filter(id__in=ids).select_related("user", "question").order_by("created_at", "id"))
+
+
+def release_reviews(reviewer, review_ids) -> int:
+    """Give back reviews reviewer holds without deciding them."""
+    return Review.objects.filter(id__in=review_ids, claimed_by=reviewer, status="pending").update(
+        claimed_by=None, claim_expires_at=None
+    )
+
+
+def is_claimed_by_other(review, reviewer) -> bool:
+    return (
+        review.claimed_by_id is not None
+        and review.claimed_by_id != reviewer.id
+        and review.claim_expires_at is not None
+        and review.claim_expires_at > timezone.now()
+    )
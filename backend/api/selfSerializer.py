@@ -1,7 +1,13 @@
 
 from rest_framework import serializers
+from rest_framework.utils.encoders import JSONEncoder
 from django.contrib.auth.models import User
+from django.db.models import Prefetch
 from .models import Mystery, Level, Question, Present, Mails, Review, UserAnswer, UserProgress
+import json
+
+# Mysteries serialized per prefetch batch in streaming mode
+EXPORT_STREAM_CHUNK_SIZE = 20
 
 
 # -------------------------------
@@ -99,13 +105,13 @@ class UserAnswerSerializer(serializers.ModelSerializer):
 # -------------------------------
 class UserProgressSerializer(serializers.ModelSerializer):
     completedLevels = serializers.SlugRelatedField(
-        many=True, read_only=True, slug_field="name"
+        source="completed_levels", many=True, read_only=True, slug_field="name"
     )
     unlocked_levels = serializers.SlugRelatedField(
         many=True, read_only=True, slug_field="name"
     )
     collectedPresents = serializers.SlugRelatedField(
-        many=True, read_only=True, slug_field="title"
+        source="collected_presents", many=True, read_only=True, slug_field="title"
     )
     totalAttempts = serializers.IntegerField(source='total_attempts')
     class Meta:
@@ -149,3 +155,42 @@ class FullMysterySerializer(serializers.ModelSerializer):
             "user_reviews",
             "user_progress",
         ]
+
+
+# -------------------------------
+# Creator export query plan
+# -------------------------------
+def full_mystery_queryset():
+    """
+    Mysteries with everything FullMysterySerializer reads loaded up front:
+    a fixed number of queries (10) however many mysteries, levels, questions,
+    reviews or players there are.
+    """
+    return Mystery.objects.select_related("created_by").prefetch_related(
+        "participants",
+        Prefetch(
+            "levels",
+            queryset=Level.objects.order_by("position", "id")
+            .select_related("present")
+            .prefetch_related("questions__hint_mail"),
+        ),
+        Prefetch("user_reviews", queryset=Review.objects.select_related("user", "question__level")),
+        Prefetch(
+            "user_progress",
+            queryset=UserProgress.objects.prefetch_related("completed_levels", "unlocked_levels", "collected_presents"),
+        ),
+    )
+
+
+def stream_full_mysteries(queryset, chunk_size=EXPORT_STREAM_CHUNK_SIZE):
+    """
+    Yield a JSON array of FullMysterySerializer data piece by piece. Mysteries are
+    fetched (with their prefetches) chunk_size at a time, so memory stays flat and
+    the first bytes reach the client before the whole export is built.
+    """
+    yield "["
+    for index, mystery in enumerate(queryset.iterator(chunk_size=chunk_size)):
+        if index:
+            yield ","
+        yield json.dumps(FullMysterySerializer(mystery).data, cls=JSONEncoder)
+    yield "]"
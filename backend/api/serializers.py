@@ -2,6 +2,47 @@ from rest_framework import serializers
 from .models import (
     Mystery, Level, Question, Present, UserProgress, UserAnswer, Review, Mails
 )
+from .progress import load_level_state
+
+
+def question_status(question, correct_answer_qids, review_statuses):
+    """
+    Returns { completed: bool, pending: bool } for one question, from the
+    player's correct answers and review statuses loaded for the whole level.
+    """
+    if question.id not in correct_answer_qids:
+        return {"completed": False, "pending": False}
+
+    # For reviewable questions
+    if question.answer_type in ["descriptive-review", "image-review"]:
+        status = review_statuses.get(question.id)
+        if status == "pending":
+            return {"completed": False, "pending": True}
+        elif status == "approved":
+            return {"completed": True, "pending": False}
+        elif status is None:
+            return {"completed": False, "pending": True}
+        return {"completed": False, "pending": False}
+
+    # Otherwise, normal question
+    return {"completed": True, "pending": False}
+
+
+def level_state(serializer, level):
+    """
+    The player's LevelState for a level, shared through the serializer context
+    (LevelDetailView loads it up front; otherwise it's loaded once, on first use).
+    """
+    request = serializer.context.get("request")
+    user = getattr(request, "user", None)
+    if not user or user.is_anonymous:
+        return None
+    state = serializer.context.get("level_state")
+    if state is None or state.level_id != level.id:
+        state = load_level_state(user, level)
+        serializer.context["level_state"] = state
+    return state
+
 
 # =====================================================
 # 🔹 Question Serializer
@@ -26,41 +67,22 @@ class QuestionSerializer(serializers.ModelSerializer):
         return f"q{obj.id}"
 
     def get_levelId(self, obj):
-        return f"level-{obj.level.id}"
+        return f"level-{obj.level_id}"
 
     def get_attempts(self, obj):
-        request = self.context.get("request")
-        if not request or not request.user or request.user.is_anonymous:
+        state = level_state(self, obj.level)
+        if state is None:
             return 0
-        return UserAnswer.objects.filter(user=request.user, question=obj).count()
+        return state.attempt_counts.get(obj.id, 0)
 
     def get_status(self, obj):
         """
         Returns { completed: bool, pending: bool }
         """
-        request = self.context.get("request")
-        user = getattr(request, "user", None)
-        if not user or user.is_anonymous:
-            return {"completed": False, "pending": False}
-
-        correct_answer = UserAnswer.objects.filter(user=user, question=obj, is_correct=True).first()
-        if not correct_answer:
+        state = level_state(self, obj.level)
+        if state is None:
             return {"completed": False, "pending": False}
-
-        # For reviewable questions
-        if obj.answer_type in ["descriptive-review", "image-review"]:
-            review = Review.objects.filter(user=user, question=obj).first()
-            if review:
-                if review.status == "pending":
-                    return {"completed": False, "pending": True}
-                elif review.status == "approved":
-                    return {"completed": True, "pending": False}
-                elif review.status == "rejected":
-                    return {"completed": False, "pending": False}
-            return {"completed": False, "pending": True}
-
-        # Otherwise, normal question
-        return {"completed": True, "pending": False}
+        return question_status(obj, state.correct_answer_qids, state.review_statuses)
 
 
 # =====================================================
@@ -106,23 +128,11 @@ class LevelQuestionSerializer(serializers.ModelSerializer):
         return f"q{obj.id}"
 
     def get_status(self, obj):
-        correct_answer_qids = self.context.get("correct_answer_qids", set())
-        review_statuses = self.context.get("review_statuses", {})
-
-        if obj.id not in correct_answer_qids:
-            return {"completed": False, "pending": False}
-
-        if obj.answer_type in ["descriptive-review", "image-review"]:
-            status = review_statuses.get(obj.id)
-            if status == "pending":
-                return {"completed": False, "pending": True}
-            elif status == "approved":
-                return {"completed": True, "pending": False}
-            elif status is None:
-                return {"completed": False, "pending": True}
-            return {"completed": False, "pending": False}
-
-        return {"completed": True, "pending": False}
+        return question_status(
+            obj,
+            self.context.get("correct_answer_qids", set()),
+            self.context.get("review_statuses", {}),
+        )
 
 
 # =====================================================
@@ -182,21 +192,12 @@ class SingleLevelSerializer(serializers.ModelSerializer):
         return f"level-{obj.id}"
 
     def get_isUnlocked(self, obj):
-        request = self.context.get("request")
-        user = getattr(request, "user", None)
-        if not user or user.is_anonymous:
-            return False
-        progress, _ = UserProgress.objects.get_or_create(user=user)
-        first_level = Level.objects.order_by("id").first()
-        return obj.id == first_level.id or obj in progress.unlocked_levels.all()
+        state = level_state(self, obj)
+        return state is not None and obj.id in state.unlocked_ids
 
     def get_isCompleted(self, obj):
-        request = self.context.get("request")
-        user = getattr(request, "user", None)
-        if not user or user.is_anonymous:
-            return False
-        progress, _ = UserProgress.objects.get_or_create(user=user)
-        return obj in progress.completed_levels.all()
+        state = level_state(self, obj)
+        return state is not None and obj.id in state.completed_ids
 
     def get_present(self, obj):
         if self.get_isCompleted(obj) and hasattr(obj, "present") and obj.present:
@@ -218,6 +219,40 @@ class UserProgressSerializer(serializers.ModelSerializer):
         return PresentSerializer(obj.collected_presents.all(), many=True, context=self.context).data
 
 
+# =====================================================
+# 🔹 Review Queue Serializer (moderators)
+# =====================================================
+class ReviewQueueSerializer(serializers.ModelSerializer):
+    user = serializers.CharField(source="user.username")
+    questionId = serializers.SerializerMethodField()
+    question = serializers.CharField(source="question.question")
+    answerText = serializers.CharField(source="answer_text", allow_null=True)
+    image = serializers.SerializerMethodField()
+    thumbnail = serializers.SerializerMethodField()
+    createdAt = serializers.DateTimeField(source="created_at")
+    claimedBy = serializers.IntegerField(source="claimed_by_id", allow_null=True)
+    claimExpiresAt = serializers.DateTimeField(source="claim_expires_at", allow_null=True)
+
+    class Meta:
+        model = Review
+        fields = [
+            "id", "user", "questionId", "question", "answerText", "image", "thumbnail",
+            "status", "createdAt", "claimedBy", "claimExpiresAt",
+        ]
+
+    def get_questionId(self, obj):
+        return f"q{obj.question_id}"
+
+    def get_image(self, obj):
+        match = re.search(r"id=([^&]+)", obj.answer_image_url or "")
+        return match.group(1) if match else None
+
+    def get_thumbnail(self, obj):
+        # Served from the derivative cache of the image proxy, not rendered per request
+        image_id = self.get_image(obj)
+        return f"/game/image/{image_id}/?size=thumb" if image_id else None
+
+
 class MysterySerializer(serializers.ModelSerializer):
     is_active = serializers.SerializerMethodField()
     image = serializers.URLField(source='image_url', allow_null=True)
@@ -227,15 +262,33 @@ class MysterySerializer(serializers.ModelSerializer):
         fields = ['id', 'name' , 'description', 'image' , 'is_active', 'created_by' , 'starts_at' , 'ends_at', 'home_page' , "join_status"]
 
     def get_is_active(self, obj):
-        return obj.is_active()
+        return obj.is_active(self.context.get("now"))
+
     def get_join_status(self, obj):
         request = self.context.get("request")
         user = getattr(request, "user", None)
         if not user or user.is_anonymous:
             return False
+        joined_ids = self.context.get("joined_ids")
+        if joined_ids is not None:
+            return obj.id in joined_ids
         if obj.participants.filter(id=user.id).exists():
             return True
         return False
+
+
+def mystery_list_context(request):
+    """
+    Serializer context for listing many mysteries: the user's joined mystery ids
+    (one query) and a single `now`, instead of one query and one clock read per row.
+    """
+    from django.utils import timezone
+
+    user = getattr(request, "user", None)
+    joined_ids = set()
+    if user and not user.is_anonymous:
+        joined_ids = set(user.mysteries.values_list("id", flat=True))
+    return {"request": request, "joined_ids": joined_ids, "now": timezone.now()}
     
 
 
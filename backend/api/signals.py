@@ -0,0 +1,144 @@
+from django.db.models.signals import pre_save, post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+from .models import Level, Mystery, Present, ProgressSnapshot, Question, Review, UserAnswer, UserProgress
+from .level_graph import invalidate_level_graph
+from .levels_cache import invalidate_mystery_levels, invalidate_user_levels
+from .progress import discard_progress_snapshot
+from .uploads import upload_completed
+
+
+@receiver(upload_completed, sender=Review)
+def copy_review_image_to_answer(sender, instance_pk, url_field, url, **kwargs):
+    """
+    A review may be approved before its image reached Drive; the UserAnswer
+    created on approval then has no image link yet, so fill it in now.
+    """
+    review = Review.objects.filter(pk=instance_pk).only("user_id", "question_id").first()
+    if review is None:
+        return
+    UserAnswer.objects.filter(
+        user_id=review.user_id, question_id=review.question_id, answer_image_url__isnull=True
+    ).update(answer_image_url=url)
+
+
+# ---- Level graph invalidation ----
+@receiver(pre_save, sender=Level)
+def remember_previous_mystery(sender, instance, **kwargs):
+    # A level moved to another mystery changes the graphs of both mysteries
+    if instance.pk:
+        instance._previous_mystery_id = (
+            Level.objects.filter(pk=instance.pk).values_list("mystery_id", flat=True).first()
+        )
+
+
+@receiver(post_save, sender=Level)
+@receiver(post_delete, sender=Level)
+def level_changed(sender, instance, **kwargs):
+    invalidate_level_graph(instance.mystery_id)
+    invalidate_mystery_levels(instance.mystery_id)
+    previous = getattr(instance, "_previous_mystery_id", None)
+    if previous and previous != instance.mystery_id:
+        invalidate_level_graph(previous)
+        invalidate_mystery_levels(previous)
+
+
+# ---- LevelsView cache invalidation ----
+@receiver(post_save, sender=Mystery)
+@receiver(post_delete, sender=Mystery)
+def mystery_changed(sender, instance, **kwargs):
+    invalidate_mystery_levels(instance.id)
+
+
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+@receiver(post_save, sender=Present)
+@receiver(post_delete, sender=Present)
+def level_content_changed(sender, instance, **kwargs):
+    mystery_id = Level.objects.filter(pk=instance.level_id).values_list("mystery_id", flat=True).first()
+    if mystery_id:
+        invalidate_mystery_levels(mystery_id)
+
+
+@receiver(upload_completed, sender=Mystery)
+@receiver(upload_completed, sender=Question)
+@receiver(upload_completed, sender=Present)
+def content_image_uploaded(sender, instance_pk, **kwargs):
+    # The image link is written with update(), which sends no post_save
+    if sender is Mystery:
+        invalidate_mystery_levels(instance_pk)
+    else:
+        instance = sender.objects.filter(pk=instance_pk).only("level_id").first()
+        if instance:
+            level_content_changed(sender, instance)
+
+
+@receiver(post_save, sender=UserAnswer)
+@receiver(post_delete, sender=UserAnswer)
+def user_answer_changed(sender, instance, **kwargs):
+    mystery_id = Question.objects.filter(pk=instance.question_id).values_list("level__mystery_id", flat=True).first()
+    if mystery_id:
+        # Answers written by api.progress update the snapshot themselves; any other
+        # change (admin edit or delete) makes it stale
+        if not getattr(instance, "snapshot_synced", False):
+            discard_progress_snapshot(instance.user_id, mystery_id)
+        invalidate_user_levels(instance.user_id, mystery_id)
+
+
+# ---- Progress snapshot: changes made outside api.progress ----
+@receiver(post_delete, sender=Review)
+@receiver(post_delete, sender=UserProgress)
+def player_rows_deleted(sender, instance, **kwargs):
+    discard_progress_snapshot(instance.user_id, instance.mystery_id)
+
+
+@receiver(post_save, sender=UserProgress)
+def user_progress_saved(sender, instance, created, **kwargs):
+    # A new row is created by api.progress itself; an existing one is saved by the admin
+    if not created:
+        discard_progress_snapshot(instance.user_id, instance.mystery_id)
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+@receiver(post_save, sender=UserProgress)
+@receiver(post_delete, sender=UserProgress)
+@receiver(post_save, sender=ProgressSnapshot)
+@receiver(post_delete, sender=ProgressSnapshot)
+def player_state_changed(sender, instance, **kwargs):
+    # evaluate_level writes the UserProgress M2M rows with bulk_create (no m2m_changed),
+    # but always saves the ProgressSnapshot in the same transaction
+    invalidate_user_levels(instance.user_id, instance.mystery_id)
+
+
+@receiver(m2m_changed, sender=UserProgress.completed_levels.through)
+@receiver(m2m_changed, sender=UserProgress.unlocked_levels.through)
+@receiver(m2m_changed, sender=UserProgress.collected_presents.through)
+def progress_m2m_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    # api.progress writes these rows with bulk_create (no m2m_changed), so this is an
+    # admin grant / reset: the snapshot no longer mirrors the tables
+    if not action.startswith("post_"):
+        return
+    if not reverse:
+        pairs = [(instance.user_id, instance.mystery_id)]
+    else:
+        # Changed from the Level / Present side: pk_set holds UserProgress ids (None on clear)
+        progresses = UserProgress.objects.all() if pk_set is None else UserProgress.objects.filter(pk__in=pk_set)
+        pairs = progresses.values_list("user_id", "mystery_id")
+    for user_id, mystery_id in pairs:
+        discard_progress_snapshot(user_id, mystery_id)
+        invalidate_user_levels(user_id, mystery_id)
+
+
+@receiver(m2m_changed, sender=Mystery.participants.through)
+def participants_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    # Cached payloads skip the participant check, so joining/leaving must drop them
+    if not action.startswith("post_"):
+        return
+    if not reverse:
+        if pk_set is None:
+            invalidate_mystery_levels(instance.id)
+        for user_id in pk_set or ():
+            invalidate_user_levels(user_id, instance.id)
+    else:
+        for mystery_id in pk_set or Mystery.objects.values_list("id", flat=True):
+            invalidate_user_levels(instance.id, mystery_id)
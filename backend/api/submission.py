@@ -0,0 +1,223 @@
+# api/submission.py
+"""
+Answer submission pipeline used by UserSubmitAnswer.
+
+Everything a submission reads and writes happens in one transaction that first
+locks the player's UserProgress row, so concurrent submits of one player run one
+after another: the duplicate and max-attempt checks can't be raced, and level
+completion isn't applied twice. A client-supplied submission key makes retries
+idempotent: the stored response of the first attempt is returned again (a key
+reused for another question is rejected with 409).
+"""
+from django.db import IntegrityError, transaction
+from rest_framework import status
+from .matching import answer_matches
+from .models import AnswerSubmission, Review, UserAnswer, UserProgress
+from .progress import attempt_count, evaluate_level, record_answer, record_attempt
+from .serializers import PresentSerializer
+
+SUBMISSION_KEY_HEADER = "HTTP_IDEMPOTENCY_KEY"
+SUBMISSION_KEY_MAX_LENGTH = 64
+
+
+class SubmissionResult:
+    """Response body and HTTP status of one submission."""
+
+    def __init__(self, data, status_code=status.HTTP_200_OK):
+        self.data = data
+        self.status_code = status_code
+
+
+def submission_key_from_request(request):
+    """The Idempotency-Key header, or `submission_key` in the body; None if absent."""
+    key = request.META.get(SUBMISSION_KEY_HEADER) or request.data.get("submission_key")
+    if not key:
+        return None
+    return str(key).strip()[:SUBMISSION_KEY_MAX_LENGTH] or None
+
+
+def submit_answer(user, question, data, files, submission_key=None) -> SubmissionResult:
+    """
+    Check and record one answer. Returns the SubmissionResult to send back;
+    with a submission_key, a retry gets the first attempt's result without
+    anything being recorded again.
+    """
+    level = question.level
+    try:
+        with transaction.atomic():
+            # Serializes this player's submissions for the mystery
+            progress, _ = UserProgress.objects.select_for_update().get_or_create(user=user, mystery_id=level.mystery_id)
+
+            if submission_key:
+                replay = _replay(user, question, submission_key)
+                if replay is not None:
+                    return replay
+
+            result = _process(user, question, level, progress, data, files)
+
+            if submission_key:
+                AnswerSubmission.objects.create(
+                    user=user,
+                    question=question,
+                    submission_key=submission_key,
+                    response=result.data,
+                    status_code=result.status_code,
+                )
+            return result
+
+    except IntegrityError as e:
+        # A concurrent request won the race (same key, or a second correct answer)
+        print(f"[Submit] Conflicting submission: {e}")
+        if submission_key:
+            replay = _replay(user, question, submission_key)
+            if replay is not None:
+                return replay
+        return SubmissionResult(
+            {"detail": "You have already answered this question."}, status.HTTP_400_BAD_REQUEST
+        )
+
+
+def _replay(user, question, submission_key):
+    """The stored result of an earlier submission with this key, or None if the key is new."""
+    previous = AnswerSubmission.objects.filter(user=user, submission_key=submission_key).first()
+    if previous is None:
+        return None
+    if previous.question_id != question.id:
+        # A reused key must not answer one question with another question's result
+        print(f"[Submit] Submission key {submission_key} was used for another question")
+        return SubmissionResult(
+            {"detail": "This submission key was already used for another question."}, status.HTTP_409_CONFLICT
+        )
+    print(f"[Submit] Replaying submission {submission_key}")
+    return SubmissionResult(previous.response, previous.status_code)
+
+
+def _unlock_next_level(user, level, progress):
+    """Complete the level if every question is answered; returns the present data or None."""
+    outcome = evaluate_level(user, level, progress)
+    if outcome.present:
+        return PresentSerializer(outcome.present).data
+    return None
+
+
+def _process(user, question, level, progress, data, files) -> SubmissionResult:
+    mystery_id = level.mystery_id
+
+    # ---- Prevent duplicate correct submissions ----
+    if UserAnswer.objects.filter(user=user, question=question, is_correct=True).exists():
+        _unlock_next_level(user, level, progress)
+        print("[Submit] Duplicate submission detected, rejecting")
+        return SubmissionResult({"detail": "You have already answered this question."}, status.HTTP_400_BAD_REQUEST)
+
+    # ---- Max Attempts Check (attempt ledger, one indexed lookup) ----
+    user_attempt_count = attempt_count(user, question)
+    max_attempts = question.max_attempts or 3
+    if user_attempt_count >= max_attempts:
+        print(f"[Submit] User reached max attempts ({max_attempts}), not saving new answer.")
+        if "review" in question.answer_type:
+            return SubmissionResult({"correct": None, "pending": True, "message": "Maximum review submissions reached."})
+        return SubmissionResult({"correct": False, "present": None, "message": "Maximum attempts reached."})
+
+    # ---- Parse incoming data ----
+    user_answer_text = (data.get("answer") or "").strip().lower()
+    image_file = files.get("answer_image")
+    print(f"[Submit] Parsed Answer Text: '{user_answer_text}'")
+    print(f"[Submit] Uploaded Image: {image_file}")
+
+    # ---- Handle answer based on type ----
+    answer_type = question.answer_type
+    is_correct = None  # default for descriptive/review
+
+    if "review" in answer_type:
+        print("[Submit] Handling REVIEW type question")
+        if answer_type == "descriptive-review" and not user_answer_text:
+            return SubmissionResult({"detail": "Answer text is required"}, status.HTTP_400_BAD_REQUEST)
+        if answer_type == "image-review" and not image_file:
+            return SubmissionResult({"detail": "Answer image is required"}, status.HTTP_400_BAD_REQUEST)
+
+        record_attempt(user, question, mystery_id)
+        Review.objects.create(
+            user=user,
+            question=question,
+            mystery_id=mystery_id,
+            answer_text=user_answer_text if answer_type == "descriptive-review" else None,
+            answer_image=image_file if answer_type == "image-review" else None,
+            status="pending",
+        )
+        return SubmissionResult({"correct": None, "pending": True, "message": "Answer submitted for review."})
+
+    elif "match" in answer_type:
+        print("[Submit] Handling MATCH type question")
+        if not user_answer_text:
+            return SubmissionResult({"detail": "Answer is required"}, status.HTTP_400_BAD_REQUEST)
+
+        is_correct = answer_matches(question, user_answer_text)
+        print(f"[Submit] MATCH result: {is_correct}")
+        record_attempt(user, question, mystery_id)
+        if not is_correct:
+            # Wrong guesses only count against the ledger; no answer row is stored
+            return SubmissionResult({"correct": False, "present": None})
+        record_answer(
+            user,
+            question,
+            mystery_id=mystery_id,
+            is_correct=True,
+            attempts=user_attempt_count + 1,
+            answer_text=user_answer_text,
+        )
+
+    elif "image" in answer_type:
+        print("[Submit] Handling IMAGE type question")
+        if not image_file:
+            return SubmissionResult({"detail": "Answer image is required"}, status.HTTP_400_BAD_REQUEST)
+
+        record_attempt(user, question, mystery_id)
+        record_answer(
+            user,
+            question,
+            mystery_id=mystery_id,
+            attempts=user_attempt_count + 1,
+            answer_image=image_file,
+        )
+        is_correct = True  # Treat image submission as correct automatically
+
+    elif "descriptive" in answer_type:
+        print("[Submit] Handling DESCRIPTIVE type question")
+        if not user_answer_text:
+            return SubmissionResult({"detail": "Answer is required"}, status.HTTP_400_BAD_REQUEST)
+
+        record_attempt(user, question, mystery_id)
+        record_answer(
+            user,
+            question,
+            mystery_id=mystery_id,
+            attempts=user_attempt_count + 1,
+            answer_text=user_answer_text,
+        )
+        is_correct = True  # under review
+
+    elif answer_type == "puzzle":
+        print("[Submit] Handling PUZZLE type question")
+        if user_answer_text == "puzzlesolved":
+            record_attempt(user, question, mystery_id)
+            record_answer(
+                user,
+                question,
+                mystery_id=mystery_id,
+                attempts=user_attempt_count + 1,
+                answer_text=user_answer_text,
+            )
+            is_correct = True
+
+    else:
+        print("[Submit] ERROR: Unknown question type:", answer_type)
+        return SubmissionResult({"detail": "Unknown question type"}, status.HTTP_400_BAD_REQUEST)
+
+    print("[Submit] UserAnswer saved successfully")
+    present_data = _unlock_next_level(user, level, progress)
+
+    return SubmissionResult({
+        "correct": is_correct,
+        "present": present_data,
+        "message": "Answer processed successfully" if is_correct else "Answer pending or incorrect",
+    })
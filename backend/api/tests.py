@@ -1,37 +1,866 @@
-# from utils.gdrive import upload_file_to_drive
-
-# with open("test.png", "rb") as f:
-#     class DummyFile:
-#         name = "Profile.png"
-#         def chunks(self): return [f.read()]
-
-#     url = upload_file_to_drive(DummyFile())
-#     print("Uploaded to:", url)
-
-# import sys
-# import os
-
-# # Go up one level from 'api' to the 'backend' directory
-# BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__))) 
-
-# # Add the 'backend' directory to Python's search path
-# sys.path.append(BASE_DIR)
-
-# from utils.mail.mail_service import *
-# # --- Main execution block ---
-# if __name__ == '__main__':
-#     print("🚀 Starting Gmail API standalone test...")
-
-#     # 1. Authenticate and get the service. A browser will open on the first run.
-#     service = get_gmail_service()
-    
-#     # 2. Define and create the test email.
-#     # IMPORTANT: Change the recipient to an email address you can check.
-#     recipient = 'anirudha6082005@gmail.com'
-#     subject = 'Gmail API Test from Python Script'
-#     body = 'Hello! If you received this, the test was successful.'
-    
-#     message = create_message('me', recipient, subject, body)
-    
-#     # 3. Send the email.
-#     send_message(service, 'me', message)
\ No newline at end of file
+from datetime import timedelta
+from unittest import mock
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from django.utils import timezone
+from django.contrib.auth.models import User
+from api.matching import AnswerMatcher, answer_matches, bounded_levenshtein, normalize_answer, normalize_answers
+from api.mail_outbox import MailRateLimited, build_hint_message, enqueue_hint_mail, process_pending_mails
+from api.models import (
+    AnswerSubmission, Level, MailJob, Mails, Mystery, Present, ProgressSnapshot, Question, Review, UploadJob,
+    UserAnswer, UserProgress,
+)
+from api.level_graph import get_level_graph
+from api.levels_cache import get_cached_levels, invalidate_mystery_levels, invalidate_user_levels, set_cached_levels
+from api.progress import (
+    attempt_count, evaluate_level, get_progress_snapshot, is_level_complete, rebuild_progress_snapshot, record_answer,
+)
+from api.reviews import (
+    approve_reviews, claim_reviews, decode_queue_cursor, encode_queue_cursor, reject_reviews, release_reviews,
+    review_queue_page,
+)
+from api.submission import submit_answer
+from api.uploads import process_pending_uploads
+from utils import image_access
+from utils.background import JobRunner
+from utils.disk_cache import DiskImageCache
+from utils.gdrive import file_id_from_url
+from utils.storage.local import LocalStorage
+from utils.singleflight import SingleFlight, SingleFlightTimeout
+from utils.image_derivatives import get_image_derivative
+from utils.image_response import build_image_response, etag_matches, make_etag, parse_range
+import hashlib
+import io
+import os
+import random
+import tempfile
+import threading
+import time
+
+
+# ---------------------------------------------------
+# Disk image cache
+# ---------------------------------------------------
+class DiskImageCacheTests(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.cache = DiskImageCache(tmp.name)
+
+    def test_put_and_read(self):
+        self.cache.put("file", b"abc", "image/png")
+        self.assertEqual(self.cache.read("file"), (b"abc", "image/png"))
+        self.assertEqual(self.cache.get_meta("file")["size"], 3)
+
+    def test_open_reader_keeps_its_version_across_overwrite(self):
+        self.cache.put("file", b"old bytes", "image/png")
+        f, meta = self.cache.open("file")
+        self.cache.put("file", b"new, longer bytes", "image/png")
+        with f:
+            data = f.read()
+        self.assertEqual(data, b"old bytes")
+        self.assertEqual(meta["size"], len(data))
+        self.assertEqual(meta["md5"], hashlib.md5(data).hexdigest())
+        self.assertEqual(self.cache.read("file"), (b"new, longer bytes", "image/png"))
+
+    def test_writer_overwrite_replaces_metadata_and_bytes_together(self):
+        self.cache.put("file", b"old", "image/png")
+        with self.cache.writer("file", "image/jpeg") as writer:
+            writer.write(b"new ")
+            writer.write(b"data")
+            writer.commit()
+        f, meta = self.cache.open("file")
+        with f:
+            data = f.read()
+        self.assertEqual(data, b"new data")
+        self.assertEqual((meta["size"], meta["mime_type"]), (8, "image/jpeg"))
+
+    def test_aborted_writer_leaves_entry_untouched(self):
+        self.cache.put("file", b"old", "image/png")
+        with self.cache.writer("file", "image/png") as writer:
+            writer.write(b"partial")
+        self.assertEqual(self.cache.read("file"), (b"old", "image/png"))
+
+    def test_delete(self):
+        self.cache.put("file", b"abc", "image/png")
+        self.cache.delete("file")
+        self.assertIsNone(self.cache.open("file"))
+        self.assertIsNone(self.cache.get_meta("file"))
+
+    def test_prune_removes_least_recently_used(self):
+        cache = DiskImageCache(self.cache.directory, max_bytes=10)
+        cache.put("a", b"x" * 6, "image/png")
+        cache.put("b", b"y" * 6, "image/png")
+        _, base, _ = cache._paths("a")
+        stale = time.time() - 60
+        os.utime(cache._data_path(base, cache.get_meta("a")), (stale, stale))
+        self.assertEqual(cache.prune(), 1)
+        self.assertIsNone(cache.get_meta("a"))
+        self.assertIsNotNone(cache.get_meta("b"))
+
+
+# ---------------------------------------------------
+# Range / ETag parsing
+# ---------------------------------------------------
+class RangeHeaderTests(SimpleTestCase):
+    def test_absent_or_unsupported_serves_everything(self):
+        self.assertIsNone(parse_range(None, 100))
+        self.assertIsNone(parse_range("", 100))
+        self.assertIsNone(parse_range("bytes=-", 100))
+        self.assertIsNone(parse_range("items=0-10", 100))
+        self.assertIsNone(parse_range("bytes=0-10,20-30", 100))  # multiple ranges
+
+    def test_explicit_and_open_ranges(self):
+        self.assertEqual(parse_range("bytes=0-9", 100), (0, 9))
+        self.assertEqual(parse_range("bytes=90-", 100), (90, 99))
+        self.assertEqual(parse_range("bytes=90-500", 100), (90, 99))  # end clamped to the file
+
+    def test_suffix_ranges(self):
+        self.assertEqual(parse_range("bytes=-10", 100), (90, 99))
+        self.assertEqual(parse_range("bytes=-500", 100), (0, 99))
+        self.assertEqual(parse_range("bytes=-0", 100), "unsatisfiable")
+
+    def test_unsatisfiable(self):
+        self.assertEqual(parse_range("bytes=100-", 100), "unsatisfiable")
+        self.assertEqual(parse_range("bytes=10-5", 100), "unsatisfiable")
+        self.assertEqual(parse_range("bytes=0-", 0), "unsatisfiable")
+
+
+class ETagTests(SimpleTestCase):
+    def test_make_etag(self):
+        self.assertEqual(make_etag("id", "abc"), '"abc"')
+        self.assertEqual(make_etag("id", None), make_etag("id", None))
+        self.assertNotEqual(make_etag("id", None), make_etag("other", None))
+
+    def test_etag_matches(self):
+        self.assertFalse(etag_matches(None, '"a"'))
+        self.assertTrue(etag_matches('"a"', '"a"'))
+        self.assertTrue(etag_matches('W/"a"', '"a"'))
+        self.assertTrue(etag_matches('"b", "a"', '"a"'))
+        self.assertTrue(etag_matches("*", '"a"'))
+        self.assertFalse(etag_matches('"b"', '"a"'))
+
+
+# ---------------------------------------------------
+# Single-flight image fetches
+# ---------------------------------------------------
+class SingleFlightTests(SimpleTestCase):
+    def test_waiters_share_the_leaders_result(self):
+        flight = SingleFlight()
+        release = threading.Event()
+        calls = []
+
+        def work():
+            calls.append(1)
+            release.wait(5)
+            return "result"
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(flight.do("key", work, timeout=5))) for _ in range(5)]
+        for t in threads:
+            t.start()
+        while not flight.in_flight("key"):
+            time.sleep(0.001)
+        time.sleep(0.05)
+        release.set()
+        for t in threads:
+            t.join()
+        self.assertEqual(results, ["result"] * 5)
+        self.assertEqual(len(calls), 1)
+        self.assertFalse(flight.in_flight("key"))
+
+    def test_leader_error_reaches_waiters(self):
+        flight = SingleFlight()
+        call, leader = flight.begin("key")
+        waiter, is_leader = flight.begin("key")
+        self.assertTrue(leader)
+        self.assertFalse(is_leader)
+        flight.finish("key", call, error=OSError("boom"))
+        with self.assertRaises(OSError):
+            flight.wait("key", waiter, timeout=1)
+
+    def test_wait_times_out(self):
+        flight = SingleFlight()
+        flight.begin("key")
+        waiter, _ = flight.begin("key")
+        with self.assertRaises(SingleFlightTimeout):
+            flight.wait("key", waiter, timeout=0.01)
+
+
+class ImageFetchTests(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.storage = mock.Mock()
+        self.storage.get.return_value = (b"image bytes", "image/png")
+        self.storage.stat.return_value = {"mime_type": "image/png", "size": 11, "md5": hashlib.md5(b"image bytes").hexdigest()}
+        for patcher in (
+            mock.patch.object(image_access, "_disk_cache", DiskImageCache(tmp.name)),
+            mock.patch.object(image_access, "_image_cache", image_access.ImageCache(1024 * 1024, 1024 * 1024)),
+            mock.patch.object(image_access, "_inflight", SingleFlight()),
+            mock.patch.object(image_access, "IMAGE_FETCH_WAIT_TIMEOUT", 0.01),
+            mock.patch.object(image_access, "get_storage", return_value=self.storage),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def stall_leader(self, file_id):
+        """Register a fetch that never finishes, like a stream paced by a slow client."""
+        call, _ = image_access._inflight.begin(file_id)
+        self.addCleanup(image_access._inflight.finish, file_id, call, result=True)
+
+    def test_waiter_fetches_directly_when_the_leader_is_slow(self):
+        self.stall_leader("file")
+        self.assertEqual(image_access.image_secure_access("file"), (b"image bytes", "image/png"))
+        self.storage.get.assert_called_once_with("file")
+
+    def test_stream_waiter_fetches_directly_when_the_leader_is_slow(self):
+        self.stall_leader("file")
+        chunks, mime_type, size, _ = image_access.image_stream("file")
+        self.assertEqual((b"".join(chunks), mime_type, size), (b"image bytes", "image/png", 11))
+
+    def test_cold_revalidation_does_not_open_a_download(self):
+        etag = make_etag("file", self.storage.stat.return_value["md5"])
+        request = RequestFactory().get("/game/image/file/", HTTP_IF_NONE_MATCH=etag)
+        response = build_image_response(request, "file")
+        self.assertEqual(response.status_code, 304)
+        self.storage.stream.assert_not_called()
+        self.storage.get.assert_not_called()
+
+# ---------------------------------------------------
+# Local storage
+# ---------------------------------------------------
+class LocalStorageTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.storage = LocalStorage(os.path.join(tmp.name, "files"), base_url="http://testserver/game/image/")
+        self.cache_dir = tmp.name
+
+    def put(self, data=b"image bytes", name="hint.png"):
+        return self.storage.put(io.BytesIO(data), name, dir_name="hints")
+
+    def test_round_trip(self):
+        key = self.put()
+        self.assertTrue(key.startswith("hints_") and key.endswith(".png"))
+        self.assertEqual(
+            self.storage.stat(key),
+            {"mime_type": "image/png", "size": 11, "md5": hashlib.md5(b"image bytes").hexdigest()},
+        )
+        meta, chunks = self.storage.stream(key, chunk_size=4)
+        self.assertEqual((meta["size"], b"".join(chunks)), (11, b"image bytes"))
+        self.assertEqual(self.storage.get(key), (b"image bytes", "image/png"))
+
+        self.storage.delete(key)
+        with self.assertRaises(FileNotFoundError):
+            self.storage.stat(key)
+        self.assertEqual(os.listdir(self.storage.root), [])
+
+    def test_keys_cannot_leave_the_root(self):
+        for key in ("", "../secret", "sub/file", ".hidden"):
+            with self.assertRaises(ValueError):
+                self.storage.stat(key)
+
+    def test_link_is_resolved_by_the_image_proxy(self):
+        key = self.put()
+        link = self.storage.url_for(key)
+        self.assertEqual(link, f"http://testserver/game/image/{key}/?id={key}")
+        self.assertEqual(file_id_from_url(link), key)
+
+        user = User.objects.create_user("viewer", "viewer@example.com", "secret")
+        client = APIClient()
+        client.force_authenticate(user)
+        with mock.patch.object(image_access, "get_storage", return_value=self.storage), \
+                mock.patch.object(image_access, "_disk_cache", DiskImageCache(os.path.join(self.cache_dir, "cache"))):
+            # The stored link itself, and the key SecureImage extracts from it
+            for path in (link.replace("http://testserver", ""), reverse("image_proxy", args=[key])):
+                response = client.get(path)
+                self.assertEqual(response.status_code, 200, path)
+                self.assertEqual(b"".join(response.streaming_content), b"image bytes")
+
+
+# ---------------------------------------------------
+# Image derivatives
+# ---------------------------------------------------
+class ImageDerivativeTests(SimpleTestCase):
+    def test_empty_file_id_is_rejected(self):
+        with self.assertRaises(ValueError):
+            get_image_derivative("", "thumb", "jpeg")
+
+    def test_empty_file_id_is_a_404(self):
+        request = RequestFactory().get("/game/image/", {"size": "thumb"})
+        self.assertEqual(build_image_response(request, "", size="thumb").status_code, 404)
+        self.assertEqual(build_image_response(request, "").status_code, 404)
+
+
+# ---------------------------------------------------
+# Background job queues
+# ---------------------------------------------------
+class JobRunnerTests(TestCase):
+    """utils.background.JobRunner, exercised through the UploadJob model."""
+
+    def setUp(self):
+        self.handler = mock.Mock(return_value="https://drive.google.com/uc?id=abc")
+        self.on_done = mock.Mock()
+        self.runner = JobRunner(
+            "api.UploadJob", self.handler, running_status="uploading", done_status="done",
+            max_attempts=2, on_done=self.on_done, log_prefix="[Test]",
+        )
+
+    def old_job(self, **fields):
+        job = UploadJob.objects.create(
+            model_label="api.Mails", object_id=1, url_field="image_url",
+            staged_path="/nonexistent", file_name="hint.png", **fields,
+        )
+        # An old job, e.g. one that waited out a long backoff
+        long_ago = timezone.now() - timedelta(hours=1)
+        UploadJob.objects.filter(id=job.id).update(created_at=long_ago, updated_at=long_ago, next_attempt_at=long_ago)
+        return job
+
+    def test_done_job(self):
+        job = self.old_job()
+        self.runner.process(job.id)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ("done", 1))
+        self.on_done.assert_called_once_with(job, "https://drive.google.com/uc?id=abc")
+
+        self.runner.process(job.id)  # no longer pending
+        self.handler.assert_called_once()
+
+    def test_drain_does_not_requeue_a_freshly_claimed_old_job(self):
+        job = self.old_job()
+
+        def handler(claimed):
+            # A drain running while this worker is mid-job must leave the job alone
+            self.assertEqual(self.runner.drain(), 0)
+            self.assertEqual(UploadJob.objects.get(id=job.id).status, "uploading")
+
+        self.handler.side_effect = handler
+        self.runner.process(job.id)
+        self.handler.assert_called_once()
+        self.assertEqual(UploadJob.objects.get(id=job.id).status, "done")
+
+    def test_drain_recovers_stale_claims(self):
+        job = self.old_job(status="uploading")
+        self.assertEqual(self.runner.drain(), 1)
+        self.handler.assert_called_once()
+        self.assertEqual(UploadJob.objects.get(id=job.id).status, "done")
+
+    def test_failed_job_is_retried_with_backoff_then_given_up(self):
+        job = self.old_job()
+        self.handler.side_effect = OSError("drive down")
+        with mock.patch("utils.background.submit") as submit:
+            self.runner.process(job.id)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, job.last_error), ("pending", 1, "drive down"))
+        self.assertGreater(job.next_attempt_at, timezone.now())
+        submit.assert_called_once_with(self.runner.process, job.id, delay=mock.ANY)
+
+        UploadJob.objects.filter(id=job.id).update(next_attempt_at=timezone.now())
+        self.runner.process(job.id)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ("failed", 2))
+        self.on_done.assert_not_called()
+
+
+class UploadQueueTests(TestCase):
+    def test_upload_sets_the_link_and_removes_the_staged_file(self):
+        tmp = tempfile.NamedTemporaryFile(delete=False)
+        tmp.write(b"image")
+        tmp.close()
+        self.addCleanup(lambda: os.path.exists(tmp.name) and os.remove(tmp.name))
+        now = timezone.now()
+        mystery = Mystery.objects.create(
+            name="Mystery", created_by=User.objects.create_user("owner"), joining_pin="1234",
+            starts_at=now, ends_at=now + timedelta(days=1),
+        )
+        job = UploadJob.objects.create(
+            model_label="api.Mystery", object_id=mystery.id, url_field="image_url",
+            staged_path=tmp.name, file_name="cover.png",
+        )
+
+        with mock.patch("api.uploads.ingest_image_upload", return_value="https://drive.google.com/uc?id=abc") as ingest:
+            self.assertEqual(process_pending_uploads(), 1)
+        self.assertEqual(ingest.call_args.kwargs, {"dir_name": ""})
+        mystery.refresh_from_db()
+        self.assertEqual(mystery.image_url, "https://drive.google.com/uc?id=abc")
+        self.assertFalse(os.path.exists(tmp.name))
+
+
+# ---------------------------------------------------
+# Answer matching
+# ---------------------------------------------------
+def levenshtein(a, b):
+    """Plain (unbounded) edit distance, the reference for bounded_levenshtein."""
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        previous = current
+    return previous[-1]
+
+
+class AnswerMatchingTests(SimpleTestCase):
+    def test_normalize_answer(self):
+        self.assertEqual(normalize_answer("  Café-Noir! "), "cafe noir")
+        self.assertEqual(normalize_answer("ÉCOLE\tnormale"), "ecole normale")
+        self.assertEqual(normalize_answer("Straße"), "strasse")
+        self.assertEqual(normalize_answer(None), "")
+        self.assertEqual(normalize_answer("  ?! "), "?!")  # nothing left to fold: kept as typed
+        self.assertEqual(normalize_answer("C++"), "c++")
+        self.assertEqual(normalize_answer("C#"), "c#")
+
+    def test_symbol_answers(self):
+        question = Question(id=10**6 + 1, answer_version=1, answer="🔑 | C++ | C#", normalized_answers=normalize_answers("🔑 | C++ | C#"))
+        for guess in ("🔑", " 🔑 ", "c++", "C#"):
+            self.assertTrue(answer_matches(question, guess), guess)
+        for guess in ("c", "C", "", "key"):
+            self.assertFalse(answer_matches(question, guess), guess)
+
+    def test_normalize_answers(self):
+        self.assertEqual(normalize_answers("Paris | paris! | Lutèce ||"), ["paris", "lutece"])
+        self.assertEqual(normalize_answers(None), [])
+
+    def test_bounded_levenshtein_agrees_with_the_unbounded_distance(self):
+        rng = random.Random(2026)
+        alphabet = "abc "
+        for _ in range(2000):
+            a = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 8)))
+            b = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 8)))
+            k = rng.randint(0, 4)
+            expected = levenshtein(a, b)
+            self.assertEqual(bounded_levenshtein(a, b, k), expected if expected <= k else k + 1, (a, b, k))
+
+    def test_matcher(self):
+        exact = AnswerMatcher(["eiffel tower", "tour eiffel"])
+        self.assertTrue(exact.matches("tour eiffel"))
+        self.assertFalse(exact.matches("eifel tower"))
+        self.assertFalse(exact.matches(""))
+
+        tolerant = AnswerMatcher(["eiffel tower"], tolerance=1)
+        self.assertTrue(tolerant.matches("eifel tower"))
+        self.assertFalse(tolerant.matches("eifel towr"))
+
+    def test_new_answer_version_gets_a_new_matcher(self):
+        question = Question(id=10**6, answer="Paris | Lutèce", answer_version=1, normalized_answers=normalize_answers("Paris | Lutèce"))
+        self.assertTrue(answer_matches(question, "LUTECE"))
+        question.answer, question.answer_version, question.normalized_answers = "Rome", 2, ["rome"]
+        self.assertFalse(answer_matches(question, "paris"))
+        self.assertTrue(answer_matches(question, "Rome!"))
+
+# ---------------------------------------------------
+# Game fixtures
+# ---------------------------------------------------
+class GameFixtures:
+    """Small mystery: levels and questions are created per test."""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()  # level graphs and payloads cached by earlier (rolled back) tests
+        self.user = User.objects.create_user("player", "player@example.com", "secret")
+        now = timezone.now()
+        self.mystery = Mystery.objects.create(
+            name="Mystery", created_by=self.user, joining_pin="1234",
+            starts_at=now - timedelta(days=1), ends_at=now + timedelta(days=1),
+        )
+
+    def make_level(self, position, name=None):
+        return Level.objects.create(mystery=self.mystery, name=name or f"Level {position}", position=position)
+
+    def make_question(self, level, answer_type="match", answer="paris", **fields):
+        return Question.objects.create(level=level, question="?", answer_type=answer_type, answer=answer, **fields)
+
+
+# ---------------------------------------------------
+# Level completion
+# ---------------------------------------------------
+class LevelCompletionTests(GameFixtures, TestCase):
+    def test_level_without_questions_is_complete_and_unlocks_the_next(self):
+        intro = self.make_level(1, "Intro")
+        second = self.make_level(2)
+        Present.objects.create(level=intro, type="text", content="Welcome", title="Badge")
+
+        self.assertTrue(is_level_complete(self.user, intro))
+        outcome = evaluate_level(self.user, intro)
+        self.assertTrue(outcome.completed)
+        self.assertEqual(outcome.next_level_id, second.id)
+        self.assertEqual(outcome.present.title, "Badge")
+
+    def test_level_needs_every_question_answered(self):
+        level = self.make_level(1)
+        first = self.make_question(level)
+        second = self.make_question(level)
+        UserAnswer.objects.create(user=self.user, question=first, is_correct=True)
+        self.assertFalse(is_level_complete(self.user, level))
+        UserAnswer.objects.create(user=self.user, question=second, is_correct=True)
+        self.assertTrue(is_level_complete(self.user, level))
+
+
+# ---------------------------------------------------
+# LevelsView payload cache
+# ---------------------------------------------------
+class LevelsCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def cache_payload(self, payload):
+        cached, versions = get_cached_levels(1, 7)
+        set_cached_levels(1, 7, versions, payload)
+        return cached
+
+    def test_hit_until_invalidated(self):
+        self.assertIsNone(self.cache_payload(["levels"]))
+        self.assertEqual(get_cached_levels(1, 7)[0], ["levels"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            invalidate_user_levels(1, 7)
+        self.assertIsNone(get_cached_levels(1, 7)[0])
+
+        self.cache_payload(["levels v2"])
+        with self.captureOnCommitCallbacks(execute=True):
+            invalidate_mystery_levels(7)
+        self.assertIsNone(get_cached_levels(1, 7)[0])
+
+    def test_invalidation_waits_for_commit(self):
+        self.cache_payload(["levels"])
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            invalidate_user_levels(1, 7)
+        self.assertEqual(get_cached_levels(1, 7)[0], ["levels"])
+        callbacks[0]()
+        self.assertIsNone(get_cached_levels(1, 7)[0])
+
+    def test_evicted_version_never_revives_an_older_payload(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            invalidate_user_levels(1, 7)
+        self.cache_payload(["old"])
+        with self.captureOnCommitCallbacks(execute=True):
+            invalidate_user_levels(1, 7)  # "old" is stale from here on
+
+        cache.delete("levels_version:7:1")  # version key evicted, payload still live
+        self.assertIsNone(get_cached_levels(1, 7)[0])
+        with self.captureOnCommitCallbacks(execute=True):
+            invalidate_user_levels(1, 7)
+        self.assertIsNone(get_cached_levels(1, 7)[0])
+
+    @override_settings(CACHE_IS_SHARED=False)
+    def test_nothing_is_cached_in_a_per_process_cache(self):
+        self.cache_payload(["levels"])
+        self.assertIsNone(get_cached_levels(1, 7)[0])
+        self.assertIsNone(cache.get("levels_payload:7:1"))
+
+
+class LevelGraphTests(GameFixtures, TestCase):
+    def test_graph_follows_level_changes_after_commit(self):
+        first = self.make_level(1)
+        self.assertEqual(get_level_graph(self.mystery.id).level_ids, [first.id])
+
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            second = self.make_level(2)
+        self.assertEqual(get_level_graph(self.mystery.id).level_ids, [first.id])  # dropped on commit, not before
+        for callback in callbacks:
+            callback()
+        graph = get_level_graph(self.mystery.id)
+        self.assertEqual((graph.first_id, graph.next_id(first.id)), (first.id, second.id))
+
+    @override_settings(CACHE_IS_SHARED=False)
+    def test_graph_is_not_cached_in_a_per_process_cache(self):
+        first = self.make_level(1)
+        get_level_graph(self.mystery.id)
+        self.assertIsNone(cache.get(f"level_graph:{self.mystery.id}"))
+        second = self.make_level(2)  # no commit: the graph is still current
+        self.assertEqual(get_level_graph(self.mystery.id).level_ids, [first.id, second.id])
+
+
+# ---------------------------------------------------
+# Answer submission
+# ---------------------------------------------------
+class SubmissionTests(GameFixtures, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.level = self.make_level(1)
+        self.question = self.make_question(self.level, answer="Paris")
+
+    def test_replaying_a_submission_key_returns_the_first_result(self):
+        first = submit_answer(self.user, self.question, {"answer": "paris"}, {}, submission_key="key-1")
+        self.assertEqual((first.status_code, first.data["correct"]), (200, True))
+
+        replay = submit_answer(self.user, self.question, {"answer": "paris"}, {}, submission_key="key-1")
+        self.assertEqual((replay.status_code, replay.data), (first.status_code, first.data))
+        self.assertEqual(attempt_count(self.user, self.question), 1)
+        self.assertEqual(AnswerSubmission.objects.filter(user=self.user).count(), 1)
+
+    def test_submission_key_of_another_question_is_rejected(self):
+        submit_answer(self.user, self.question, {"answer": "paris"}, {}, submission_key="key-1")
+        other = self.make_question(self.level, answer="London")
+
+        response = submit_answer(self.user, other, {"answer": "london"}, {}, submission_key="key-1")
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(attempt_count(self.user, other), 0)
+        self.assertFalse(UserAnswer.objects.filter(user=self.user, question=other).exists())
+
+    def test_replay_of_a_wrong_guess_is_not_counted_again(self):
+        for _ in range(3):
+            result = submit_answer(self.user, self.question, {"answer": "london"}, {}, submission_key="key-1")
+            self.assertFalse(result.data["correct"])
+        self.assertEqual(attempt_count(self.user, self.question), 1)
+        self.assertFalse(UserAnswer.objects.filter(user=self.user).exists())
+
+    def test_second_correct_answer_is_rejected(self):
+        submit_answer(self.user, self.question, {"answer": "paris"}, {})
+        again = submit_answer(self.user, self.question, {"answer": "paris"}, {}, submission_key="key-2")
+        self.assertEqual(again.status_code, 400)
+        self.assertEqual(UserAnswer.objects.filter(user=self.user, is_correct=True).count(), 1)
+
+    def test_first_submission_creates_one_progress_row(self):
+        submit_answer(self.user, self.question, {"answer": "london"}, {})
+        submit_answer(self.user, self.question, {"answer": "paris"}, {})
+        self.assertEqual(UserProgress.objects.filter(user=self.user, mystery=self.mystery).count(), 1)
+
+    def test_only_one_correct_answer_per_question(self):
+        UserAnswer.objects.create(user=self.user, question=self.question, is_correct=False)
+        UserAnswer.objects.create(user=self.user, question=self.question, is_correct=False)
+        UserAnswer.objects.create(user=self.user, question=self.question, is_correct=True)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            UserAnswer.objects.create(user=self.user, question=self.question, is_correct=True)
+
+    def test_only_one_progress_row_per_player_and_mystery(self):
+        UserProgress.objects.create(user=self.user, mystery=self.mystery)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            UserProgress.objects.create(user=self.user, mystery=self.mystery)
+
+
+# ---------------------------------------------------
+# Hint mail outbox
+# ---------------------------------------------------
+class MailOutboxTests(GameFixtures, TestCase):
+    def setUp(self):
+        super().setUp()
+        question = self.make_question(self.make_level(1), answer_type="match-mail")
+        self.mail = Mails.objects.create(question=question, subject="Hint", message_text="Look up")
+        self.transport = mock.Mock()
+        patcher = mock.patch("api.mail_outbox.get_mail_transport", return_value=self.transport)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def old_job(self, **fields):
+        job = MailJob.objects.create(user=self.user, mail=self.mail, recipient=self.user.email, **fields)
+        long_ago = timezone.now() - timedelta(hours=1)
+        MailJob.objects.filter(id=job.id).update(created_at=long_ago, updated_at=long_ago, next_attempt_at=long_ago)
+        return job
+
+    def test_due_jobs_are_sent(self):
+        job = self.old_job()
+        self.assertEqual(process_pending_mails(), 1)
+        self.transport.send.assert_called_once()
+        self.assertEqual(MailJob.objects.get(id=job.id).status, "sent")
+
+    def test_enqueue_reuses_the_pending_job_and_rate_limits(self):
+        with mock.patch("api.mail_outbox.MAIL_RATE_LIMIT", 2), self.captureOnCommitCallbacks(execute=False):
+            first = enqueue_hint_mail(self.user, self.mail)
+            self.assertEqual(enqueue_hint_mail(self.user, self.mail), first)
+            MailJob.objects.filter(id=first.id).update(status="sent")
+            enqueue_hint_mail(self.user, self.mail)
+            MailJob.objects.filter(user=self.user).update(status="sent")
+            with self.assertRaises(MailRateLimited):
+                enqueue_hint_mail(self.user, self.mail)
+
+    def test_image_link_of_any_storage_backend(self):
+        self.mail.image_url = "http://localhost:8000/storage/?id=mails/hint.png"
+        with mock.patch("api.mail_outbox.image_secure_access", return_value=(b"png", "image/png")) as fetch:
+            message = build_hint_message(self.mail, "player@example.com")
+        fetch.assert_called_once_with("mails/hint.png")
+        self.assertIn("raw", message)
+
+
+# ---------------------------------------------------
+# Review moderation
+# ---------------------------------------------------
+class ReviewTestMixin(GameFixtures):
+    def setUp(self):
+        super().setUp()
+        self.other = User.objects.create_user("other", "other@example.com", "secret")
+        self.moderator = User.objects.create_user("moderator", "mod@example.com", "secret", is_staff=True)
+        self.level = self.make_level(1)
+        self.next_level = self.make_level(2)
+        self.present = Present.objects.create(level=self.level, type="text", content="Well done", title="Key")
+        self.q1 = self.make_question(self.level, answer_type="descriptive-review", answer="")
+        self.q2 = self.make_question(self.level, answer_type="descriptive-review", answer="")
+
+    def review(self, user, question, text="answer"):
+        return Review.objects.create(user=user, question=question, mystery=self.mystery, answer_text=text)
+
+
+class ReviewBatchTests(ReviewTestMixin, TestCase):
+    def test_approving_a_batch(self):
+        reviews = [
+            self.review(self.user, self.q1),
+            self.review(self.user, self.q2, "first try"),
+            self.review(self.user, self.q2, "second try"),  # same question twice: one answer
+            self.review(self.other, self.q1),
+        ]
+        with self.captureOnCommitCallbacks(execute=True):
+            approved = approve_reviews(Review.objects.filter(id__in=[r.id for r in reviews]), self.moderator)
+        self.assertEqual(approved, 4)
+        self.assertFalse(Review.objects.exclude(status="approved").exists())
+
+        answers = UserAnswer.objects.filter(is_correct=True)
+        self.assertEqual(answers.filter(user=self.user).count(), 2)
+        self.assertEqual(answers.get(user=self.user, question=self.q2).answer_text, "second try")
+        self.assertEqual(answers.filter(user=self.other).count(), 1)
+
+        # The first player finished the level, the second didn't
+        progress = UserProgress.objects.get(user=self.user, mystery=self.mystery)
+        self.assertEqual(list(progress.completed_levels.all()), [self.level])
+        self.assertIn(self.next_level, progress.unlocked_levels.all())
+        self.assertEqual(list(progress.collected_presents.all()), [self.present])
+        other_progress = UserProgress.objects.get(user=self.other, mystery=self.mystery)
+        self.assertFalse(other_progress.completed_levels.exists())
+
+        snapshot = ProgressSnapshot.objects.get(user=self.user, mystery=self.mystery)
+        self.assertEqual(sorted(snapshot.solved_question_ids), sorted([self.q1.id, self.q2.id]))
+        self.assertIn(self.level.id, snapshot.completed_level_ids)
+        self.assertIn(self.next_level.id, snapshot.unlocked_level_ids)
+        self.assertEqual(snapshot.review_statuses()[self.q1.id], "approved")
+
+        # Approving again changes nothing
+        self.assertEqual(approve_reviews(Review.objects.all(), self.moderator), 0)
+        self.assertEqual(UserAnswer.objects.filter(is_correct=True).count(), 3)
+
+    def test_rejected_review_can_be_approved_later(self):
+        review = self.review(self.user, self.q1)
+        self.assertEqual(reject_reviews(Review.objects.filter(id=review.id), self.moderator), 1)
+        self.assertFalse(UserAnswer.objects.exists())
+        self.assertEqual(approve_reviews(Review.objects.filter(id=review.id), self.moderator), 1)
+        self.assertTrue(UserAnswer.objects.filter(user=self.user, question=self.q1, is_correct=True).exists())
+
+
+class ReviewQueueTests(ReviewTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.second_moderator = User.objects.create_user("moderator2", "mod2@example.com", "secret", is_staff=True)
+        self.reviews = [self.review(self.user if i % 2 else self.other, self.q1, f"answer {i}") for i in range(5)]
+        # Same created_at for all of them: the order falls back to the id
+        Review.objects.filter(id__in=[r.id for r in self.reviews]).update(created_at=timezone.now())
+
+    def test_cursor_round_trip(self):
+        review = Review.objects.get(id=self.reviews[2].id)
+        self.assertEqual(decode_queue_cursor(encode_queue_cursor(review)), (review.created_at, review.id))
+        for bad in ("", "not base64!", encode_queue_cursor(review)[:-4]):
+            with self.assertRaises(ValueError):
+                decode_queue_cursor(bad)
+
+    def test_pages_visit_every_review_once_in_order(self):
+        seen = []
+        after = None
+        while True:
+            page, cursor = review_queue_page(self.mystery.id, self.moderator, after=after, limit=2)
+            seen += [review.id for review in page]
+            if cursor is None:
+                break
+            after = decode_queue_cursor(cursor)
+        self.assertEqual(seen, [review.id for review in self.reviews])
+
+    def test_claims_are_exclusive_until_the_lease_expires(self):
+        claimed = claim_reviews(self.mystery.id, self.moderator, 2)
+        self.assertEqual([r.id for r in claimed], [r.id for r in self.reviews[:2]])
+
+        page, _ = review_queue_page(self.mystery.id, self.second_moderator)
+        self.assertEqual([r.id for r in page], [r.id for r in self.reviews[2:]])
+        other_claim = claim_reviews(self.mystery.id, self.second_moderator, 5)
+        self.assertEqual([r.id for r in other_claim], [r.id for r in self.reviews[2:]])
+
+        # The holder still sees its own claims; once the lease runs out anyone may take them
+        page, _ = review_queue_page(self.mystery.id, self.moderator)
+        self.assertEqual([r.id for r in page], [r.id for r in self.reviews[:2]])
+        Review.objects.filter(id__in=[r.id for r in claimed]).update(claim_expires_at=timezone.now() - timedelta(seconds=1))
+        page, _ = review_queue_page(self.mystery.id, self.second_moderator)
+        self.assertEqual([r.id for r in page], [r.id for r in self.reviews])
+
+    def test_released_and_decided_reviews(self):
+        claim_reviews(self.mystery.id, self.moderator, 2)
+        self.assertEqual(release_reviews(self.moderator, [r.id for r in self.reviews]), 2)
+        self.assertEqual(len(claim_reviews(self.mystery.id, self.second_moderator, 2)), 2)
+
+        approve_reviews(Review.objects.filter(id=self.reviews[0].id), self.second_moderator)
+        page, _ = review_queue_page(self.mystery.id, self.moderator)
+        self.assertNotIn(self.reviews[0].id, [r.id for r in page])
+
+
+# ---------------------------------------------------
+# Progress snapshot
+# ---------------------------------------------------
+class ProgressSnapshotTests(GameFixtures, TestCase):
+    SNAPSHOT_FIELDS = (
+        "current_level_id", "completed_level_ids", "unlocked_level_ids", "collected_present_ids",
+        "solved_question_ids", "review_states", "answers_submitted",
+    )
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.mystery.participants.add(self.user)
+        self.level = self.make_level(1)
+        self.next_level = self.make_level(2)
+        self.question = self.make_question(self.level, answer="Paris")
+        self.review_question = self.make_question(self.next_level, answer_type="descriptive-review", answer="")
+
+    def snapshot_state(self):
+        snapshot = get_progress_snapshot(self.user, self.mystery.id)
+        return {name: sorted(value) if isinstance(value, list) else value
+                for name, value in ((name, getattr(snapshot, name)) for name in self.SNAPSHOT_FIELDS)}
+
+    def rebuilt_state(self):
+        rebuild_progress_snapshot(self.user, self.mystery.id)
+        return self.snapshot_state()
+
+    def question_status(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        levels = client.get(reverse("levels", args=[self.mystery.id])).json()
+        return levels[0]["questions"][0]["status"]
+
+    def test_first_answer_is_counted_once(self):
+        record_answer(self.user, self.question, is_correct=False, answer_text="london")
+        self.assertEqual(get_progress_snapshot(self.user, self.mystery.id).answers_submitted, 1)
+
+    def test_first_review_is_counted_once(self):
+        Review.objects.create(user=self.user, question=self.review_question, mystery=self.mystery, answer_text="?")
+        self.assertEqual(get_progress_snapshot(self.user, self.mystery.id).answers_submitted, 1)
+
+    def test_incremental_updates_match_a_rebuild(self):
+        submit_answer(self.user, self.question, {"answer": "london"}, {})
+        submit_answer(self.user, self.question, {"answer": "paris"}, {})
+        submit_answer(self.user, self.review_question, {"answer": "my theory"}, {})
+        approve_reviews(Review.objects.all())
+        incremental = self.snapshot_state()
+        self.assertEqual(incremental["answers_submitted"], 3)  # correct answer, review, approved answer
+        self.assertEqual(incremental, self.rebuilt_state())
+
+    def test_admin_deleting_an_answer_resets_the_question(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            submit_answer(self.user, self.question, {"answer": "paris"}, {})
+        self.assertEqual(self.question_status(), {"completed": True, "pending": False})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            UserAnswer.objects.get(user=self.user, question=self.question).delete()
+        self.assertEqual(self.question_status(), {"completed": False, "pending": False})
+        self.assertNotIn(self.question.id, self.snapshot_state()["solved_question_ids"])
+
+    def test_admin_granting_and_removing_levels(self):
+        get_progress_snapshot(self.user, self.mystery.id)  # snapshot exists before the admin edit
+        progress = UserProgress.objects.get(user=self.user, mystery=self.mystery)
+
+        progress.unlocked_levels.add(self.next_level)
+        progress.completed_levels.add(self.level)
+        self.assertEqual(self.snapshot_state()["completed_level_ids"], [self.level.id])
+        self.assertIn(self.next_level.id, self.snapshot_state()["unlocked_level_ids"])
+
+        progress.completed_levels.remove(self.level)
+        self.assertEqual(self.snapshot_state()["completed_level_ids"], [])
+
+        self.level.completed_by.add(progress)  # from the Level side
+        self.assertEqual(self.snapshot_state()["completed_level_ids"], [self.level.id])
@@ -0,0 +1,123 @@
+# api/uploads.py
+from django.apps import apps
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.dispatch import Signal
+from datetime import timedelta
+from utils.background import JobRunner, submit
+from utils.image_ingest import ingest_image_upload
+import os
+import uuid
+
+UPLOAD_STAGING_DIR = getattr(settings, "UPLOAD_STAGING_DIR", os.path.join(settings.MEDIA_ROOT, "upload_staging"))
+UPLOAD_MAX_ATTEMPTS = getattr(settings, "UPLOAD_MAX_ATTEMPTS", 5)
+# Jobs claimed ("uploading") longer ago than this (e.g. worker killed mid-upload) are retried
+UPLOAD_STALE_AFTER = timedelta(minutes=10)
+
+# Sent after a background upload finished: sender=model class, instance_pk, url_field, url
+upload_completed = Signal()
+
+
+# ---------------------------------------------------
+# Staging (runs in the request thread)
+# ---------------------------------------------------
+class StagedUpload:
+    def __init__(self, path, name, content_type):
+        self.path = path
+        self.name = name
+        self.content_type = content_type
+
+
+def stage_image(instance, file_field):
+    """
+    Copy an uploaded file from `instance.<file_field>` to the staging directory
+    and clear the field. Returns a StagedUpload, or None if the field is empty.
+    """
+    django_file = getattr(instance, file_field)
+    if not django_file:
+        return None
+
+    os.makedirs(UPLOAD_STAGING_DIR, exist_ok=True)
+    name = os.path.basename(django_file.name)
+    path = os.path.join(UPLOAD_STAGING_DIR, f"{uuid.uuid4().hex}_{name}")
+    with open(path, "wb") as out:
+        for chunk in django_file.chunks():
+            out.write(chunk)
+
+    content_type = getattr(getattr(django_file, "file", None), "content_type", None) or ""
+    django_file.delete(save=False)  # cleanup local file
+    setattr(instance, file_field, None)
+    return StagedUpload(path, name, content_type)
+
+
+def enqueue_upload(instance, url_field, staged, dir_name=""):
+    """
+    Record an UploadJob for a staged file and hand it to the worker pool once
+    the surrounding transaction commits. `instance` must already be saved.
+    """
+    from .models import UploadJob
+
+    job = UploadJob.objects.create(
+        model_label=instance._meta.label,
+        object_id=instance.pk,
+        url_field=url_field,
+        dir_name=dir_name,
+        staged_path=staged.path,
+        file_name=staged.name,
+        content_type=staged.content_type,
+    )
+    print(f"[Uploads] Queued {job}")
+    transaction.on_commit(lambda: submit(process_upload_job, job.id))
+    return job
+
+
+# ---------------------------------------------------
+# Worker side
+# ---------------------------------------------------
+def _upload(job):
+    """Upload the staged file of a job and point the owning object at it; returns the link."""
+    with open(job.staged_path, "rb") as f:
+        django_file = File(f, name=job.file_name)
+        django_file.content_type = job.content_type or None
+        drive_url = ingest_image_upload(django_file, dir_name=job.dir_name)
+
+    # update() instead of save() so the model's own save() logic doesn't run again
+    apps.get_model(job.model_label).objects.filter(pk=job.object_id).update(**{job.url_field: drive_url})
+    return drive_url
+
+
+def _uploaded(job, drive_url):
+    try:
+        os.remove(job.staged_path)
+    except OSError:
+        pass
+    upload_completed.send(
+        sender=apps.get_model(job.model_label), instance_pk=job.object_id, url_field=job.url_field, url=drive_url
+    )
+
+
+upload_jobs = JobRunner(
+    "api.UploadJob",
+    _upload,
+    running_status="uploading",
+    done_status="done",
+    max_attempts=UPLOAD_MAX_ATTEMPTS,
+    stale_after=UPLOAD_STALE_AFTER,
+    on_done=_uploaded,
+    log_prefix="[Uploads]",
+)
+
+
+def process_upload_job(job_id):
+    """Upload one staged file to Drive, retrying with exponential backoff on failure."""
+    upload_jobs.process(job_id)
+
+
+def process_pending_uploads(limit=None):
+    """
+    Run every due upload job in the current thread. Used by the `process_uploads`
+    management command to drain the queue and to recover jobs after a restart.
+    Returns the number of jobs attempted.
+    """
+    return upload_jobs.drain(limit)
@@ -1,5 +1,5 @@
 from django.urls import path
-from .views import LevelsView, LevelDetailView, UserProgressView, UserSubmitAnswer, GetHint, MysteryView, SelfMysteries, get_user_mysteries
+from .views import LevelsView, LevelDetailView, UserProgressView, UserSubmitAnswer, GetHint, MysteryView, SelfMysteries, get_user_mysteries, ReviewQueueView, ReviewDecisionView
 
 urlpatterns = [
     path("levels/<int:mystery_id>", LevelsView.as_view(), name="levels"),
@@ -10,4 +10,6 @@ urlpatterns = [
     path("mysteries/", MysteryView.as_view(), name="mysteries"),
     path("mysteries/self/", SelfMysteries.as_view(), name="self_mysteries"),
     path("mysteries/self/<int:mystery_id>", get_user_mysteries, name="mystery"),
+    path("reviews/queue/<int:mystery_id>/", ReviewQueueView.as_view(), name="review_queue"),
+    path("reviews/<int:review_id>/decision/", ReviewDecisionView.as_view(), name="review_decision"),
 ]
@@ -5,14 +5,33 @@ from rest_framework import status
 from django.shortcuts import get_object_or_404
 from .models import Level, UserProgress, Question , UserAnswer , Present, Review , Mystery
 import requests
-from .serializers import LevelSerializer, UserProgressSerializer, PresentSerializer, SingleLevelSerializer, MysterySerializer 
-from utils.gdrive import upload_file_to_drive
+from .serializers import LevelSerializer, UserProgressSerializer, PresentSerializer, SingleLevelSerializer, MysterySerializer, mystery_list_context
+from .pagination import MysteryCursorPagination
+from utils.gdrive import file_id_from_url, upload_file_to_drive
+from .level_graph import get_level_graph
+from .progress import get_progress_snapshot, load_level_state, unlocked_level_ids
+from .levels_cache import get_cached_levels, set_cached_levels
+from .submission import submit_answer, submission_key_from_request
 
 from django.http import HttpResponse
 from rest_framework.views import APIView
 from rest_framework.decorators import action
-from utils.image_access import image_secure_access
-import re
+from utils.image_response import build_image_response
+from utils.image_derivatives import DERIVATIVE_SIZES, DERIVATIVE_FORMATS
+
+
+def parse_image_variant(request):
+    """
+    Read the optional ?size= (thumb/medium/full) and ?format= (webp/jpeg) query params.
+    Returns (size, fmt) or raises ValueError for unknown values.
+    """
+    size = request.GET.get("size") or None
+    fmt = request.GET.get("format") or None
+    if size is not None and size not in DERIVATIVE_SIZES:
+        raise ValueError(f"Unknown image size '{size}'")
+    if fmt is not None and fmt not in DERIVATIVE_FORMATS:
+        raise ValueError(f"Unknown image format '{fmt}'")
+    return size, fmt
 
 
 
@@ -23,14 +42,17 @@ class ImageProxyView(APIView):
         try:
             # image_id = request.data.get("image_id" , image_id)
             print("Requested image_id:", image_id)
-            # Fetch file bytes securely
-            if "google" in image_id:
-                match = re.search(r"id=([^&]+)", image_id)
-                image_id = match.group(1)
+            # Accept a stored link of any storage backend as well as a bare key
+            image_id = file_id_from_url(image_id) or image_id
 
-            file_bytes, mime_type = image_secure_access(image_id)
+            try:
+                size, fmt = parse_image_variant(request)
+            except ValueError as e:
+                return HttpResponse(str(e), status=400)
 
-            return HttpResponse(file_bytes, content_type=mime_type)
+            # Conditional (ETag → 304) and Range requests are handled here;
+            # cached files are streamed from disk, cold ones straight from Drive
+            return build_image_response(request, image_id, size=size, fmt=fmt)
 
         except Exception as e:
             print("❌ Error fetching private image:", str(e))
@@ -38,6 +60,21 @@ class ImageProxyView(APIView):
         
         
 
+def list_mysteries(request, mysteries, view=None):
+    """
+    Serialize a mystery listing. Passing ?page_size= switches to cursor pagination
+    on starts_at ({"next", "previous", "results"}); without it the plain list is returned.
+    """
+    context = mystery_list_context(request)
+    if "page_size" in request.query_params:
+        paginator = MysteryCursorPagination()
+        page = paginator.paginate_queryset(mysteries, request, view=view)
+        serializer = MysterySerializer(page, many=True, context=context)
+        return paginator.get_paginated_response(serializer.data)
+    serializer = MysterySerializer(mysteries, many=True, context=context)
+    return Response(serializer.data)
+
+
 class MysteryView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -49,14 +86,11 @@ class MysteryView(APIView):
         if joined and joined.lower() == "true":
             # Get all mysteries that the user has joined
             mysteries = Mystery.objects.filter(participants=user).order_by("-starts_at")
-            for m in mysteries:
-                print((m.name))
         else:
             # Get all visible mysteries
             mysteries = Mystery.objects.filter(is_visible=True).order_by("-starts_at")
 
-        serializer = MysterySerializer(mysteries, many=True, context={"request": request})
-        return Response(serializer.data)
+        return list_mysteries(request, mysteries, view=self)
     
     def post(self, request):
         mystery_id = request.data.get("mystery_id")
@@ -72,18 +106,18 @@ class MysteryView(APIView):
             return Response({"message": "Invalid joining pin."}, status=status.HTTP_400_BAD_REQUEST)
 
 from django.http import HttpResponse, HttpResponseNotFound
-from django.views.decorators.cache import cache_page
 from django.views.decorators.csrf import csrf_exempt
-from utils.image_access import image_secure_access
 
 @csrf_exempt
-@cache_page(60 * 60)  # cache 1 hour at Django level
 def admin_image_proxy(request, file_id):
     if not request.user.is_authenticated or request.user.username != "aniru":
         return HttpResponseNotFound("404 - User not authorized")
     try:
-        file_bytes, mime_type = image_secure_access(file_id)
-        return HttpResponse(file_bytes, content_type=mime_type)
+        size, fmt = parse_image_variant(request)
+    except ValueError as e:
+        return HttpResponse(str(e), status=400)
+    try:
+        return build_image_response(request, file_id, size=size, fmt=fmt)
     except Exception as e:
         print(f"[Image Proxy Error] {e}")
         return HttpResponseNotFound("Image not available")
@@ -105,42 +139,35 @@ class LevelsView(APIView):
 
     def get(self, request , mystery_id):
         user = request.user
-        mystery = get_object_or_404(Mystery, id=mystery_id)
-        if user not in mystery.participants.all():
+        # Steady-state polls are answered from the cache (invalidated by api.signals)
+        cached, versions = get_cached_levels(user.id, mystery_id)
+        if cached is not None:
+            return Response(cached)
+
+        mystery = get_object_or_404(Mystery.objects.only("id", "name"), id=mystery_id)
+        if not mystery.participants.filter(id=user.id).exists():
             return Response({"detail": "You have not joined this mystery."}, status=status.HTTP_403_FORBIDDEN)
         
-        # --- Data for Level Status (from previous fix) ---
-        progress, _ = UserProgress.objects.get_or_create(user=user , mystery = mystery)
-        unlocked_ids = set(progress.unlocked_levels.values_list('id', flat=True))
-        completed_ids = set(progress.completed_levels.values_list('id', flat=True))
-        levels = mystery.levels.all().order_by("id")
-        first_level = levels.first()
-        if first_level:
-            unlocked_ids.add(first_level.id)
-        for completed_id in completed_ids:
-            next_level = levels.filter(id__gt=completed_id).order_by("id").first()
-            if next_level:
-                unlocked_ids.add(next_level.id)
-        
-        # --- NEW: Data for Question Status ---
-        
-        # 1. Get all correct answer IDs for this user in one query.
-        correct_answer_qids = set(
-            UserAnswer.objects.filter(user=user, is_correct=True).values_list('question_id', flat=True)
+        # --- Level and question status: one lookup of the denormalized snapshot ---
+        snapshot = get_progress_snapshot(user, mystery.id)
+        unlocked_ids = unlocked_level_ids(snapshot, get_level_graph(mystery.id))
+        completed_ids = set(snapshot.completed_level_ids)
+
+        correct_answer_qids = set(snapshot.solved_question_ids)
+        review_statuses = snapshot.review_statuses()  # {question_id: status}
+
+        # Only the columns the serializers read; answer/review status comes from the snapshot
+        levels = list(
+            Level.objects.filter(mystery=mystery)
+            .only("id", "name", "quest", "mystery", "position")
+            .prefetch_related(
+                Prefetch("questions", queryset=Question.objects.only("id", "level", "answer_type")),
+                Prefetch("present", queryset=Present.objects.only("id", "level", "type", "content", "title", "image_url")),
+            )
+            .order_by("position", "id")
         )
-
-        # 2. Get all review statuses for this user in one query.
-        #    Store in a dict for fast lookups: {question_id: status}
-        reviews = Review.objects.filter(user=user , mystery = mystery)
-        review_statuses = {review.question_id: review.status for review in reviews}
-
-        # --- End of New Code ---
-
-        levels = Level.objects.filter(mystery=mystery).prefetch_related(
-            Prefetch('questions__user_answers', queryset=UserAnswer.objects.filter(user=user)),
-            Prefetch('questions__reviews', queryset=Review.objects.filter(user=user)),
-            'present'
-        ).order_by("id")
+        for level in levels:
+            level.mystery = mystery  # StringRelatedField would otherwise fetch it once per level
 
         
         # 3. Pass all the data down in the context.
@@ -155,6 +182,7 @@ class LevelsView(APIView):
 
         serializer = LevelSerializer(levels, many=True, context=serializer_context)
         print("Serialized Levels Data:", serializer.data)
+        set_cached_levels(user.id, mystery.id, versions, serializer.data)
         return Response(serializer.data)
 
 
@@ -165,12 +193,16 @@ class LevelDetailView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request, level_id):
-        level = get_object_or_404(Level, id=level_id)
-        serializer = SingleLevelSerializer(level, context={"request": request})
+        level = get_object_or_404(
+            Level.objects.select_related("mystery", "present").prefetch_related("questions"), id=level_id
+        )
+        # Attempts, answers, reviews and progress for every question, loaded up front
+        context = {"request": request, "level_state": load_level_state(request.user, level)}
+        serializer = SingleLevelSerializer(level, context=context)
         return Response(serializer.data)
 
 from .models import Mails
-from utils.mail.mail_service import send
+from .mail_outbox import enqueue_hint_mail, MailRateLimited
 # -------------------------------
 # Get HInt View
 # -------------------------------
@@ -190,23 +222,18 @@ class GetHint(APIView):
         print(f"[Backend] Matched Question → ID={question.id}, Text='{question.question}', Type={question.answer_type}")
 
         if "mail" in question.answer_type:
-            # Returns the first mail object or None if no mails are found
             mail = Mails.objects.filter(question=question).first()
-            print(mail)
-            file_bytes = None
-            mime_type =None
-            image_id = None
-            if mail.image_url:
-                image_id=mail.image_url
-                print("Requested image_id:", image_id)
-                # Fetch file bytes securely
-                if "google" in image_id:
-                    match = re.search(r"id=([^&]+)", image_id)
-                    image_id = match.group(1)
-                print("Fetching image for hint mail .." , image_id)
-                file_bytes, mime_type = image_secure_access(image_id)
-            send(recipient_email = request.user.email , subject = mail.subject , message_text = mail.message_text , image =file_bytes , mime_type= mime_type )
-            return Response({"detail": "Hint succesfully sent"}, status=status.HTTP_200_OK)
+            if mail is None:
+                return Response({"detail": "No hint mail for this question"}, status=status.HTTP_404_NOT_FOUND)
+
+            # Sent by the mail outbox worker; the request only records the job
+            try:
+                enqueue_hint_mail(request.user, mail)
+            except MailRateLimited:
+                return Response({"detail": "Too many hint requests, try again later"}, status=status.HTTP_429_TOO_MANY_REQUESTS)
+            return Response({"detail": "Hint queued, it will arrive by mail shortly"}, status=status.HTTP_202_ACCEPTED)
+
+        return Response({"detail": "This question has no hint mail"}, status=status.HTTP_400_BAD_REQUEST)
 
 # -------------------------------
 # User Progress View
@@ -215,16 +242,10 @@ class UserProgressView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request , mystery_id):
-        # ensure progress exists and initialize unlocked first level
-        progress, created = UserProgress.objects.get_or_create(user=request.user ,  mystery_id = mystery_id)
-        if created:
-            first_level = Level.objects.order_by("id").first()
-            if first_level:
-                progress.unlocked_levels.add(first_level)
-                progress.save()
-
-        serializer = UserProgressSerializer(progress, context={"request": request})
-        return Response(serializer.data)
+        # Building a missing snapshot also creates the progress row and unlocks the first level
+        snapshot = get_progress_snapshot(request.user, mystery_id)
+        presents = Present.objects.filter(id__in=snapshot.collected_present_ids).select_related("level")
+        return Response({"collectedPresents": PresentSerializer(presents, many=True, context={"request": request}).data})
 
 # from django.shortcuts import get_object_or_404
 # -------------------------------
@@ -236,36 +257,12 @@ class UserSubmitAnswer(APIView):
     def post(self, request, question_id):
         """
         Accepts question_id in form 'q1' or '1'
-        Body: { "answer": "...", "answer_image": <file> }
+        Body: { "answer": "...", "answer_image": <file>, "submission_key": "..." (optional) }
+        An Idempotency-Key header (or submission_key) makes retries return the first result.
         Returns: { correct: bool|None, present: <present object or null> }
         """
 
 
-        def unlock_nextlevel(current_level , progress ):
-            "checks any pending question gets next level adds levels to progress and adds present to progress"
-            for questions in current_level.questions.all():
-                if not UserAnswer.objects.filter(user=request.user, question=questions).exists():
-                    print("[Backend] Level NOT completed due to pending/unanswered questions.")
-                    return None
-            next_level = Level.objects.filter(id__gt=current_level.id).order_by("id").first()
-            if next_level:
-                if current_level not in progress.completed_levels.all():
-                    progress.completed_levels.add(current_level)
-                    print("Progress added")
-                if next_level not in progress.unlocked_levels.all():
-                    progress.unlocked_levels.add(next_level)
-                    progress.save()
-                print(f"[Backend] Unlocked next level: ID={next_level.id}, Name='{next_level.name}'")
-                if hasattr(current_level, "present") and current_level.present :
-                    if current_level.present not in progress.collected_presents.all():
-                        progress.collected_presents.add(current_level.present)
-                        progress.save()
-                    present_data = PresentSerializer(current_level.present, context={"request": request}).data
-                    return present_data
-            else:
-                print("[Backend] No further levels to unlock.")
-
-
         print("\n" + "=" * 50)
         print("[Backend] Incoming Answer Submission")
         print("  Raw question_id:", question_id)
@@ -282,164 +279,21 @@ class UserSubmitAnswer(APIView):
             print("[Backend] ERROR: Invalid question id format")
             return Response({"detail": "Invalid question id"}, status=status.HTTP_400_BAD_REQUEST)
 
-
-
-
-        question = get_object_or_404(Question, id=numeric_id)
+        question = get_object_or_404(Question.objects.select_related("level"), id=numeric_id)
         print(f"[Backend] Matched Question → ID={question.id}, Text='{question.question}', Type={question.answer_type}")
 
-        present_level = get_object_or_404(Level, id=question.level.id)
-        mystery = get_object_or_404(Mystery, id=present_level.mystery.id)
-
-
-        progress, _ = UserProgress.objects.get_or_create(user=request.user, mystery=mystery)
-
-
-        # ---- Prevent duplicate correct submissions ----
-        if UserAnswer.objects.filter(user=request.user, question=question).exists():
-            
-            present_data = unlock_nextlevel(present_level , progress)
-            print("[Backend] Duplicate submission detected, rejecting")
-            return Response({"detail": "You have already answered this question."},
-                            status=status.HTTP_400_BAD_REQUEST)
-
-        # ---- Max Attempts Check ----
-        user_attempt_count = UserAnswer.objects.filter(user=request.user, question=question).count()
-        max_attempts = question.max_attempts or 3
-        if user_attempt_count >= max_attempts:
-            print(f"[Backend] User reached max attempts ({max_attempts}), not saving new answer.")
-            return Response(
-                {"correct": False, "present": None, "message": "Maximum attempts reached."},
-                status=status.HTTP_200_OK
-            )
-
-        # ---- Parse incoming data ----
-        user_answer_text = (request.data.get("answer") or "").strip().lower()
-        correct_answer = (question.answer or "").strip().lower()
-        image_file = request.FILES.get("answer_image")
-
-        print(f"[Backend] Parsed Answer Text: '{user_answer_text}'")
-        print(f"[Backend] Correct Answer: '{correct_answer}'")
-        print(f"[Backend] Uploaded Image: {image_file}")
-
-        # ---- Handle answer based on type ----
-        answer_type = question.answer_type
-        is_correct = None  # default for descriptive/review
-
-        if "review" in answer_type:
-            print("[Backend] Handling REVIEW type question")
-            if answer_type == "descriptive-review" and not user_answer_text:
-                return Response({"detail": "Answer text is required"}, status=status.HTTP_400_BAD_REQUEST)
-            if answer_type == "image-review" and not image_file:
-                return Response({"detail": "Answer image is required"}, status=status.HTTP_400_BAD_REQUEST)
-
-            # Prevent saving more than max attempts for review type
-            review_count = Review.objects.filter(user=request.user, question=question).count()
-            if review_count >= max_attempts:
-                print("[Backend] Max review submissions reached, rejecting.")
-                return Response(
-                    {"correct": None, "pending": True, "message": "Maximum review submissions reached."},
-                    status=status.HTTP_200_OK
-                )
-
-            # Save review submission
-            Review.objects.create(
-                user=request.user,
-                question=question,
-                answer_text=user_answer_text if answer_type == "descriptive-review" else None,
-                answer_image=image_file if answer_type == "image-review" else None,
-                status="pending",
-            )
-
-            return Response(
-                {"correct": None, "pending": True, "message": "Answer submitted for review."},
-                status=status.HTTP_200_OK
-            )
-        
-        elif "match" in answer_type:
-            print("[Backend] Handling MATCH type question")
-            if not user_answer_text:
-                return Response({"detail": "Answer is required"}, status=status.HTTP_400_BAD_REQUEST)
-
-            is_correct = (user_answer_text == correct_answer)
-            print(f"[Backend] MATCH result: {is_correct}")
-
-
-            UserAnswer.objects.create(
-                user=request.user,
-                is_correct=is_correct,
-                question=question,
-                attempts=user_attempt_count + 1,
-                answer_text=user_answer_text,
-            )
-
-            if not is_correct:
-                return Response({"correct": False, "present": None}, status=status.HTTP_200_OK)                    #take it above cretion to not save incorrect answers
-            
-
-        elif  "image" in answer_type :
-            print("[Backend] Handling IMAGE type question")
-            if not image_file:
-                return Response({"detail": "Answer image is required"}, status=status.HTTP_400_BAD_REQUEST)
-
-            UserAnswer.objects.create(
-                user=request.user,
-                question=question,
-                attempts=user_attempt_count + 1,
-                answer_image=image_file,
-            )
-            is_correct = True  # Treat image submission as correct automatically
-
-        elif "descriptive" in answer_type:
-            print("[Backend] Handling DESCRIPTIVE type question")
-            if not user_answer_text:
-                return Response({"detail": "Answer is required"}, status=status.HTTP_400_BAD_REQUEST)
-
-            UserAnswer.objects.create(
-                user=request.user,
-                question=question,
-                attempts=user_attempt_count + 1,
-                answer_text=user_answer_text
-            )
-            is_correct = True  # under review
-
-        elif answer_type == "puzzle":
-            print("[Backend] Handling PUZZLE type question")
-
-            if user_answer_text == "puzzlesolved":
-                UserAnswer.objects.create(
-                    user=request.user,
-                    question=question,
-                    attempts=user_attempt_count + 1,
-                    answer_text=user_answer_text
-                )
-                is_correct = True
-
-
-        else:
-            print("[Backend] ERROR: Unknown question type:", answer_type)
-            return Response({"detail": "Unknown question type"}, status=status.HTTP_400_BAD_REQUEST)
-
-        print("[Backend] UserAnswer saved successfully")
-
-
-        present_data = unlock_nextlevel(present_level , progress)
-
-
-
-        # ---- Final response ----
-        response_data = {
-            "correct": is_correct,
-            "present": present_data,
-            "message": "Answer processed successfully" if is_correct else "Answer pending or incorrect"
-        }
+        # Checks, answer rows and level completion run in one locked transaction (api.submission)
+        result = submit_answer(
+            request.user, question, request.data, request.FILES,
+            submission_key=submission_key_from_request(request),
+        )
 
-        print("[Backend] Final Response:", response_data)
+        print("[Backend] Final Response:", result.data)
         print("=" * 50 + "\n")
 
-        return Response(response_data, status=status.HTTP_200_OK)
+        return Response(result.data, status=result.status_code)
 
-from .selfSerializer import FullMysterySerializer
+from .selfSerializer import FullMysterySerializer, full_mystery_queryset, stream_full_mysteries
 
 class SelfMysteries(APIView):
     permission_classes = [IsAuthenticated]
@@ -448,25 +302,121 @@ class SelfMysteries(APIView):
         user = request.user
         print("Fetching self mysteries for user:", user)
         mysteries = Mystery.objects.filter(created_by=user).order_by("-starts_at")
-        serializer = MysterySerializer(mysteries, many=True, context={"request": request})
-        return Response(serializer.data)
+        return list_mysteries(request, mysteries, view=self)
     
     def post(self, request):
         mystery_id = request.data.get("mystery_id")
         user = request.user
-        mysteries = get_object_or_404(Mystery, id=mystery_id )
+        mysteries = get_object_or_404(full_mystery_queryset(), id=mystery_id, created_by=user)
         serializer = FullMysterySerializer(mysteries)
         return Response(serializer.data)
     
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from django.http import StreamingHttpResponse
 from .models import Mystery
 # from .serializers import FullMysterySerializer
 
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
-def get_user_mysteries(request):
-    mysteries = Mystery.objects.filter(created_by=request.user)
+def get_user_mysteries(request, mystery_id=None):
+    """
+    Full export of the creator's mysteries (or of one of them with mystery_id).
+    ?stream=true streams the JSON array instead of building it in memory.
+    """
+    mysteries = full_mystery_queryset().filter(created_by=request.user).order_by("-starts_at", "-id")
+    if mystery_id is not None:
+        mysteries = mysteries.filter(id=mystery_id)
+
+    stream = request.query_params.get("stream")
+    if stream and stream.lower() == "true":
+        return StreamingHttpResponse(stream_full_mysteries(mysteries), content_type="application/json")
+
     serializer = FullMysterySerializer(mysteries, many=True)
     return Response(serializer.data)
+
+
+# -------------------------------
+# Moderator Review Queue
+# -------------------------------
+from .serializers import ReviewQueueSerializer
+from .reviews import (
+    REVIEW_LEASE_SECONDS, REVIEW_MAX_LEASE_SECONDS, REVIEW_QUEUE_PAGE_SIZE, REVIEW_QUEUE_MAX_PAGE_SIZE,
+    approve_reviews, reject_reviews, can_moderate, claim_reviews, release_reviews, review_queue_page,
+    decode_queue_cursor, is_claimed_by_other,
+)
+
+
+def _bounded_int(value, default, maximum):
+    try:
+        return max(1, min(int(value), maximum)) if value not in (None, "") else default
+    except (TypeError, ValueError):
+        return default
+
+
+class ReviewQueueView(APIView):
+    """
+    GET  → pending reviews of a mystery, oldest first: ?after=<cursor>&limit=<n>
+           Returns { results, next } where next is the cursor of the following page.
+    POST → claim a batch: { "count": n, "lease_seconds": s } or release one: { "release": [ids] }
+    """
+    permission_classes = [IsAuthenticated]
+
+    def _mystery(self, request, mystery_id):
+        mystery = get_object_or_404(Mystery.objects.only("id", "created_by"), id=mystery_id)
+        if not can_moderate(request.user, mystery):
+            return None
+        return mystery
+
+    def get(self, request, mystery_id):
+        mystery = self._mystery(request, mystery_id)
+        if mystery is None:
+            return Response({"detail": "Only the creator can review this mystery."}, status=status.HTTP_403_FORBIDDEN)
+
+        after = request.query_params.get("after")
+        try:
+            after = decode_queue_cursor(after) if after else None
+        except ValueError:
+            return Response({"detail": "Invalid cursor"}, status=status.HTTP_400_BAD_REQUEST)
+        limit = _bounded_int(request.query_params.get("limit"), REVIEW_QUEUE_PAGE_SIZE, REVIEW_QUEUE_MAX_PAGE_SIZE)
+
+        reviews, next_cursor = review_queue_page(mystery.id, request.user, after=after, limit=limit)
+        return Response({"results": ReviewQueueSerializer(reviews, many=True).data, "next": next_cursor})
+
+    def post(self, request, mystery_id):
+        mystery = self._mystery(request, mystery_id)
+        if mystery is None:
+            return Response({"detail": "Only the creator can review this mystery."}, status=status.HTTP_403_FORBIDDEN)
+
+        release = request.data.get("release")
+        if release is not None:
+            released = release_reviews(request.user, release if isinstance(release, list) else [release])
+            return Response({"released": released})
+
+        count = _bounded_int(request.data.get("count"), REVIEW_QUEUE_PAGE_SIZE, REVIEW_QUEUE_MAX_PAGE_SIZE)
+        lease = _bounded_int(request.data.get("lease_seconds"), REVIEW_LEASE_SECONDS, REVIEW_MAX_LEASE_SECONDS)
+        reviews = claim_reviews(mystery.id, request.user, count, lease_seconds=lease)
+        return Response({"results": ReviewQueueSerializer(reviews, many=True).data})
+
+
+class ReviewDecisionView(APIView):
+    """POST { "status": "approved" | "rejected" } on a review the moderator holds (or nobody holds)."""
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, review_id):
+        review = get_object_or_404(Review.objects.select_related("mystery"), id=review_id)
+        if not can_moderate(request.user, review.mystery):
+            return Response({"detail": "Only the creator can review this mystery."}, status=status.HTTP_403_FORBIDDEN)
+        if is_claimed_by_other(review, request.user):
+            return Response({"detail": "This review is claimed by another moderator."}, status=status.HTTP_409_CONFLICT)
+
+        decision = request.data.get("status")
+        reviews = Review.objects.filter(id=review.id)
+        if decision == "approved":
+            updated = approve_reviews(reviews, reviewer=request.user)
+        elif decision == "rejected":
+            updated = reject_reviews(reviews, reviewer=request.user)
+        else:
+            return Response({"detail": "status must be 'approved' or 'rejected'"}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({"id": review.id, "status": decision, "updated": bool(updated)})
@@ -0,0 +1,69 @@
+# api/warmup.py
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from utils.gdrive import file_id_from_url
+from utils.image_access import image_secure_access
+from utils.image_derivatives import get_image_derivative
+from .models import Question, Present, Mails
+
+WARMUP_WORKERS = 8
+
+
+def collect_mystery_file_ids(mystery) -> list[str]:
+    """
+    Walk Mystery → Level → Question / Present / Mails and return every
+    stored image id, de-duplicated, in a stable order.
+    """
+    urls = [mystery.image_url]
+    urls += Question.objects.filter(level__mystery=mystery).order_by("level_id", "id").values_list("question_image_url", flat=True)
+    urls += Present.objects.filter(level__mystery=mystery).order_by("level_id").values_list("image_url", flat=True)
+    urls += Mails.objects.filter(question__level__mystery=mystery).order_by("question_id", "id").values_list("image_url", flat=True)
+
+    file_ids = []
+    seen = set()
+    for url in urls:
+        file_id = file_id_from_url(url)
+        if file_id and file_id not in seen:
+            seen.add(file_id)
+            file_ids.append(file_id)
+    return file_ids
+
+
+def _warm_one(file_id, sizes, formats):
+    image_secure_access(file_id)
+    for size in sizes:
+        for fmt in formats:
+            get_image_derivative(file_id, size, fmt)
+
+
+def warm_mystery_images(mystery, workers=WARMUP_WORKERS, sizes=(), formats=("webp", "jpeg"), progress=None) -> dict:
+    """
+    Download all of a mystery's images into the image cache (plus the given
+    derivative sizes) with at most `workers` concurrent fetches.
+
+    The disk tier is shared by every worker process on the host, so running this
+    once — e.g. via `manage.py warm_mystery_images` shortly before starts_at —
+    warms the cache for all of them.
+
+    progress(done, total, file_id, error) is called after each file.
+    Returns {"total": n, "warmed": n, "failed": {file_id: error}}.
+    """
+    file_ids = collect_mystery_file_ids(mystery)
+    total = len(file_ids)
+    failed = {}
+    done = 0
+
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="warmup") as executor:
+        futures = {executor.submit(_warm_one, file_id, sizes, formats): file_id for file_id in file_ids}
+        for future in as_completed(futures):
+            file_id = futures[future]
+            error = None
+            try:
+                future.result()
+            except Exception as e:
+                error = str(e)
+                failed[file_id] = error
+            done += 1
+            if progress:
+                progress(done, total, file_id, error)
+
+    return {"total": total, "warmed": total - len(failed), "failed": failed}
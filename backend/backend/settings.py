@@ -1,6 +1,7 @@
 from pathlib import Path
 from datetime import timedelta
 import os
+import tempfile
 import dj_database_url
 from dotenv import load_dotenv
 
@@ -142,6 +143,18 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 MEDIA_URL = '/presents/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'presents')
 
+# Uploaded images wait here until a background worker pushes them to Drive
+UPLOAD_STAGING_DIR = os.environ.get("UPLOAD_STAGING_DIR", os.path.join(MEDIA_ROOT, "upload_staging"))
+UPLOAD_MAX_ATTEMPTS = int(os.environ.get("UPLOAD_MAX_ATTEMPTS", 5))
+
+# ==========================
+# BACKGROUND TASKS
+# ==========================
+
+# "thread" = in-process worker pool, "sync" = run inline (tests / local debugging)
+BACKGROUND_TASKS_MODE = os.environ.get("BACKGROUND_TASKS_MODE", "thread")
+BACKGROUND_WORKERS = int(os.environ.get("BACKGROUND_WORKERS", 4))
+
 # ==========================
 # DEFAULT PRIMARY KEY
 # ==========================
@@ -159,6 +172,97 @@ SIMPLE_JWT = {
 
 GOOGLE_DRIVE_FOLDER_ID = os.environ.get("GOOGLE_DRIVE_FOLDER_ID")
 
+# ==========================
+# IMAGE STORAGE
+# ==========================
+
+# "drive" (default), "local" (directory on disk) or "s3" (any S3-compatible store, needs boto3)
+STORAGE_BACKEND = os.environ.get("STORAGE_BACKEND", "drive")
+
+LOCAL_STORAGE_ROOT = os.environ.get("LOCAL_STORAGE_ROOT", os.path.join(BASE_DIR, "storage"))
+# Local files are served through the image proxy (game/image/<key>/)
+LOCAL_STORAGE_BASE_URL = os.environ.get("LOCAL_STORAGE_BASE_URL", "http://localhost:8000/game/image")
+
+S3_BUCKET = os.environ.get("S3_BUCKET")
+S3_ENDPOINT_URL = os.environ.get("S3_ENDPOINT_URL")  # e.g. MinIO / R2 endpoint; empty for AWS
+S3_REGION = os.environ.get("S3_REGION")
+S3_ACCESS_KEY_ID = os.environ.get("S3_ACCESS_KEY_ID")
+S3_SECRET_ACCESS_KEY = os.environ.get("S3_SECRET_ACCESS_KEY")
+S3_PREFIX = os.environ.get("S3_PREFIX", "")
+
+# ==========================
+# IMAGE CACHE
+# ==========================
+
+# In-memory LRU cache for Drive image bytes (per worker process)
+IMAGE_CACHE_MAX_BYTES = int(os.environ.get("IMAGE_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+IMAGE_CACHE_MAX_ENTRY_BYTES = int(os.environ.get("IMAGE_CACHE_MAX_ENTRY_BYTES", 8 * 1024 * 1024))
+IMAGE_CACHE_TTL = int(os.environ.get("IMAGE_CACHE_TTL", 60 * 60))  # seconds, 0 = never expire
+# How long a request waits for another request's in-flight download of the same file
+IMAGE_FETCH_WAIT_TIMEOUT = int(os.environ.get("IMAGE_FETCH_WAIT_TIMEOUT", 30))
+
+# On-disk cache shared by all workers on the host (survives restarts)
+IMAGE_DISK_CACHE_DIR = os.environ.get(
+    "IMAGE_DISK_CACHE_DIR", os.path.join(tempfile.gettempdir(), "treasurehunt-image-cache")
+)
+IMAGE_DISK_CACHE_MAX_BYTES = int(os.environ.get("IMAGE_DISK_CACHE_MAX_BYTES", 1024 * 1024 * 1024))
+
+# Uploaded images are re-encoded with their longest side capped at this many pixels
+IMAGE_INGEST_MAX_DIMENSION = int(os.environ.get("IMAGE_INGEST_MAX_DIMENSION", 2048))
+
+# Cache-Control max-age for images served through the proxies (private browser cache)
+IMAGE_BROWSER_CACHE_SECONDS = int(os.environ.get("IMAGE_BROWSER_CACHE_SECONDS", 24 * 60 * 60))
+
+# ==========================
+# CACHE
+# ==========================
+
+# "file" (default, shared by the workers of one host), "redis" or "locmem" (per process)
+CACHE_BACKEND = os.environ.get("CACHE_BACKEND", "file")
+
+if CACHE_BACKEND == "redis":
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.environ.get("REDIS_URL", "redis://127.0.0.1:6379/1"),
+        }
+    }
+elif CACHE_BACKEND == "file":
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": os.environ.get(
+                "CACHE_FILE_DIR", os.path.join(tempfile.gettempdir(), "treasurehunt-django-cache")
+            ),
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "OPTIONS": {"MAX_ENTRIES": 10000},  # one LevelsView entry per active player
+        }
+    }
+
+# Cached LevelsView payloads and level graphs are invalidated by the worker that changes
+# the data, so they are only cached when every worker sees the same cache
+CACHE_IS_SHARED = CACHE_BACKEND != "locmem"
+
+# How long a serialized LevelsView payload may stay cached (it is also invalidated on every change)
+LEVELS_CACHE_TIMEOUT = int(os.environ.get("LEVELS_CACHE_TIMEOUT", 5 * 60))
+
+# ==========================
+# HINT MAILS
+# ==========================
+
+# "gmail" = Gmail API, "console" = print messages, "file" = write .eml files to MAIL_FILE_DIR
+MAIL_TRANSPORT = os.environ.get("MAIL_TRANSPORT", "gmail")
+MAIL_FILE_DIR = os.environ.get("MAIL_FILE_DIR", os.path.join(BASE_DIR, "sent_mails"))
+MAIL_MAX_ATTEMPTS = int(os.environ.get("MAIL_MAX_ATTEMPTS", 5))
+# At most MAIL_RATE_LIMIT hint mails per player every MAIL_RATE_WINDOW seconds
+MAIL_RATE_LIMIT = int(os.environ.get("MAIL_RATE_LIMIT", 5))
+MAIL_RATE_WINDOW = int(os.environ.get("MAIL_RATE_WINDOW", 60 * 60))
+
 
 import os
 import django
@@ -0,0 +1,149 @@
+# utils/background.py
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.apps import apps
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+import random
+import threading
+
+# "thread": run jobs on an in-process worker pool (default)
+# "sync":   run jobs inline in the calling thread (tests / local debugging)
+BACKGROUND_TASKS_MODE = getattr(settings, "BACKGROUND_TASKS_MODE", "thread")
+BACKGROUND_WORKERS = getattr(settings, "BACKGROUND_WORKERS", 4)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    # Created lazily so forked (gunicorn) workers each get their own pool
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=BACKGROUND_WORKERS, thread_name_prefix="background")
+    return _executor
+
+
+def _run(fn, args, kwargs):
+    try:
+        fn(*args, **kwargs)
+    except Exception as e:
+        print(f"[Background] {getattr(fn, '__name__', fn)} failed: {e}")
+    finally:
+        # Worker threads keep their own DB connection; don't let it go stale
+        close_old_connections()
+
+
+def submit(fn, *args, delay=0, **kwargs):
+    """
+    Run fn(*args, **kwargs) in the background worker pool.
+    delay (seconds) postpones the job, e.g. for retry backoff. In "sync" mode
+    the job runs immediately in the caller's thread and delay is ignored.
+    """
+    if BACKGROUND_TASKS_MODE == "sync":
+        fn(*args, **kwargs)
+        return
+
+    if delay > 0:
+        timer = threading.Timer(delay, _get_executor().submit, args=(_run, fn, args, kwargs))
+        timer.daemon = True
+        timer.start()
+        return
+
+    _get_executor().submit(_run, fn, args, kwargs)
+
+
+def backoff_delay(attempt: int, base: float = 5, cap: float = 300) -> float:
+    """Exponential backoff with jitter: base * 2^(attempt-1), capped, ±20%."""
+    delay = min(cap, base * (2 ** max(attempt - 1, 0)))
+    return delay * random.uniform(0.8, 1.2)
+
+
+class JobRunner:
+    """
+    Runs the rows of a job model through `handler`, one claim at a time.
+
+    The model needs `status`, `attempts`, `last_error`, `next_attempt_at` and an
+    auto_now `updated_at`; new jobs are "pending". process() claims a due job by
+    moving it to running_status, calls handler(job) and marks the job
+    done_status; a failure is retried with backoff_delay() until max_attempts,
+    then the job is "failed". on_done(job, result) runs after a success.
+    drain() processes every due job inline, first handing jobs claimed longer
+    than stale_after ago (e.g. by a worker killed mid-job) back to "pending".
+    """
+
+    def __init__(self, model_label, handler, *, running_status, done_status, max_attempts,
+                 stale_after=timedelta(minutes=10), on_done=None, select_related=(), log_prefix="[Jobs]"):
+        self.model_label = model_label
+        self.handler = handler
+        self.running_status = running_status
+        self.done_status = done_status
+        self.max_attempts = max_attempts
+        self.stale_after = stale_after
+        self.on_done = on_done
+        self.select_related = select_related
+        self.log_prefix = log_prefix
+
+    @property
+    def model(self):
+        return apps.get_model(self.model_label)
+
+    def process(self, job_id):
+        """Run one job, unless it isn't due or another worker has claimed it."""
+        # update() skips auto_now, so stamp updated_at here: stale recovery counts from the claim
+        now = timezone.now()
+        claimed = self.model.objects.filter(
+            id=job_id, status="pending", next_attempt_at__lte=now
+        ).update(status=self.running_status, updated_at=now)
+        if not claimed:
+            return
+        job = self.model.objects.select_related(*self.select_related).get(id=job_id)
+
+        try:
+            result = self.handler(job)
+        except Exception as e:
+            job.attempts += 1
+            job.last_error = str(e)
+            if job.attempts >= self.max_attempts:
+                job.status = "failed"
+                job.save(update_fields=["attempts", "last_error", "status", "updated_at"])
+                print(f"{self.log_prefix} ❌ Giving up on {job}: {e}")
+                return
+
+            delay = backoff_delay(job.attempts)
+            job.status = "pending"
+            job.next_attempt_at = timezone.now() + timedelta(seconds=delay)
+            job.save(update_fields=["attempts", "last_error", "status", "next_attempt_at", "updated_at"])
+            print(f"{self.log_prefix} {job} failed ({e}), retrying in {delay:.0f}s")
+            submit(self.process, job.id, delay=delay)
+            return
+
+        job.status = self.done_status
+        job.attempts += 1
+        job.last_error = ""
+        job.save(update_fields=["status", "attempts", "last_error", "updated_at"])
+        print(f"{self.log_prefix} ✅ {job}" + (f" → {result}" if result else ""))
+        if self.on_done is not None:
+            self.on_done(job, result)
+
+    def drain(self, limit=None):
+        """Run every due job in the current thread; returns the number of jobs attempted."""
+        now = timezone.now()
+        self.model.objects.filter(
+            status=self.running_status, updated_at__lt=now - self.stale_after
+        ).update(status="pending")
+
+        job_ids = self.model.objects.filter(
+            status="pending", next_attempt_at__lte=now
+        ).order_by("next_attempt_at").values_list("id", flat=True)
+        if limit:
+            job_ids = job_ids[:limit]
+
+        count = 0
+        for job_id in list(job_ids):
+            self.process(job_id)
+            count += 1
+        return count
@@ -0,0 +1,248 @@
+# utils/disk_cache.py
+from tempfile import NamedTemporaryFile
+import hashlib
+import json
+import mmap
+import os
+import threading
+
+
+# ---------------------------------------------------
+# Shared on-disk image cache
+# ---------------------------------------------------
+class DiskImageCache:
+    """
+    File-per-key cache shared by every worker process on the host.
+
+    Each key (a Drive file id) maps to a small JSON sidecar holding the mime
+    type, size and md5 of the content, and a data file named after that md5.
+    Both are written to a temporary file first and moved into place with
+    os.replace(); the data file goes first and the sidecar last. A data file
+    never changes once written, so a reader always gets the bytes its metadata
+    describes, even while the key is being overwritten.
+    """
+
+    META_SUFFIX = ".json"
+
+    def __init__(self, directory, max_bytes=None, prune_every=50):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.prune_every = prune_every
+        self._writes = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+    # ---- Paths ----
+    def _paths(self, key):
+        """(folder, base path, metadata path); data files are "<base>.<md5>"."""
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        folder = os.path.join(self.directory, digest[:2])
+        base = os.path.join(folder, digest)
+        return folder, base, base + self.META_SUFFIX
+
+    @staticmethod
+    def _data_path(base, meta):
+        return f"{base}.{meta['md5']}"
+
+    def _read_meta(self, meta_path):
+        try:
+            with open(meta_path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    # ---- Read ----
+    def get_meta(self, key) -> dict | None:
+        """Return {"mime_type", "size", "md5"} for a cached key, or None."""
+        _, base, meta_path = self._paths(key)
+        meta = self._read_meta(meta_path)
+        if meta is None or not os.path.exists(self._data_path(base, meta)):
+            return None
+        return meta
+
+    def open(self, key):
+        """
+        Open a cached file for streaming.
+        Returns (file_object, meta) or None. The caller owns the file object.
+        """
+        _, base, meta_path = self._paths(key)
+        # A concurrent overwrite may remove the version we just read about: look again once
+        for _ in range(2):
+            meta = self._read_meta(meta_path)
+            if meta is None:
+                return None
+            data_path = self._data_path(base, meta)
+            try:
+                f = open(data_path, "rb")
+            except OSError:
+                continue
+            self._touch(data_path)
+            return f, meta
+        return None
+
+    def read(self, key) -> tuple[bytes, str] | None:
+        """Read a cached file into memory through mmap. Returns (bytes, mime_type)."""
+        opened = self.open(key)
+        if opened is None:
+            return None
+        f, meta = opened
+        with f:
+            if meta.get("size", 0) == 0:
+                return b"", meta["mime_type"]
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                return bytes(mapped), meta["mime_type"]
+
+    # ---- Write ----
+    def put(self, key, data: bytes, mime_type: str) -> dict:
+        """Atomically store data under key and return its metadata."""
+        meta = {
+            "mime_type": mime_type,
+            "size": len(data),
+            "md5": hashlib.md5(data).hexdigest(),
+        }
+        folder, base, meta_path = self._paths(key)
+        os.makedirs(folder, exist_ok=True)
+
+        self._atomic_write(folder, self._data_path(base, meta), data)
+        self._publish(folder, base, meta_path, meta)
+        return meta
+
+    def writer(self, key, mime_type):
+        """Return a DiskCacheWriter that streams chunks into the cache under key."""
+        folder, base, meta_path = self._paths(key)
+        os.makedirs(folder, exist_ok=True)
+        return DiskCacheWriter(self, folder, base, meta_path, mime_type)
+
+    def delete(self, key):
+        _, base, meta_path = self._paths(key)
+        meta = self._read_meta(meta_path)
+        paths = [meta_path]
+        if meta is not None:
+            paths.append(self._data_path(base, meta))
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _publish(self, folder, base, meta_path, meta):
+        """Point the key at a data file already in place, then drop the version it replaces."""
+        previous = self._read_meta(meta_path)
+        self._atomic_write(folder, meta_path, json.dumps(meta).encode("utf-8"))
+        if previous is not None and previous.get("md5") != meta["md5"]:
+            try:
+                os.remove(self._data_path(base, previous))  # open readers keep their handle
+            except OSError:
+                pass
+        self._after_write()
+
+    def _atomic_write(self, folder, path, data: bytes):
+        with NamedTemporaryFile(dir=folder, delete=False) as tmp:
+            tmp.write(data)
+            tmp_path = tmp.name
+        try:
+            os.replace(tmp_path, path)
+        except OSError:
+            os.remove(tmp_path)
+            raise
+
+    # ---- Housekeeping ----
+    def _touch(self, path):
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def _after_write(self):
+        if not self.max_bytes:
+            return
+        with self._lock:
+            self._writes += 1
+            if self._writes % self.prune_every:
+                return
+        self.prune()
+
+    def prune(self):
+        """Delete least recently used files until the cache fits in max_bytes."""
+        if not self.max_bytes:
+            return 0
+
+        files = []
+        total = 0
+        for folder in os.scandir(self.directory):
+            if not folder.is_dir():
+                continue
+            for entry in os.scandir(folder.path):
+                if entry.name.endswith(self.META_SUFFIX) or not entry.is_file():
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+
+        removed = 0
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            base = path.rsplit(".", 1)[0]
+            for victim in (path, base + self.META_SUFFIX):
+                try:
+                    os.remove(victim)
+                except OSError:
+                    pass
+            total -= size
+            removed += 1
+
+        if removed:
+            print(f"[DiskCache] Pruned {removed} file(s) from {self.directory}")
+        return removed
+
+
+class DiskCacheWriter:
+    """
+    Incrementally writes one cache entry. Nothing becomes visible to readers
+    until commit(); abort() (or an exception inside a with-block) discards it.
+    """
+
+    def __init__(self, cache, folder, base, meta_path, mime_type):
+        self.cache = cache
+        self.folder = folder
+        self.base = base
+        self.meta_path = meta_path
+        self.mime_type = mime_type
+        self.size = 0
+        self._md5 = hashlib.md5()
+        self._tmp = NamedTemporaryFile(dir=folder, delete=False)
+        self._done = False
+
+    def write(self, chunk: bytes):
+        self._tmp.write(chunk)
+        self._md5.update(chunk)
+        self.size += len(chunk)
+
+    def commit(self) -> dict:
+        meta = {"mime_type": self.mime_type, "size": self.size, "md5": self._md5.hexdigest()}
+        self._tmp.close()
+        os.replace(self._tmp.name, self.cache._data_path(self.base, meta))
+        self._done = True
+        self.cache._publish(self.folder, self.base, self.meta_path, meta)
+        return meta
+
+    def abort(self):
+        if self._done:
+            return
+        self._done = True
+        self._tmp.close()
+        try:
+            os.remove(self._tmp.name)
+        except OSError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.abort()  # no-op after a successful commit()
+        return False
@@ -1,8 +1,12 @@
 from pydrive2.auth import GoogleAuth
 from pydrive2.drive import GoogleDrive
+from datetime import datetime, timedelta
 import os
 import json
-from tempfile import NamedTemporaryFile
+import re
+import threading
+import time
+from io import BytesIO
 
 # --- Configuration ---
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -33,43 +37,137 @@ ANSWER_IMAGES_DIR = "1ze0XGUqbzbnL2fw0tfVUk0o2OaO28x8F"
 QUESTIONS_DIR = "1e3ilAM5Bqu7E2M1Q8_mnYddoSmGN7KxH"
 MAIL_DIR = "1aaBTa3IFLJIcpkYLjprWxVKbrencBFMs"
 
-def get_drive_service():
+def file_id_from_url(url):
+    """Extract the Drive file id from a stored link such as https://drive.google.com/uc?id=<id>."""
+    if not url:
+        return None
+    match = re.search(r"id=([^&]+)", url)
+    return match.group(1) if match else None
+
+
+# Refresh the access token this many seconds before it actually expires
+TOKEN_REFRESH_MARGIN = int(os.getenv("DRIVE_TOKEN_REFRESH_MARGIN", "300"))
+
+
+# ---------------------------------------------------
+# Process-wide Drive client
+# ---------------------------------------------------
+class DriveClient:
     """
-    Handles Google Drive OAuth using a pre-generated token.json.
-    Works in production (Render) with automatic refresh.
+    Holds one authorized GoogleAuth/GoogleDrive pair per process.
+
+    Credentials are read from disk once; afterwards the token is only refreshed
+    when it is within TOKEN_REFRESH_MARGIN seconds of expiring. Loading and
+    refreshing happen under a lock so concurrent requests never race on the
+    token file. API calls stay thread-safe because PyDrive2 hands each thread
+    its own authorized http object.
     """
-    gauth = GoogleAuth()
 
-    # Load OAuth client secrets
-    with open(CLIENT_SECRETS, "r") as f:
-        client_config_dict = json.load(f)
-
-    client_config = client_config_dict["web"]
-    redirect_uri = client_config["redirect_uris"][0]
-
-    # Configure PyDrive2
-    gauth.settings["client_config_backend"] = "settings"
-    gauth.settings["client_config"] = {
-        "client_id": client_config["client_id"],
-        "client_secret": client_config["client_secret"],
-        "auth_uri": client_config["auth_uri"],
-        "token_uri": client_config["token_uri"],
-        "revoke_uri": client_config.get("revoke_uri", "https://oauth2.googleapis.com/revoke"),
-        "redirect_uri": redirect_uri,
-    }
-    gauth.settings["get_refresh_token"] = True
-    gauth.settings["oauth_scope"] = ["https://www.googleapis.com/auth/drive"]
+    def __init__(self, refresh_margin=TOKEN_REFRESH_MARGIN):
+        self.refresh_margin = refresh_margin
+        self._lock = threading.Lock()
+        self._gauth = None
+        self._drive = None
+        self._stats = {
+            "loads": 0,
+            "refreshes": 0,
+            "errors": 0,
+            "last_auth_ms": 0.0,
+            "total_auth_ms": 0.0,
+        }
+
+    def get(self):
+        drive = self._drive
+        if drive is not None and not self._needs_refresh():
+            return drive
+
+        with self._lock:
+            started = time.perf_counter()
+            try:
+                if self._drive is None:
+                    self._load()
+                    self._stats["loads"] += 1
+                elif self._needs_refresh():
+                    self._refresh()
+            except Exception:
+                self._stats["errors"] += 1
+                raise
+            finally:
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                self._stats["last_auth_ms"] = elapsed_ms
+                self._stats["total_auth_ms"] += elapsed_ms
+            return self._drive
+
+    def reset(self):
+        """Forget the cached client; the next get() re-reads credentials from disk."""
+        with self._lock:
+            self._gauth = None
+            self._drive = None
+
+    def stats(self) -> dict:
+        stats = dict(self._stats)
+        auths = stats["loads"] + stats["refreshes"]
+        stats["avg_auth_ms"] = stats["total_auth_ms"] / auths if auths else 0.0
+        expiry = getattr(getattr(self._gauth, "credentials", None), "token_expiry", None)
+        stats["token_expiry"] = expiry.isoformat() if expiry else None
+        return stats
+
+    def _needs_refresh(self):
+        credentials = getattr(self._gauth, "credentials", None)
+        if credentials is None:
+            return True
+        if credentials.access_token_expired:
+            return True
+        expiry = credentials.token_expiry  # naive UTC datetime
+        if expiry is None:
+            return False
+        return expiry - datetime.utcnow() < timedelta(seconds=self.refresh_margin)
+
+    def _load(self):
+        """
+        Handles Google Drive OAuth using a pre-generated token.json.
+        Works in production (Render) with automatic refresh.
+        """
+        gauth = GoogleAuth()
+
+        # Load OAuth client secrets
+        with open(CLIENT_SECRETS, "r") as f:
+            client_config_dict = json.load(f)
+
+        client_config = client_config_dict["web"]
+        redirect_uri = client_config["redirect_uris"][0]
+
+        # Configure PyDrive2
+        gauth.settings["client_config_backend"] = "settings"
+        gauth.settings["client_config"] = {
+            "client_id": client_config["client_id"],
+            "client_secret": client_config["client_secret"],
+            "auth_uri": client_config["auth_uri"],
+            "token_uri": client_config["token_uri"],
+            "revoke_uri": client_config.get("revoke_uri", "https://oauth2.googleapis.com/revoke"),
+            "redirect_uri": redirect_uri,
+        }
+        gauth.settings["get_refresh_token"] = True
+        gauth.settings["oauth_scope"] = ["https://www.googleapis.com/auth/drive"]
+
+        # Load saved token
+        gauth.LoadCredentialsFile(TOKEN_FILE)
+
+        if gauth.credentials is None:
+            raise RuntimeError(
+                "❌ token.json missing. Generate it locally and upload to Render."
+            )
 
-    # Load saved token
-    gauth.LoadCredentialsFile(TOKEN_FILE)
+        self._gauth = gauth
+        if self._needs_refresh():
+            self._refresh()
+        else:
+            gauth.Authorize()
 
-    if gauth.credentials is None:
-        raise RuntimeError(
-            "❌ token.json missing. Generate it locally and upload to Render."
-        )
+        self._drive = GoogleDrive(gauth)
 
-    # If access token expired → refresh automatically
-    if gauth.access_token_expired:
+    def _refresh(self):
+        gauth = self._gauth
         if not gauth.credentials.refresh_token:
             raise RuntimeError(
                 "❌ No refresh token available. "
@@ -77,72 +175,111 @@ def get_drive_service():
                 "and redeploy to Render."
             )
 
-        print("Access token expired. Refreshing...")
+        print("Access token expired or about to expire. Refreshing...")
         gauth.Refresh()
         gauth.SaveCredentialsFile(TOKEN_FILE)
+        self._stats["refreshes"] += 1
         print("✅ Token refreshed and saved.")
 
-    else:
-        gauth.Authorize()
 
-    return GoogleDrive(gauth)
+_drive_client = DriveClient()
 
 
-def upload_file_to_drive(django_file, dir_name=""):
+def get_drive_service():
     """
-    Upload a Django InMemoryUploadedFile to Google Drive using PyDrive2.
-    Uses a temporary file because PyDrive2 doesn't provide SetContentIOStream.
-    Returns a public webContentLink (after making file public).
+    Return the process-wide authorized GoogleDrive instance.
+    Credentials are loaded once and refreshed only near expiry.
+    """
+    return _drive_client.get()
+
+
+def drive_client_stats() -> dict:
+    """Auth counters and latency (ms) of the shared Drive client."""
+    return _drive_client.stats()
+
+
+# Chunk size used when streaming files down from Drive
+DOWNLOAD_CHUNK_SIZE = int(os.getenv("DRIVE_DOWNLOAD_CHUNK_SIZE", str(256 * 1024)))
+
+
+def open_drive_stream(file_id, chunk_size=DOWNLOAD_CHUNK_SIZE):
+    """
+    Start a chunked download of a Drive file without touching the local disk.
+    Returns (metadata, chunks) where metadata holds mimeType / md5Checksum / fileSize
+    and chunks is an iterator of bytes.
+    """
+    drive = get_drive_service()
+    gfile = drive.CreateFile({"id": file_id})
+    gfile.FetchMetadata(fields="mimeType,md5Checksum,fileSize,modifiedDate")
+
+    metadata = {
+        "mimeType": gfile.get("mimeType", "application/octet-stream"),
+        "md5Checksum": gfile.get("md5Checksum"),
+        "fileSize": int(gfile["fileSize"]) if gfile.get("fileSize") else None,
+        "modifiedDate": gfile.get("modifiedDate"),
+    }
+    return metadata, iter(gfile.GetContentIOBuffer(chunksize=chunk_size))
+
+
+def download_file_from_drive(file_id) -> tuple[bytes, str]:
+    """Download a whole Drive file into memory. Returns (file_bytes, mime_type)."""
+    metadata, chunks = open_drive_stream(file_id)
+    buffer = BytesIO()
+    for chunk in chunks:
+        buffer.write(chunk)
+    return buffer.getvalue(), metadata["mimeType"]
+
+
+def upload_to_drive_folder(file_obj, name, content_type, folder_id):
+    """
+    Upload a file object into a Drive folder and return the new file id.
+    The file object is handed to PyDrive2 directly and sent in resumable chunks,
+    so it is never copied into a temporary file or read fully into memory.
     """
     drive = get_drive_service()
-    print(f"Uploading file to Google Drive: {django_file.name}")
+    print(f"Uploading file to Google Drive: {name}")
 
     # Ensure file pointer is at start
     try:
-        django_file.seek(0)
+        file_obj.seek(0)
     except Exception:
         pass
 
-    # Write to temporary file
-    with NamedTemporaryFile(delete=False) as tmp:
-        tmp.write(django_file.read())
-        tmp_path = tmp.name
+    gfile = drive.CreateFile({
+        "title": os.path.basename(name),
+        "mimeType": content_type or "application/octet-stream",
+        "parents": [{"id": folder_id}],
+    })
+    gfile.content = file_obj
+    gfile.dirty["content"] = True
+    gfile.Upload()
+    return gfile.get("id")
 
-    try:
-        # Decide which folder to upload to
-        if dir_name == "presents":
-            folder_id = PRESENT_IMAGES_DIR
-        elif dir_name == "answers":
-            folder_id = ANSWER_IMAGES_DIR
-        elif dir_name == "questions":
-            folder_id = QUESTIONS_DIR
-        elif dir_name == "mails":
-            folder_id = MAIL_DIR
-        else:
-            folder_id = DRIVE_FOLDER_ID
-
-        # Create and upload file
-        gfile = drive.CreateFile({
-            "title": django_file.name,
-            "mimeType": getattr(django_file, "content_type", "application/octet-stream"),
-            "parents": [{"id": folder_id}],
-        })
-        gfile.SetContentFile(tmp_path)
-        gfile.Upload()
-
-
-        file_id = gfile.get("id")
-        direct_view_link = f"https://drive.google.com/uc?id={file_id}"
-        print(f"File uploaded to Drive with ID: {file_id} : ", direct_view_link)
-        # Return public link
-        return direct_view_link
-
-    finally:
-        # Clean up temporary file
-        try:
-            os.remove(tmp_path)
-        except Exception:
-            pass
+
+def upload_file_to_drive(django_file, dir_name=""):
+    """
+    Upload a Django File / UploadedFile to Google Drive using PyDrive2.
+    Returns a direct view link to the uploaded file.
+    """
+    # Decide which folder to upload to
+    if dir_name == "presents":
+        folder_id = PRESENT_IMAGES_DIR
+    elif dir_name == "answers":
+        folder_id = ANSWER_IMAGES_DIR
+    elif dir_name == "questions":
+        folder_id = QUESTIONS_DIR
+    elif dir_name == "mails":
+        folder_id = MAIL_DIR
+    else:
+        folder_id = DRIVE_FOLDER_ID
+
+    file_id = upload_to_drive_folder(
+        django_file, django_file.name, getattr(django_file, "content_type", None), folder_id
+    )
+    direct_view_link = f"https://drive.google.com/uc?id={file_id}"
+    print(f"File uploaded to Drive with ID: {file_id} : ", direct_view_link)
+    # Return public link
+    return direct_view_link
 
 
 
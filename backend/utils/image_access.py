@@ -1,92 +1,330 @@
-from utils.gdrive import get_drive_service
-import os
-from tempfile import NamedTemporaryFile
-from PIL import Image
-from io import BytesIO
-_image_cache: dict[str , bytes] = {}
 # utils/image_access.py
-from utils.gdrive import get_drive_service
-from tempfile import NamedTemporaryFile
+from utils.storage import get_storage
+from utils.disk_cache import DiskImageCache
+from utils.singleflight import SingleFlight, SingleFlightTimeout
+from tempfile import gettempdir
+from collections import OrderedDict
+from django.conf import settings
+import hashlib
+import threading
+import time
 import os
 
+
+# ---------------------------------------------------
+# Bounded in-memory image cache
+# ---------------------------------------------------
+class ImageCache:
+    """
+    Thread-safe LRU cache for Drive file bytes, bounded by total size.
+
+    - max_bytes:       total byte budget; least recently used entries are evicted first
+    - max_entry_bytes: files larger than this are never cached
+    - ttl:             seconds an entry stays valid (0 / None = no expiry)
+    """
+
+    def __init__(self, max_bytes, max_entry_bytes, ttl=None):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = min(max_entry_bytes, max_bytes)
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[bytes, str, float]] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            data, mime_type, stored_at = entry
+            if self.ttl and time.monotonic() - stored_at > self.ttl:
+                self._remove(key)
+                self.evictions += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return data, mime_type
+
+    def set(self, key, data, mime_type):
+        size = len(data)
+        if size > self.max_entry_bytes:
+            return False
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (data, mime_type, time.monotonic())
+            self._size += size
+
+            # Evict least recently used entries until we are back under budget
+            while self._size > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+        return True
+
+    def delete(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def _remove(self, key):
+        data, _, _ = self._entries.pop(key)
+        self._size -= len(data)
+
+
 # global in-memory cache {file_id: (bytes, mime_type)}
-_image_cache: dict[str, tuple[bytes, str]] = {}
+_image_cache = ImageCache(
+    max_bytes=getattr(settings, "IMAGE_CACHE_MAX_BYTES", 64 * 1024 * 1024),
+    max_entry_bytes=getattr(settings, "IMAGE_CACHE_MAX_ENTRY_BYTES", 8 * 1024 * 1024),
+    ttl=getattr(settings, "IMAGE_CACHE_TTL", 60 * 60),
+)
+
+
+# shared on-disk cache, one warm copy per host for all workers
+_disk_cache = DiskImageCache(
+    directory=getattr(
+        settings, "IMAGE_DISK_CACHE_DIR", os.path.join(gettempdir(), "treasurehunt-image-cache")
+    ),
+    max_bytes=getattr(settings, "IMAGE_DISK_CACHE_MAX_BYTES", None),
+)
+
+
+# concurrent misses for the same file wait on one download instead of each fetching it
+_inflight = SingleFlight()
+IMAGE_FETCH_WAIT_TIMEOUT = getattr(settings, "IMAGE_FETCH_WAIT_TIMEOUT", 30)
+
+
+def image_cache_stats() -> dict:
+    """Return hit/miss/eviction counters and current size of the image cache."""
+    return _image_cache.stats()
+
+
+def image_cached_file(file_id: str):
+    """
+    Open a Drive file from the shared disk cache without loading it into memory.
+    Returns (file_object, mime_type, size, md5) or None if it isn't cached on disk.
+    """
+    if not file_id:
+        return None
+    opened = _disk_cache.open(file_id)
+    if opened is None:
+        return None
+    f, meta = opened
+    return f, meta["mime_type"], meta["size"], meta.get("md5")
+
+
+def cached_image(key: str) -> tuple[bytes, str] | None:
+    """Look a key up in the memory cache, then the disk cache. Returns (bytes, mime_type)."""
+    cached = _image_cache.get(key)
+    if cached is not None:
+        return cached
+
+    cached = _disk_cache.read(key)
+    if cached is not None:
+        _image_cache.set(key, *cached)
+    return cached
+
+
+def store_cached_image(key: str, data: bytes, mime_type: str):
+    """Store bytes under key in both the disk and memory caches."""
+    _disk_cache.put(key, data, mime_type)
+    _image_cache.set(key, data, mime_type)
+
 
 def image_secure_access(file_id: str) -> tuple[bytes, str] | None:
     """
-    Fetch raw bytes of a Google Drive file using PyDrive2.
-    Uses in-memory cache so the same file_id isn't fetched multiple times.
+    Fetch raw bytes of a stored image (Drive or the configured storage backend).
+    Looks in the in-memory LRU cache, then the shared disk cache,
+    and only downloads when neither has the file. Concurrent misses for the
+    same file share a single download; a request that waits on it longer than
+    IMAGE_FETCH_WAIT_TIMEOUT downloads the file itself instead.
     Returns (file_bytes, mime_type).
     """
     if not file_id:
         return None
 
-    # 1. Check cache
-    if file_id in _image_cache:
-        return _image_cache[file_id]
+    # 1. Check caches (memory first, then disk)
+    cached = cached_image(file_id)
+    if cached is not None:
+        return cached
+
+    # 2. Download once per file, however many requests are waiting for it.
+    #    Waiters read the leader's result back from the cache; the leader may be
+    #    a byte fetch or a streaming response (see image_stream).
+    while True:
+        call, leader = _inflight.begin(file_id)
+        if leader:
+            break
+        try:
+            _inflight.wait(file_id, call, timeout=IMAGE_FETCH_WAIT_TIMEOUT)
+        except StreamAborted:
+            pass
+        except SingleFlightTimeout:
+            return _fetch_direct(file_id)
+        cached = cached_image(file_id)
+        if cached is not None:
+            return cached
+
+    try:
+        # The previous leader may have filled the cache just before we took over
+        result = cached_image(file_id)
+        if result is None:
+            file_bytes, mime_type = get_storage().get(file_id)
+            # Store in caches (memory skips files above the per-entry limit)
+            store_cached_image(file_id, file_bytes, mime_type)
+            result = file_bytes, mime_type
+    except BaseException as e:
+        _inflight.finish(file_id, call, error=e)
+        raise
+
+    _inflight.finish(file_id, call, result=True)
+    return result
 
-    drive = get_drive_service()
-    gfile = drive.CreateFile({'id': file_id})
 
-    with NamedTemporaryFile(delete=False) as tmp:
-        tmp_path = tmp.name
+def _fetch_direct(file_id: str) -> tuple[bytes, str]:
+    """
+    Download a file outside the single-flight, for requests that gave up waiting
+    on a slow leader (a streaming leader is paced by its own client).
+    """
+    print(f"[Image Cache] Gave up waiting on the in-flight fetch of {file_id}, fetching directly")
+    file_bytes, mime_type = get_storage().get(file_id)
+    store_cached_image(file_id, file_bytes, mime_type)
+    return file_bytes, mime_type
 
+
+def image_md5(file_id: str) -> str | None:
+    """
+    md5 of a stored image without downloading it: from the memory cache, else the
+    storage backend's metadata. None when unknown or the lookup fails.
+    """
+    if not file_id:
+        return None
+    cached = _image_cache.get(file_id)
+    if cached is not None:
+        return hashlib.md5(cached[0]).hexdigest()
     try:
-        # 2. Download file once
-        gfile.GetContentFile(tmp_path)
-        with open(tmp_path, "rb") as f:
-            file_bytes = f.read()
+        return get_storage().stat(file_id).get("md5")
+    except Exception as e:
+        print(f"[Image Cache] Metadata lookup failed for {file_id}: {e}")
+        return None
+
 
-        mime_type = gfile.get("mimeType", "application/octet-stream")
+class StreamAborted(Exception):
+    """The leading stream was closed before the download finished (e.g. client went away)."""
 
-        # 3. Store in cache
-        _image_cache[file_id] = (file_bytes, mime_type)
 
-        return file_bytes, mime_type
+class _TeeToDisk:
+    """
+    Iterable that yields chunks from the storage backend while writing them to the
+    disk cache. Django calls close() when the response is done (or never sent),
+    which always publishes the outcome to requests waiting on the same file.
+    """
+
+    def __init__(self, file_id, chunks, mime_type, call):
+        self.file_id = file_id
+        self.chunks = chunks
+        self.call = call
+        self.writer = _disk_cache.writer(file_id, mime_type)
+        self._finished = False
 
-    finally:
+    def __iter__(self):
         try:
-            os.remove(tmp_path)
-        except Exception:
-            pass
+            for chunk in self.chunks:
+                self.writer.write(chunk)
+                yield chunk
+            self.writer.commit()
+        except GeneratorExit:
+            raise
+        except Exception as e:
+            self._finish(e)
+            raise
+        self._finish(None)
 
-from functools import lru_cache
-from io import BytesIO
-from PIL import Image
+    def close(self):
+        self._finish(StreamAborted(self.file_id))
 
-# Simple in-memory cache
+    def _finish(self, error):
+        if self._finished:
+            return
+        self._finished = True
+        self.writer.abort()  # no-op after commit()
+        _inflight.finish(self.file_id, self.call, result=error is None, error=error)
 
 
-def create_thumbnail_from_drive(file_id: str, size=(200, 200)) -> tuple[bytes, str] | None:
+def image_stream(file_id: str):
     """
-    Create and return a cached thumbnail for a Google Drive image.
-    Returns (thumbnail_bytes, "image/jpeg").
+    Stream a stored image chunk by chunk.
+    Served from the in-memory cache when possible; otherwise chunks are piped from
+    the storage backend to the caller while being written to the shared disk cache.
+    If the same file is already being downloaded, waits for that download and
+    serves the cached copy instead of starting another one.
+    Returns (chunk_iterator, mime_type, size, md5) — size / md5 may be None when unknown.
+    The iterator has a close() method that must be called if it isn't consumed.
     """
     if not file_id:
         return None
 
-    try:
-        # 2. Download original image
-        file_bytes, _ = image_secure_access(file_id)
+    cached = _image_cache.get(file_id)
+    if cached is not None:
+        return _bytes_stream(*cached)
 
-        # 3. Create thumbnail
-        img = Image.open(BytesIO(file_bytes)).convert("RGB")
-        img.thumbnail(size)
+    call, leader = _inflight.begin(file_id)
+    if not leader:
+        try:
+            _inflight.wait(file_id, call, timeout=IMAGE_FETCH_WAIT_TIMEOUT)
+        except StreamAborted:
+            pass  # leader's client disconnected; fall back to a (deduplicated) fetch
+        except SingleFlightTimeout:
+            return _bytes_stream(*_fetch_direct(file_id))  # leader's client is slow
+        return _bytes_stream(*image_secure_access(file_id))
 
-        buffer = BytesIO()
-        img.save(buffer, format="JPEG", quality=80)
+    try:
+        metadata, chunks = get_storage().stream(file_id)
+    except Exception as e:
+        _inflight.finish(file_id, call, error=e)
+        raise
 
-        data = buffer.getvalue()
-        if not data:
-            raise ValueError("Thumbnail buffer is empty")
+    stream = _TeeToDisk(file_id, chunks, metadata["mime_type"], call)
+    return stream, metadata["mime_type"], metadata["size"], metadata["md5"]
 
-        # 4. Save to cache
 
-        return data, "image/jpeg"
+class _BytesStream:
+    def __init__(self, data):
+        self.data = data
 
-    except Exception as e:
-        print(f"[Thumbnail Error] Could not create thumbnail for file {file_id}: {e}")
-        return None
+    def __iter__(self):
+        yield self.data
 
+    def close(self):
+        pass
 
 
+def _bytes_stream(file_bytes, mime_type):
+    return _BytesStream(file_bytes), mime_type, len(file_bytes), hashlib.md5(file_bytes).hexdigest()
@@ -0,0 +1,106 @@
+# utils/image_derivatives.py
+from utils.image_access import image_secure_access, cached_image, store_cached_image, IMAGE_FETCH_WAIT_TIMEOUT
+from utils.singleflight import SingleFlight, SingleFlightTimeout
+from PIL import Image, ImageOps
+from io import BytesIO
+
+# Named sizes: bounding box (width, height) the image is shrunk to fit
+DERIVATIVE_SIZES = {
+    "thumb": (200, 200),
+    "medium": (800, 800),
+    "full": (2048, 2048),
+}
+
+# format name → (PIL format, mime type, save options)
+DERIVATIVE_FORMATS = {
+    "webp": ("WEBP", "image/webp", {"quality": 80, "method": 4}),
+    "jpeg": ("JPEG", "image/jpeg", {"quality": 80, "optimize": True, "progressive": True}),
+}
+
+
+_inflight = SingleFlight()
+
+
+def derivative_key(file_id: str, size: str, fmt: str) -> str:
+    """Cache key of one derivative, e.g. "1AbC@thumb.webp"."""
+    return f"{file_id}@{size}.{fmt}"
+
+
+def negotiate_format(requested: str | None, accept_header: str | None) -> str:
+    """Pick the output format: an explicit ?format= wins, otherwise WebP if the client accepts it."""
+    if requested:
+        return requested
+    if accept_header and "image/webp" in accept_header:
+        return "webp"
+    return "jpeg"
+
+
+def render_derivative(file_bytes: bytes, size: str, fmt: str) -> bytes:
+    """Decode an image, fit it into the named size and re-encode it."""
+    pil_format, _, options = DERIVATIVE_FORMATS[fmt]
+
+    img = Image.open(BytesIO(file_bytes))
+    img = ImageOps.exif_transpose(img)
+    if fmt == "webp" and img.mode in ("RGBA", "LA", "P"):
+        img = img.convert("RGBA")  # WebP keeps transparency
+    else:
+        img = img.convert("RGB")
+    img.thumbnail(DERIVATIVE_SIZES[size], Image.LANCZOS)
+
+    buffer = BytesIO()
+    img.save(buffer, format=pil_format, **options)
+    data = buffer.getvalue()
+    if not data:
+        raise ValueError("Derivative buffer is empty")
+    return data
+
+
+def get_image_derivative(file_id: str, size: str = "thumb", fmt: str = "jpeg") -> tuple[bytes, str]:
+    """
+    Return (bytes, mime_type) of a resized copy of a Drive image.
+    Derivatives are cached in memory and on disk under (file_id, size, format),
+    so each one is decoded and encoded only once per host.
+    Raises ValueError for an empty file id or an unknown size / format.
+    """
+    if not file_id:
+        raise ValueError("Missing file id")
+    if size not in DERIVATIVE_SIZES:
+        raise ValueError(f"Unknown image size: {size}")
+    if fmt not in DERIVATIVE_FORMATS:
+        raise ValueError(f"Unknown image format: {fmt}")
+
+    key = derivative_key(file_id, size, fmt)
+    cached = cached_image(key)
+    if cached is not None:
+        return cached
+
+    def render():
+        cached = cached_image(key)
+        if cached is not None:
+            return cached
+        file_bytes, _ = image_secure_access(file_id)
+        data = render_derivative(file_bytes, size, fmt)
+        mime_type = DERIVATIVE_FORMATS[fmt][1]
+        store_cached_image(key, data, mime_type)
+        return data, mime_type
+
+    # Many thumbnails of one new image are usually requested at once: render it once
+    try:
+        return _inflight.do(key, render, timeout=IMAGE_FETCH_WAIT_TIMEOUT)
+    except SingleFlightTimeout:
+        return render()  # the leading render is stuck behind a slow fetch; don't fail the request
+
+
+def create_thumbnail_from_drive(file_id: str, size: str = "thumb") -> tuple[bytes, str] | None:
+    """
+    Create and return a cached JPEG thumbnail for a Google Drive image.
+    Returns (thumbnail_bytes, "image/jpeg").
+    """
+    if not file_id:
+        return None
+
+    try:
+        return get_image_derivative(file_id, size, "jpeg")
+    except Exception as e:
+        print(f"[Thumbnail Error] Could not create thumbnail for file {file_id}: {e}")
+        return None
@@ -0,0 +1,93 @@
+# utils/image_ingest.py
+from django.conf import settings
+from django.core.files.base import ContentFile
+from utils.storage import get_storage
+from utils.image_access import store_cached_image
+from utils.image_derivatives import DERIVATIVE_FORMATS, derivative_key, render_derivative
+from PIL import Image, ImageOps, UnidentifiedImageError
+from io import BytesIO
+import os
+
+# Longest side an uploaded image is stored with
+IMAGE_INGEST_MAX_DIMENSION = getattr(settings, "IMAGE_INGEST_MAX_DIMENSION", 2048)
+# Derivatives rendered right after upload so the first viewer finds them cached
+IMAGE_INGEST_WARM_SIZES = ("thumb", "medium")
+
+# PIL format → (mime type, save options); other formats are uploaded untouched
+_NORMALIZED_FORMATS = {
+    "JPEG": ("image/jpeg", {"quality": 88, "optimize": True, "progressive": True}),
+    "PNG": ("image/png", {"optimize": True}),
+    "WEBP": ("image/webp", {"quality": 88}),
+}
+
+
+def normalize_image_upload(django_file):
+    """
+    Prepare an uploaded image for storage:
+    - apply the EXIF orientation to the pixels
+    - drop EXIF / GPS / other metadata by re-encoding
+    - cap the longest side at IMAGE_INGEST_MAX_DIMENSION
+    Returns (file, data) where file is a ContentFile of the normalized image, or
+    (django_file, None) if the upload isn't a still image we know how to re-encode.
+    """
+    try:
+        django_file.seek(0)
+        img = Image.open(django_file)
+        pil_format = img.format
+        if pil_format not in _NORMALIZED_FORMATS or getattr(img, "is_animated", False):
+            django_file.seek(0)
+            return django_file, None
+
+        img = ImageOps.exif_transpose(img)
+        img.thumbnail((IMAGE_INGEST_MAX_DIMENSION, IMAGE_INGEST_MAX_DIMENSION), Image.LANCZOS)
+        if pil_format == "JPEG" and img.mode not in ("RGB", "L"):
+            img = img.convert("RGB")
+
+        mime_type, options = _NORMALIZED_FORMATS[pil_format]
+        buffer = BytesIO()
+        img.save(buffer, format=pil_format, **options)  # no exif= / pnginfo= → metadata stripped
+        data = buffer.getvalue()
+
+    except (UnidentifiedImageError, OSError) as e:
+        print(f"[Ingest] Could not normalize {getattr(django_file, 'name', '')}: {e}")
+        django_file.seek(0)
+        return django_file, None
+
+    normalized = ContentFile(data, name=os.path.basename(django_file.name))
+    normalized.content_type = mime_type
+    return normalized, data
+
+
+def warm_image_derivatives(file_id: str, data: bytes, mime_type: str):
+    """Cache the stored image and its standard derivatives under the new Drive file id."""
+    store_cached_image(file_id, data, mime_type)
+    for size in IMAGE_INGEST_WARM_SIZES:
+        for fmt in DERIVATIVE_FORMATS:
+            derivative = render_derivative(data, size, fmt)
+            store_cached_image(derivative_key(file_id, size, fmt), derivative, DERIVATIVE_FORMATS[fmt][1])
+
+
+def ingest_image_upload(django_file, dir_name=""):
+    """
+    Normalize an uploaded image, push it to the storage backend (Drive by default)
+    and pre-render its thumbnails. Returns the link to store on the model.
+    """
+    normalized, data = normalize_image_upload(django_file)
+    storage = get_storage()
+    key = storage.put(
+        normalized,
+        normalized.name,
+        content_type=getattr(normalized, "content_type", None),
+        dir_name=dir_name,
+    )
+    url = storage.url_for(key)
+    print(f"[Ingest] Stored {normalized.name} in {storage.name} storage: {url}")
+
+    if data is not None:
+        try:
+            warm_image_derivatives(key, data, normalized.content_type)
+        except Exception as e:
+            # The upload itself succeeded; derivatives will be built lazily instead
+            print(f"[Ingest] Could not pre-render derivatives: {e}")
+
+    return url
@@ -0,0 +1,203 @@
+# utils/image_response.py
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotFound, StreamingHttpResponse
+from utils.image_access import image_cached_file, image_md5, image_secure_access, image_stream
+from utils.image_derivatives import derivative_key, get_image_derivative, negotiate_format
+import hashlib
+import re
+
+# Browsers may keep private copies of proxied images this long (seconds)
+IMAGE_BROWSER_CACHE_SECONDS = getattr(settings, "IMAGE_BROWSER_CACHE_SECONDS", 24 * 60 * 60)
+FILE_CHUNK_SIZE = 64 * 1024
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+# ---------------------------------------------------
+# Header helpers
+# ---------------------------------------------------
+def make_etag(file_id: str, md5: str | None) -> str:
+    """Strong ETag from the content md5, falling back to a hash of the Drive file id."""
+    tag = md5 or hashlib.sha1(file_id.encode("utf-8")).hexdigest()
+    return f'"{tag}"'
+
+
+def etag_matches(header: str | None, etag: str) -> bool:
+    """If-None-Match uses weak comparison: W/ prefixes are ignored."""
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in header.split(",")]
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+def parse_range(header: str | None, size: int):
+    """
+    Parse a single-range "bytes=start-end" header.
+    Returns (start, end) inclusive, None when the header is absent/unsupported
+    (serve the full body), or "unsatisfiable".
+    """
+    if not header:
+        return None
+    match = _RANGE_RE.match(header.strip())
+    if not match:
+        return None  # multiple ranges or other units: ignore and send everything
+
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            return "unsatisfiable"
+        return max(size - length, 0), size - 1
+
+    start = int(first)
+    end = int(last) if last else size - 1
+    if start >= size or end < start:
+        return "unsatisfiable"
+    return start, min(end, size - 1)
+
+
+def _resolve_range(request, size, etag):
+    """
+    Decide which bytes to send. Returns (status, start, end) or
+    (416, None, None) when the requested range can't be satisfied.
+    If-Range with a stale ETag falls back to the full body.
+    """
+    range_header = request.META.get("HTTP_RANGE")
+    if_range = request.META.get("HTTP_IF_RANGE")
+    byte_range = parse_range(range_header, size) if not if_range or if_range == etag else None
+
+    if byte_range == "unsatisfiable":
+        return 416, None, None
+    if byte_range is None:
+        return 200, 0, size - 1
+    return 206, byte_range[0], byte_range[1]
+
+
+def _unsatisfiable(size, etag):
+    response = HttpResponse(status=416)
+    response["Content-Range"] = f"bytes */{size}"
+    return _apply_cache_headers(response, etag)
+
+
+def _apply_cache_headers(response, etag):
+    response["ETag"] = etag
+    response["Cache-Control"] = f"private, max-age={IMAGE_BROWSER_CACHE_SECONDS}"
+    response["Accept-Ranges"] = "bytes"
+    return response
+
+
+def _file_range(f, start, length):
+    with f:
+        f.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = f.read(min(FILE_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def _bytes_response(request, key, file_bytes, mime_type):
+    """Serve bytes already in memory, honouring If-None-Match and Range."""
+    size = len(file_bytes)
+    etag = make_etag(key, hashlib.md5(file_bytes).hexdigest())
+    if etag_matches(request.META.get("HTTP_IF_NONE_MATCH"), etag):
+        return _apply_cache_headers(HttpResponse(status=304), etag)
+
+    status, start, end = _resolve_range(request, size, etag)
+    if status == 416:
+        return _unsatisfiable(size, etag)
+
+    response = HttpResponse(file_bytes[start:end + 1], content_type=mime_type, status=status)
+    if status == 206:
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+    return _apply_cache_headers(response, etag)
+
+
+# ---------------------------------------------------
+# Response builder
+# ---------------------------------------------------
+def build_image_response(request, file_id: str, size: str | None = None, fmt: str | None = None):
+    """
+    Build the response for an image proxy request.
+
+    - ETag / If-None-Match → 304 Not Modified
+    - Range → 206 Partial Content (single range) or 416
+    - Cache-Control: private, so browsers keep their own copy
+    - size (thumb/medium/full) serves a cached derivative instead of the original;
+      its format comes from fmt or, failing that, the Accept header
+    Cached files are streamed from disk; cold files are streamed from Drive.
+    An empty file id gets a 404.
+    """
+    if not file_id:
+        return HttpResponseNotFound("Image not found")
+
+    if_none_match = request.META.get("HTTP_IF_NONE_MATCH")
+    negotiated = size is not None and fmt is None
+    if size is not None:
+        fmt = negotiate_format(fmt, request.META.get("HTTP_ACCEPT"))
+        key = derivative_key(file_id, size, fmt)
+    else:
+        key = file_id
+
+    response = _build_image_response(request, file_id, key, size, fmt, if_none_match)
+    if negotiated:
+        response["Vary"] = "Accept"
+    return response
+
+
+def _build_image_response(request, file_id, key, size, fmt, if_none_match):
+    # 1. Disk cache: metadata + seekable file
+    cached = image_cached_file(key)
+    if cached is not None:
+        f, mime_type, file_size, md5 = cached
+        etag = make_etag(key, md5)
+        if etag_matches(if_none_match, etag):
+            f.close()
+            return _apply_cache_headers(HttpResponse(status=304), etag)
+
+        status, start, end = _resolve_range(request, file_size, etag)
+        if status == 416:
+            f.close()
+            return _unsatisfiable(file_size, etag)
+
+        length = end - start + 1
+        response = StreamingHttpResponse(_file_range(f, start, length), content_type=mime_type, status=status)
+        response["Content-Length"] = str(length)
+        if status == 206:
+            response["Content-Range"] = f"bytes {start}-{end}/{file_size}"
+        return _apply_cache_headers(response, etag)
+
+    # 2. Derivatives are rendered (and cached) on first request
+    if size is not None:
+        file_bytes, mime_type = get_image_derivative(file_id, size, fmt)
+        return _bytes_response(request, key, file_bytes, mime_type)
+
+    # 3. Range on a cold file: fetch it whole (fills the caches) and slice
+    if request.META.get("HTTP_RANGE"):
+        file_bytes, mime_type = image_secure_access(file_id)
+        return _bytes_response(request, key, file_bytes, mime_type)
+
+    # 4. Revalidation of a cold file: answer from metadata instead of opening a download
+    if if_none_match:
+        etag = make_etag(key, image_md5(file_id))
+        if etag_matches(if_none_match, etag):
+            return _apply_cache_headers(HttpResponse(status=304), etag)
+
+    # 5. Memory cache or Drive: stream the whole body
+    chunks, mime_type, file_size, md5 = image_stream(file_id)
+    etag = make_etag(key, md5)
+    if etag_matches(if_none_match, etag):
+        chunks.close()  # releases requests waiting on this download
+        return _apply_cache_headers(HttpResponse(status=304), etag)
+
+    response = StreamingHttpResponse(chunks, content_type=mime_type)
+    if file_size is not None:
+        response["Content-Length"] = str(file_size)
+    return _apply_cache_headers(response, etag)
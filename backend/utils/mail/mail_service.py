@@ -1,5 +1,6 @@
 import os
 import base64
+import threading
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.mime.image import MIMEImage
@@ -38,9 +39,9 @@ else:
 # ---------------------------------------------------
 # Authenticate and create Gmail service
 # ---------------------------------------------------
-def get_gmail_service():
+def _load_credentials():
     """
-    Authenticates with Google using OAuth and returns a Gmail service object.
+    Authenticates with Google using OAuth and returns valid credentials.
     """
     creds = None
     if os.path.exists(TOKEN_FILE_MAIL):
@@ -59,7 +60,47 @@ def get_gmail_service():
         with open(TOKEN_FILE_MAIL, 'w') as token:
             token.write(creds.to_json())
 
-    return build('gmail', 'v1', credentials=creds)
+    return creds
+
+
+def get_gmail_service():
+    """
+    Authenticates with Google using OAuth and returns a Gmail service object.
+    """
+    return build('gmail', 'v1', credentials=_load_credentials())
+
+
+# ---------------------------------------------------
+# Reused Gmail client
+# ---------------------------------------------------
+_creds = None
+_creds_lock = threading.Lock()
+_local = threading.local()
+
+
+def get_gmail_client():
+    """
+    Gmail service reused across sends. Credentials are loaded once per process
+    and refreshed only when they expire; each thread keeps its own service,
+    since the http object inside one isn't thread-safe.
+    """
+    global _creds
+    with _creds_lock:
+        if _creds is None or not _creds.valid:
+            _creds = _load_credentials()
+        creds = _creds
+
+    if getattr(_local, "creds", None) is not creds:
+        _local.service = build('gmail', 'v1', credentials=creds, cache_discovery=False)
+        _local.creds = creds
+    return _local.service
+
+
+def deliver(message, userId="me"):
+    """Send a message built by create_message(); raises HttpError on failure (for retries)."""
+    sent_msg = get_gmail_client().users().messages().send(userId=userId, body=message).execute()
+    print(f"✅ Email sent successfully! Message ID: {sent_msg['id']}")
+    return sent_msg
 
 
 # ---------------------------------------------------
@@ -143,7 +184,7 @@ def send(userId="me", *args, **kwargs):
     2. Provide a pre-built message:
        send(message=ready_message_object)
     """
-    service = get_gmail_service()
+    service = get_gmail_client()
 
     # --- Use pre-built message directly ---
     if "message" in kwargs and kwargs["message"] is not None:
@@ -0,0 +1,78 @@
+# utils/mail/transports.py
+"""
+Mail transports used by the hint-mail outbox, selected with settings.MAIL_TRANSPORT:
+
+- "gmail"   (default) send through the Gmail API
+- "console" print the message instead of sending it
+- "file"    write each message as an .eml file under MAIL_FILE_DIR
+Console and file transports let the outbox run without network access.
+"""
+from django.conf import settings
+import base64
+import os
+import threading
+import uuid
+
+MAIL_TRANSPORT = getattr(settings, "MAIL_TRANSPORT", "gmail")
+MAIL_FILE_DIR = getattr(settings, "MAIL_FILE_DIR", os.path.join(settings.BASE_DIR, "sent_mails"))
+
+
+def _raw_bytes(message):
+    """MIME bytes of a message built by create_message() ({"raw": <base64url>})."""
+    return base64.urlsafe_b64decode(message["raw"].encode())
+
+
+class GmailTransport:
+    name = "gmail"
+
+    def send(self, message):
+        from .mail_service import deliver  # Google client libraries only when actually sending
+
+        return deliver(message)
+
+
+class ConsoleTransport:
+    name = "console"
+
+    def send(self, message):
+        raw = _raw_bytes(message)
+        headers = raw.split(b"\n\n", 1)[0].decode("utf-8", errors="replace")
+        print(f"[Mail] (console) {len(raw)} bytes\n{headers}")
+        return {"id": f"console-{uuid.uuid4().hex}"}
+
+
+class FileTransport:
+    name = "file"
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def send(self, message):
+        os.makedirs(self.directory, exist_ok=True)
+        message_id = uuid.uuid4().hex
+        path = os.path.join(self.directory, f"{message_id}.eml")
+        with open(path, "wb") as f:
+            f.write(_raw_bytes(message))
+        print(f"[Mail] (file) Wrote {path}")
+        return {"id": message_id}
+
+
+_transport = None
+_transport_lock = threading.Lock()
+
+
+def get_mail_transport():
+    """The configured transport, built once per process."""
+    global _transport
+    if _transport is None:
+        with _transport_lock:
+            if _transport is None:
+                if MAIL_TRANSPORT == "console":
+                    _transport = ConsoleTransport()
+                elif MAIL_TRANSPORT == "file":
+                    _transport = FileTransport(MAIL_FILE_DIR)
+                elif MAIL_TRANSPORT == "gmail":
+                    _transport = GmailTransport()
+                else:
+                    raise ValueError(f"Unknown MAIL_TRANSPORT: {MAIL_TRANSPORT}")
+    return _transport
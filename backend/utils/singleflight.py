@@ -0,0 +1,71 @@
+# utils/singleflight.py
+import threading
+
+
+class SingleFlightTimeout(TimeoutError):
+    pass
+
+
+class _Call:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Per-key in-flight deduplication within a process.
+
+    The first caller for a key (the leader) does the work; callers arriving while
+    it is running wait for the leader's result instead of repeating the work.
+    If the leader fails, every waiter gets the same exception.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: dict[str, _Call] = {}
+
+    def begin(self, key):
+        """Register interest in key. Returns (call, is_leader)."""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                return call, False
+            call = self._calls[key] = _Call()
+            return call, True
+
+    def finish(self, key, call, result=None, error=None):
+        """Publish the leader's outcome and wake all waiters. Must be called exactly once by the leader."""
+        call.result = result
+        call.error = error
+        with self._lock:
+            if self._calls.get(key) is call:
+                del self._calls[key]
+        call.event.set()
+
+    def wait(self, key, call, timeout=None):
+        """Block until the leader finishes; re-raises its error. Raises SingleFlightTimeout on timeout."""
+        if not call.event.wait(timeout):
+            raise SingleFlightTimeout(f"Timed out waiting for in-flight fetch of {key}")
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def do(self, key, fn, timeout=None):
+        """Run fn() once per key at a time; concurrent callers share its result or error."""
+        call, leader = self.begin(key)
+        if not leader:
+            return self.wait(key, call, timeout)
+
+        try:
+            result = fn()
+        except BaseException as e:
+            self.finish(key, call, error=e)
+            raise
+        self.finish(key, call, result=result)
+        return result
+
+    def in_flight(self, key) -> bool:
+        with self._lock:
+            return key in self._calls
@@ -0,0 +1,46 @@
+# utils/storage/__init__.py
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from utils.storage.base import StorageBackend
+import threading
+
+_storage = None
+_storage_lock = threading.Lock()
+
+
+def _build_storage() -> StorageBackend:
+    backend = getattr(settings, "STORAGE_BACKEND", "drive")
+
+    if backend == "drive":
+        from utils.storage.drive import DriveStorage
+        return DriveStorage(folders=getattr(settings, "DRIVE_FOLDERS", None))
+
+    if backend == "local":
+        from utils.storage.local import LocalStorage
+        return LocalStorage(
+            root=settings.LOCAL_STORAGE_ROOT,
+            base_url=getattr(settings, "LOCAL_STORAGE_BASE_URL", "http://localhost:8000/game/image"),
+        )
+
+    if backend == "s3":
+        from utils.storage.s3 import S3Storage
+        return S3Storage(
+            bucket=getattr(settings, "S3_BUCKET", None),
+            endpoint_url=getattr(settings, "S3_ENDPOINT_URL", None),
+            region_name=getattr(settings, "S3_REGION", None),
+            access_key=getattr(settings, "S3_ACCESS_KEY_ID", None),
+            secret_key=getattr(settings, "S3_SECRET_ACCESS_KEY", None),
+            prefix=getattr(settings, "S3_PREFIX", ""),
+        )
+
+    raise ImproperlyConfigured(f"Unknown STORAGE_BACKEND: {backend!r}")
+
+
+def get_storage() -> StorageBackend:
+    """Return the process-wide storage backend selected by settings.STORAGE_BACKEND."""
+    global _storage
+    if _storage is None:
+        with _storage_lock:
+            if _storage is None:
+                _storage = _build_storage()
+    return _storage
@@ -0,0 +1,40 @@
+# utils/storage/base.py
+
+
+class StorageBackend:
+    """
+    Interface every image store implements.
+
+    Objects are addressed by an opaque key (the Drive file id for Drive). The link
+    stored in the models' *_url fields always carries the key as an `id=` query
+    parameter, so existing id extraction keeps working whatever the backend.
+
+    Metadata dicts returned by stat()/stream() contain:
+        {"mime_type": str, "size": int | None, "md5": str | None}
+    """
+
+    name = "base"
+
+    def put(self, file_obj, name, content_type=None, dir_name="") -> str:
+        """Store a file object and return its key."""
+        raise NotImplementedError
+
+    def get(self, key) -> tuple[bytes, str]:
+        """Return (bytes, mime_type) of a stored object."""
+        meta, chunks = self.stream(key)
+        return b"".join(chunks), meta["mime_type"]
+
+    def stream(self, key, chunk_size=256 * 1024):
+        """Return (metadata, chunk_iterator) for a stored object."""
+        raise NotImplementedError
+
+    def stat(self, key) -> dict:
+        """Return metadata of a stored object without downloading it."""
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    def url_for(self, key) -> str:
+        """Link saved in the models for a key (must contain `id=<key>`)."""
+        raise NotImplementedError
@@ -0,0 +1,49 @@
+# utils/storage/drive.py
+from utils.storage.base import StorageBackend
+from utils import gdrive
+
+
+class DriveStorage(StorageBackend):
+    """Google Drive through PyDrive2 and the shared process-wide client."""
+
+    name = "drive"
+
+    def __init__(self, folders=None):
+        # dir_name → Drive folder id; unknown names go to the default folder
+        self.folders = {
+            "presents": gdrive.PRESENT_IMAGES_DIR,
+            "answers": gdrive.ANSWER_IMAGES_DIR,
+            "questions": gdrive.QUESTIONS_DIR,
+            "mails": gdrive.MAIL_DIR,
+            "": gdrive.DRIVE_FOLDER_ID,
+        }
+        self.folders.update(folders or {})
+
+    def put(self, file_obj, name, content_type=None, dir_name=""):
+        folder_id = self.folders.get(dir_name, self.folders[""])
+        return gdrive.upload_to_drive_folder(file_obj, name, content_type, folder_id)
+
+    def stream(self, key, chunk_size=gdrive.DOWNLOAD_CHUNK_SIZE):
+        metadata, chunks = gdrive.open_drive_stream(key, chunk_size=chunk_size)
+        return {
+            "mime_type": metadata["mimeType"],
+            "size": metadata["fileSize"],
+            "md5": metadata["md5Checksum"],
+        }, chunks
+
+    def stat(self, key):
+        drive = gdrive.get_drive_service()
+        gfile = drive.CreateFile({"id": key})
+        gfile.FetchMetadata(fields="mimeType,md5Checksum,fileSize")
+        return {
+            "mime_type": gfile.get("mimeType", "application/octet-stream"),
+            "size": int(gfile["fileSize"]) if gfile.get("fileSize") else None,
+            "md5": gfile.get("md5Checksum"),
+        }
+
+    def delete(self, key):
+        drive = gdrive.get_drive_service()
+        drive.CreateFile({"id": key}).Delete()
+
+    def url_for(self, key):
+        return f"https://drive.google.com/uc?id={key}"
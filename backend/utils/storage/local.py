@@ -0,0 +1,97 @@
+# utils/storage/local.py
+from utils.storage.base import StorageBackend
+from tempfile import NamedTemporaryFile
+import hashlib
+import json
+import mimetypes
+import os
+import uuid
+
+
+class LocalStorage(StorageBackend):
+    """
+    Files in a local directory, one data file plus a JSON metadata sidecar per key.
+    Useful when Drive is slow or rate-limited, and for tests without network access.
+    """
+
+    name = "local"
+
+    def __init__(self, root, base_url="http://localhost:8000/game/image"):
+        self.root = root
+        self.base_url = base_url.rstrip("/")
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, key):
+        # Keys are generated by put(); refuse anything that could escape the root
+        if not key or os.path.basename(key) != key or key.startswith("."):
+            raise ValueError(f"Invalid storage key: {key!r}")
+        return os.path.join(self.root, key)
+
+    def put(self, file_obj, name, content_type=None, dir_name=""):
+        try:
+            file_obj.seek(0)
+        except Exception:
+            pass
+
+        ext = os.path.splitext(name)[1].lower()
+        key = f"{dir_name or 'files'}_{uuid.uuid4().hex}{ext}"
+        path = self._path(key)
+
+        md5 = hashlib.md5()
+        size = 0
+        with NamedTemporaryFile(dir=self.root, delete=False) as tmp:
+            chunks = file_obj.chunks() if hasattr(file_obj, "chunks") else iter(lambda: file_obj.read(256 * 1024), b"")
+            for chunk in chunks:
+                tmp.write(chunk)
+                md5.update(chunk)
+                size += len(chunk)
+        os.replace(tmp.name, path)
+
+        meta = {
+            "mime_type": content_type or mimetypes.guess_type(name)[0] or "application/octet-stream",
+            "size": size,
+            "md5": md5.hexdigest(),
+        }
+        with open(path + ".json", "w") as f:
+            json.dump(meta, f)
+        return key
+
+    def stat(self, key):
+        path = self._path(key)
+        if not os.path.exists(path):
+            raise FileNotFoundError(key)
+        try:
+            with open(path + ".json") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {
+                "mime_type": mimetypes.guess_type(key)[0] or "application/octet-stream",
+                "size": os.path.getsize(path),
+                "md5": None,
+            }
+
+    def stream(self, key, chunk_size=256 * 1024):
+        meta = self.stat(key)
+        path = self._path(key)
+
+        def chunks():
+            with open(path, "rb") as f:
+                while True:
+                    chunk = f.read(chunk_size)
+                    if not chunk:
+                        break
+                    yield chunk
+
+        return meta, chunks()
+
+    def delete(self, key):
+        path = self._path(key)
+        for victim in (path, path + ".json"):
+            try:
+                os.remove(victim)
+            except OSError:
+                pass
+
+    def url_for(self, key):
+        # Nothing serves the directory itself: the link points at the image proxy
+        return f"{self.base_url}/{key}/?id={key}"
@@ -0,0 +1,76 @@
+# utils/storage/s3.py
+from django.core.exceptions import ImproperlyConfigured
+from utils.storage.base import StorageBackend
+import os
+import uuid
+
+try:
+    import boto3
+except ImportError:  # optional dependency, only needed for STORAGE_BACKEND = "s3"
+    boto3 = None
+
+
+class S3Storage(StorageBackend):
+    """Any S3-compatible object store (AWS S3, MinIO, R2, ...) through boto3."""
+
+    name = "s3"
+
+    def __init__(self, bucket, endpoint_url=None, region_name=None, access_key=None, secret_key=None, prefix=""):
+        if boto3 is None:
+            raise ImproperlyConfigured("STORAGE_BACKEND='s3' requires the boto3 package.")
+        if not bucket:
+            raise ImproperlyConfigured("STORAGE_BACKEND='s3' requires S3_BUCKET.")
+        self.bucket = bucket
+        self.endpoint_url = endpoint_url
+        self.prefix = prefix.strip("/")
+        # boto3 clients are thread-safe, one per process is enough
+        self.client = boto3.client(
+            "s3",
+            endpoint_url=endpoint_url,
+            region_name=region_name,
+            aws_access_key_id=access_key,
+            aws_secret_access_key=secret_key,
+        )
+
+    def _object_key(self, key):
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    def put(self, file_obj, name, content_type=None, dir_name=""):
+        try:
+            file_obj.seek(0)
+        except Exception:
+            pass
+
+        ext = os.path.splitext(name)[1].lower()
+        key = f"{dir_name or 'files'}_{uuid.uuid4().hex}{ext}"
+        extra = {"ContentType": content_type} if content_type else {}
+        # upload_fileobj streams in parts; the file is never fully read into memory
+        self.client.upload_fileobj(file_obj, self.bucket, self._object_key(key), ExtraArgs=extra)
+        return key
+
+    def stat(self, key):
+        head = self.client.head_object(Bucket=self.bucket, Key=self._object_key(key))
+        etag = head.get("ETag", "").strip('"')
+        return {
+            "mime_type": head.get("ContentType") or "application/octet-stream",
+            "size": head.get("ContentLength"),
+            # Multipart uploads have "<md5>-<parts>" ETags that aren't a content md5
+            "md5": etag if etag and "-" not in etag else None,
+        }
+
+    def stream(self, key, chunk_size=256 * 1024):
+        obj = self.client.get_object(Bucket=self.bucket, Key=self._object_key(key))
+        etag = obj.get("ETag", "").strip('"')
+        meta = {
+            "mime_type": obj.get("ContentType") or "application/octet-stream",
+            "size": obj.get("ContentLength"),
+            "md5": etag if etag and "-" not in etag else None,
+        }
+        return meta, obj["Body"].iter_chunks(chunk_size=chunk_size)
+
+    def delete(self, key):
+        self.client.delete_object(Bucket=self.bucket, Key=self._object_key(key))
+
+    def url_for(self, key):
+        base = self.endpoint_url.rstrip("/") if self.endpoint_url else "https://s3.amazonaws.com"
+        return f"{base}/{self.bucket}/{self._object_key(key)}?id={key}"
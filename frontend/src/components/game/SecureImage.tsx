@@ -27,11 +27,8 @@ const SecureImage: React.FC<SecureImageProps> = ({
     return <div className="text-center text-red-500">❌ No image provided</div>;
   }
 
-  // Extract image ID (Google Drive or normal)
-  const imageId =
-    image_url.includes("google")
-      ? image_url.match(/id=([^&]+)/)?.[1] || image_url
-      : image_url;
+  // Stored links of every storage backend (Drive, local, S3) carry the key as id=<key>
+  const imageId = image_url.match(/id=([^&]+)/)?.[1] || image_url;
 
   useEffect(() => {
     isMounted.current = true;